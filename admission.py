@@ -0,0 +1,184 @@
+"""
+Admission control for expensive endpoints.
+
+Requests are grouped into endpoint classes, each with its own bounded number
+of requests in flight and bounded wait queue. A request that finds its class
+saturated and the queue full, or that waits longer than the queue timeout, is
+rejected with 429 and a Retry-After estimate before its body is read, so
+memory stays bounded under overload and AI work cannot starve the cheap read
+endpoints, which have capacity of their own.
+
+Limits come from the environment, e.g. ADMISSION_AI_MAX_IN_FLIGHT=16.
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Pattern, Tuple
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, endpoint_class: str, retry_after: float):
+        super().__init__(f"Server busy ({endpoint_class} capacity exhausted), please retry later")
+        self.endpoint_class = endpoint_class
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class AdmissionController:
+    """Bounded in-flight counter with a bounded FIFO wait queue"""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long a request holds a slot, for Retry-After
+        self.avg_service_time = 1.0
+        self.admitted = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, name: str, max_in_flight: int, max_queue: int, queue_timeout: float) -> "AdmissionController":
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name,
+            max_in_flight=int(os.getenv(prefix + "MAX_IN_FLIGHT", str(max_in_flight))),
+            max_queue=int(os.getenv(prefix + "MAX_QUEUE", str(max_queue))),
+            queue_timeout=float(os.getenv(prefix + "QUEUE_TIMEOUT_SECONDS", str(queue_timeout))),
+        )
+
+    def retry_after(self) -> float:
+        """Rough time until a newly queued request would be admitted"""
+        backlog = len(self._waiters) + 1
+        return self.avg_service_time * backlog / max(1, self.max_in_flight)
+
+    def _reject(self):
+        self.rejected += 1
+        raise AdmissionRejected(self.name, self.retry_after())
+
+    async def acquire(self):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject()
+        self.admitted += 1
+
+    def release(self, service_time: Optional[float] = None):
+        if service_time is not None:
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * service_time
+        # Hand the slot straight to the oldest waiter, keeping in_flight unchanged
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_service_time_s": round(self.avg_service_time, 3),
+        }
+
+
+# Endpoint classes; batch uploads hold a slot far longer than single uploads
+ADMISSION_CLASSES: Dict[str, AdmissionController] = {
+    "ai": AdmissionController.from_env("ai", max_in_flight=16, max_queue=32, queue_timeout=10),
+    "ai_batch": AdmissionController.from_env("ai_batch", max_in_flight=2, max_queue=4, queue_timeout=30),
+    "read": AdmissionController.from_env("read", max_in_flight=64, max_queue=128, queue_timeout=2),
+}
+
+# (method, path pattern, class); first match wins, unmatched requests are not limited
+ADMISSION_RULES: List[Tuple[str, Pattern, str]] = [
+    ("POST", re.compile(r"^/provider/upload-inventory/batch$"), "ai_batch"),
+    ("POST", re.compile(r"^/provider/upload-inventory$"), "ai"),
+    ("POST", re.compile(r"^/provider/upload-sessions/[^/]+/finalize$"), "ai"),
+    ("POST", re.compile(r"^/classify(/objects)?(/stream)?$"), "ai"),
+    ("POST", re.compile(r"^/customer/search$"), "read"),
+    ("POST", re.compile(r"^/customer/search/attributes$"), "read"),
+    ("GET", re.compile(r"^/customer/inventory/[^/]+/similar$"), "read"),
+    ("GET", re.compile(r"^/providers$"), "read"),
+    ("GET", re.compile(r"^/images/"), "read"),
+]
+
+
+def admission_class_for(method: str, path: str) -> Optional[AdmissionController]:
+    for rule_method, pattern, name in ADMISSION_RULES:
+        if method == rule_method and pattern.match(path):
+            return ADMISSION_CLASSES[name]
+    return None
+
+
+def admission_stats() -> dict:
+    return {name: controller.stats() for name, controller in ADMISSION_CLASSES.items()}
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying ADMISSION_RULES before the request body is read.
+
+    Written as plain ASGI (not BaseHTTPMiddleware) so streaming responses pass
+    through untouched; the slot is held until the response has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        controller = admission_class_for(scope.get("method", ""), scope.get("path", "")) if scope["type"] == "http" else None
+        if controller is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await controller.acquire()
+        except AdmissionRejected as rejected:
+            await self._send_429(send, rejected)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.monotonic() - started)
+
+    @staticmethod
+    async def _send_429(send, rejected: AdmissionRejected):
+        body = json.dumps({"detail": str(rejected)}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejected.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
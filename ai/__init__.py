@@ -0,0 +1,19 @@
+"""
+AI module for BGN Provider System
+"""
+
+from .analysis import (
+    ANALYSIS_MODEL, INVENTORY_ANALYSIS_PROMPT, ANALYSIS_GENERATION_CONFIG,
+    AnalysisParseError, gemini_response_schema, parse_analysis, analysis_to_item_fields
+)
+
+__all__ = [
+    # Inventory analysis
+    "ANALYSIS_MODEL",
+    "INVENTORY_ANALYSIS_PROMPT",
+    "ANALYSIS_GENERATION_CONFIG",
+    "AnalysisParseError",
+    "gemini_response_schema",
+    "parse_analysis",
+    "analysis_to_item_fields"
+]
@@ -0,0 +1,115 @@
+"""
+Inventory image analysis with Gemini structured output.
+
+The model is asked for JSON constrained by a response schema derived from
+`AIAnalysisResult`, so the reply is parsed and validated in one pass with
+`AIAnalysisResult.model_validate_json` instead of stripping code fences and
+guessing at number formats.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Type
+
+import google.generativeai as genai
+from pydantic import BaseModel, ValidationError
+
+from database.schemas import AIAnalysisResult
+
+ANALYSIS_MODEL = "gemini-2.0-flash"
+
+# Field descriptions travel in the response schema, so the prompt only sets the task
+INVENTORY_ANALYSIS_PROMPT = """
+Analyze this product image and extract detailed inventory information for a second-hand marketplace listing.
+Be thorough and professional in your analysis. Estimate prices in EUR.
+If a text field cannot be determined from the image, use "Not visible/determinable"; use null for numbers you cannot estimate.
+"""
+
+
+class AnalysisParseError(Exception):
+    """Gemini returned something that does not validate as an AIAnalysisResult"""
+
+    def __init__(self, message: str, raw_text: str):
+        super().__init__(message)
+        self.raw_text = raw_text
+
+
+def gemini_response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Convert a Pydantic model's JSON schema into Gemini's OpenAPI schema subset.
+
+    Gemini accepts only type/description/nullable/enum/items/properties/required,
+    so $refs are inlined, Optional[...] becomes `nullable` and validation
+    keywords such as minimum/maximum are dropped (Pydantic still enforces them).
+    """
+    json_schema = model.model_json_schema()
+    definitions = json_schema.get("$defs", {})
+
+    def convert(node: Dict[str, Any]) -> Dict[str, Any]:
+        description = node.get("description")
+        if "$ref" in node:
+            node = definitions[node["$ref"].split("/")[-1]]
+        nullable = False
+        if "anyOf" in node:
+            options = [option for option in node["anyOf"] if option.get("type") != "null"]
+            nullable = len(options) < len(node["anyOf"])
+            node = options[0]
+            if "$ref" in node:
+                node = definitions[node["$ref"].split("/")[-1]]
+
+        node_type = node.get("type", "string")
+        converted: Dict[str, Any] = {"type": node_type.upper()}
+        if description or node.get("description"):
+            converted["description"] = description or node["description"]
+        if nullable:
+            converted["nullable"] = True
+        if "enum" in node:
+            converted["enum"] = [str(value) for value in node["enum"]]
+        if node_type == "array":
+            converted["items"] = convert(node.get("items", {}))
+        if node_type == "object":
+            converted["properties"] = {name: convert(child) for name, child in node.get("properties", {}).items()}
+            if node.get("required"):
+                converted["required"] = list(node["required"])
+        return converted
+
+    return convert(json_schema)
+
+
+ANALYSIS_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=gemini_response_schema(AIAnalysisResult),
+    temperature=0.2,
+)
+
+
+def parse_analysis(response_text: str) -> AIAnalysisResult:
+    """Parse and validate a structured-output reply in a single pass"""
+    try:
+        return AIAnalysisResult.model_validate_json(response_text)
+    except ValidationError as e:
+        raise AnalysisParseError(f"AI response did not match the analysis schema: {e.error_count()} errors", response_text)
+
+
+def analysis_to_item_fields(result: AIAnalysisResult) -> Dict[str, Any]:
+    """Map a validated analysis onto InventoryItem column values"""
+    price = result.estimated_price_range
+    return {
+        "product_name": result.product_name or "Unknown Product",
+        "description": result.description or "",
+        "category": result.category or "",
+        "subcategory": result.subcategory or "",
+        "brand": result.brand or "",
+        "model_number": result.model_number or "",
+        "condition": result.condition or "",
+        "condition_notes": result.condition_notes or "",
+        "dimensions_estimate": result.dimensions_estimate or "",
+        "color": result.color or "",
+        "material": result.material or "",
+        "estimated_price_min": price.min if price else None,
+        "estimated_price_max": price.max if price else None,
+        "currency": (price.currency if price and price.currency else "EUR")[:3],
+        "marketability_score": result.marketability_score,
+        "key_features": result.key_features,
+        "tags": result.tags,
+        "ai_analysis_raw": result.model_dump(),
+        "analyzed_at": datetime.utcnow(),
+    }
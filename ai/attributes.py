@@ -0,0 +1,177 @@
+"""
+Local image attribute extraction with NumPy.
+
+Runs on the already-decoded PIL image in a few milliseconds, without any
+network call: dominant colors (k-means over a downsampled pixel array, with
+the background cluster detected from the image border), aspect ratio,
+brightness and a pattern score. The results pre-fill `color` and tags when
+Gemini could not determine them and are kept in `ai_analysis_raw`, so search
+filters work even for items the model skipped.
+"""
+
+import colorsys
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List
+
+import numpy as np
+from PIL import Image
+
+# Longest edge of the pixel grid used for clustering
+SAMPLE_SIDE = 64
+COLOR_CLUSTERS = 5
+KMEANS_ITERATIONS = 12
+
+# A cluster covering this share of the border is treated as background
+BACKGROUND_BORDER_SHARE = 0.5
+
+# Gradient magnitude (0-1 scale) above which a pixel counts as an edge
+EDGE_THRESHOLD = 0.08
+PATTERNED_THRESHOLD = 0.25
+
+UNDETERMINED_COLORS = {"", "not visible/determinable", "unknown", "n/a"}
+
+
+@dataclass
+class ImageAttributes:
+    width: int
+    height: int
+    aspect_ratio: float
+    orientation: str
+    brightness: float
+    pattern_score: float
+    is_patterned: bool
+    primary_color: str
+    dominant_colors: List[Dict[str, Any]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def color_name(rgb) -> str:
+    """Map an RGB triple (0-255) to a coarse, search-friendly color name"""
+    r, g, b = (float(channel) / 255.0 for channel in rgb)
+    hue, saturation, value = colorsys.rgb_to_hsv(r, g, b)
+    hue *= 360
+
+    if value < 0.18:
+        return "Black"
+    if saturation < 0.12:
+        return "White" if value > 0.85 else "Gray"
+    if 20 <= hue < 50 and saturation < 0.35 and value > 0.7:
+        return "Beige"
+    if hue < 15 or hue >= 345:
+        return "Red" if value > 0.45 else "Burgundy"
+    if hue < 45:
+        return "Orange" if value > 0.75 and saturation > 0.5 else "Brown"
+    if hue < 70:
+        return "Yellow" if value > 0.6 else "Olive"
+    if hue < 170:
+        return "Green"
+    if hue < 200:
+        return "Teal"
+    if hue < 255:
+        return "Blue" if value > 0.45 else "Navy"
+    if hue < 290:
+        return "Purple"
+    return "Pink"
+
+
+def _kmeans(pixels: np.ndarray, k: int, iterations: int, seed: int = 0):
+    """Plain k-means with k-means++ seeding; returns (centers, labels)"""
+    rng = np.random.default_rng(seed)
+    centers = pixels[[rng.integers(len(pixels))]]
+    for _ in range(1, k):
+        distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = distances.sum()
+        if total == 0:
+            break
+        centers = np.vstack([centers, pixels[rng.choice(len(pixels), p=distances / total)]])
+
+    k = len(centers)
+    labels = np.zeros(len(pixels), dtype=np.intp)
+    for _ in range(iterations):
+        labels = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=pixels[:, c], minlength=k) for c in range(3)], axis=1)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.allclose(updated, centers, atol=0.5):
+            break
+        centers = updated
+    return centers, labels
+
+
+def extract_attributes(image: Image.Image) -> ImageAttributes:
+    """Compute color, shape and texture attributes of a product photo"""
+    width, height = image.size
+    scale = min(1.0, SAMPLE_SIDE / max(width, height, 1))
+    sample_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    sample = image.resize(sample_size, Image.Resampling.BILINEAR, reducing_gap=2.0).convert("RGB")
+    grid = np.asarray(sample, dtype=np.float32)
+    rows, cols = grid.shape[:2]
+    pixels = grid.reshape(-1, 3)
+
+    centers, labels = _kmeans(pixels, COLOR_CLUSTERS, KMEANS_ITERATIONS)
+    shares = np.bincount(labels, minlength=len(centers)) / len(labels)
+
+    # Plain studio backgrounds dominate the border; drop that cluster from the product colors
+    label_grid = labels.reshape(rows, cols)
+    border = np.concatenate([label_grid[0], label_grid[-1], label_grid[1:-1, 0], label_grid[1:-1, -1]])
+    border_counts = np.bincount(border, minlength=len(centers))
+    background = int(border_counts.argmax())
+    if border_counts[background] / len(border) < BACKGROUND_BORDER_SHARE or shares[background] > 0.95:
+        background = -1
+
+    foreground = [index for index in np.argsort(-shares) if index != background and shares[index] > 0]
+    foreground_total = float(sum(shares[index] for index in foreground)) or 1.0
+    dominant_colors = [
+        {
+            "name": color_name(centers[index]),
+            "hex": "#{:02x}{:02x}{:02x}".format(*(int(round(c)) for c in centers[index])),
+            "share": round(float(shares[index]) / foreground_total, 3),
+        }
+        for index in foreground
+    ]
+
+    # Rec. 601 luma, and the share of pixels sitting on a noticeable edge
+    luma = (grid @ np.array([0.299, 0.587, 0.114], dtype=np.float32)) / 255.0
+    gradient = np.abs(np.diff(luma, axis=0))[:, :-1] + np.abs(np.diff(luma, axis=1))[:-1, :]
+    edge_share = float((gradient > EDGE_THRESHOLD).mean()) if gradient.size else 0.0
+    pattern_score = round(min(1.0, edge_share * 2), 3)
+
+    aspect_ratio = round(width / height, 3) if height else 0.0
+    if aspect_ratio > 1.1:
+        orientation = "landscape"
+    elif aspect_ratio < 0.9:
+        orientation = "portrait"
+    else:
+        orientation = "square"
+
+    return ImageAttributes(
+        width=width,
+        height=height,
+        aspect_ratio=aspect_ratio,
+        orientation=orientation,
+        brightness=round(float(luma.mean()), 3),
+        pattern_score=pattern_score,
+        is_patterned=pattern_score >= PATTERNED_THRESHOLD,
+        primary_color=dominant_colors[0]["name"] if dominant_colors else color_name(centers[0]),
+        dominant_colors=dominant_colors,
+    )
+
+
+def apply_local_attributes(fields: Dict[str, Any], attributes: ImageAttributes) -> Dict[str, Any]:
+    """Fill gaps in InventoryItem column values from locally extracted attributes"""
+    if (fields.get("color") or "").strip().lower() in UNDETERMINED_COLORS:
+        fields["color"] = attributes.primary_color
+
+    tags = list(fields.get("tags") or [])
+    existing = {tag.lower() for tag in tags}
+    for tag in (attributes.primary_color.lower(), "patterned" if attributes.is_patterned else "solid"):
+        if tag not in existing:
+            tags.append(tag)
+    fields["tags"] = tags
+
+    raw = dict(fields.get("ai_analysis_raw") or {})
+    raw["local_attributes"] = attributes.to_dict()
+    fields["ai_analysis_raw"] = raw
+    return fields
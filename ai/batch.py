@@ -0,0 +1,147 @@
+"""
+Batched multi-image analysis for bulk onboarding.
+
+Several downscaled images are packed into one Gemini request that shares a
+single prompt, and the model returns a JSON array of analyses tagged with the
+index of the image each one describes. Images whose entry is missing or fails
+validation, or whose whole reply could not be parsed, are retried with the
+regular single-image call, so one bad entry never costs the rest of the
+batch. When Gemini itself is unavailable (breaker open, rate limited,
+retries exhausted) every image in the batch fails with that error instead:
+single calls would only multiply the load on an API that just refused it.
+"""
+
+import asyncio
+import json
+from typing import List, Sequence, Union
+
+import google.generativeai as genai
+from PIL import Image
+from pydantic import Field, ValidationError
+
+from database.schemas import AIAnalysisResult
+from .analysis import (
+    ANALYSIS_MODEL, ANALYSIS_GENERATION_CONFIG, INVENTORY_ANALYSIS_PROMPT,
+    AnalysisParseError, gemini_response_schema, parse_analysis
+)
+from .gateway import gemini_gateway, GeminiUnavailable
+
+# Images per request; larger batches save more prompt tokens but lengthen each call
+BATCH_SIZE = 8
+
+# Gemini tiles images at 768px, so anything larger only adds upload time
+MAX_IMAGE_SIDE = 768
+
+BATCH_ANALYSIS_PROMPT = """
+You are given {count} product images, numbered 0 to {last}. Each image shows a different item.
+Analyze every image separately and extract inventory information for a second-hand marketplace listing.
+Return one JSON object per image, in any order, with "image_index" set to the image's number.
+Be thorough and professional in your analysis. Estimate prices in EUR.
+If a text field cannot be determined from an image, use "Not visible/determinable"; use null for numbers you cannot estimate.
+"""
+
+
+class IndexedAnalysis(AIAnalysisResult):
+    image_index: int = Field(..., description="Number of the image this analysis describes, starting at 0")
+
+
+BATCH_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema={"type": "ARRAY", "items": gemini_response_schema(IndexedAnalysis)},
+    temperature=0.2,
+)
+
+AnalysisOutcome = Union[AIAnalysisResult, Exception]
+
+
+def downscale_for_analysis(image: Image.Image, max_side: int = MAX_IMAGE_SIDE) -> Image.Image:
+    """Return an RGB copy no larger than max_side on its longest edge"""
+    scaled = image.convert("RGB") if image.mode != "RGB" else image.copy()
+    scaled.thumbnail((max_side, max_side))
+    return scaled
+
+
+def parse_batch_analysis(response_text: str, count: int) -> dict:
+    """Map image index -> AIAnalysisResult for every valid entry in a batch reply.
+
+    Invalid, duplicate and out-of-range entries are dropped rather than failing
+    the batch; their images are simply missing from the result.
+    """
+    try:
+        entries = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        raise AnalysisParseError(f"Batch response is not valid JSON: {e}", response_text)
+    if not isinstance(entries, list):
+        raise AnalysisParseError("Batch response is not a JSON array", response_text)
+
+    results = {}
+    for entry in entries:
+        try:
+            indexed = IndexedAnalysis.model_validate(entry)
+        except ValidationError:
+            continue
+        if 0 <= indexed.image_index < count and indexed.image_index not in results:
+            results[indexed.image_index] = AIAnalysisResult.model_validate(
+                indexed.model_dump(exclude={"image_index"})
+            )
+    return results
+
+
+async def analyze_image(image: Image.Image) -> AIAnalysisResult:
+    """Single-image analysis, used as the fallback for batch entries"""
+    response = await gemini_gateway.generate(
+        ANALYSIS_MODEL,
+        [INVENTORY_ANALYSIS_PROMPT, image],
+        generation_config=ANALYSIS_GENERATION_CONFIG,
+        prompt_id="inventory_analysis",
+    )
+    return parse_analysis(response.text)
+
+
+async def _analyze_single_safe(image: Image.Image) -> AnalysisOutcome:
+    try:
+        return await analyze_image(image)
+    except (GeminiUnavailable, AnalysisParseError) as e:
+        return e
+
+
+async def _analyze_chunk(images: Sequence[Image.Image]) -> List[AnalysisOutcome]:
+    contents: list = [BATCH_ANALYSIS_PROMPT.format(count=len(images), last=len(images) - 1)]
+    for index, image in enumerate(images):
+        contents += [f"Image {index}:", image]
+
+    try:
+        response = await gemini_gateway.generate(
+            ANALYSIS_MODEL, contents,
+            generation_config=BATCH_GENERATION_CONFIG,
+            prompt_id="inventory_analysis_batch",
+            cost=len(images),
+        )
+    except GeminiUnavailable as e:
+        print(f"Batch analysis of {len(images)} images failed ({e}), not retrying them individually")
+        return [e] * len(images)
+
+    try:
+        parsed = parse_batch_analysis(response.text, len(images))
+    except AnalysisParseError as e:
+        print(f"Batch analysis reply for {len(images)} images was unusable ({e}), falling back to single calls")
+        parsed = {}
+
+    missing = [index for index in range(len(images)) if index not in parsed]
+    if missing and parsed:
+        print(f"Batch analysis missed {len(missing)}/{len(images)} images, retrying them individually")
+    retried = await asyncio.gather(*(_analyze_single_safe(images[index]) for index in missing))
+    parsed.update(zip(missing, retried))
+    return [parsed[index] for index in range(len(images))]
+
+
+async def analyze_images(images: Sequence[Image.Image], batch_size: int = BATCH_SIZE) -> List[AnalysisOutcome]:
+    """Analyze many images with one Gemini request per `batch_size` images.
+
+    Returns one entry per input image, in order: an AIAnalysisResult, or the
+    exception that prevented analyzing that image.
+    """
+    scaled = [downscale_for_analysis(image) for image in images]
+    chunks = [scaled[start:start + batch_size] for start in range(0, len(scaled), batch_size)]
+    chunk_results = await asyncio.gather(*(_analyze_chunk(chunk) for chunk in chunks))
+    return [outcome for chunk in chunk_results for outcome in chunk]
@@ -0,0 +1,141 @@
+"""
+Tiered model cascade for inventory analysis.
+
+Every image is first analyzed by a cheaper, faster model. Its answer is kept
+when it is confident and complete; otherwise the image is escalated to the
+full analysis model. The model rates its own confidence, and that rating is
+capped by how many of the listing's key fields it could actually determine,
+so a self-assured answer full of "Not visible/determinable" still escalates.
+The final score is stored in `InventoryItem.confidence_score`.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import google.generativeai as genai
+from PIL import Image
+from pydantic import Field
+
+from database.schemas import AIAnalysisResult
+from .analysis import (
+    ANALYSIS_MODEL, INVENTORY_ANALYSIS_PROMPT,
+    AnalysisParseError, gemini_response_schema
+)
+from .gateway import gemini_gateway, GeminiUnavailable
+from .singleflight import request_key
+
+CHEAP_MODEL = os.getenv("GEMINI_CHEAP_MODEL", "gemini-2.0-flash-lite")
+
+# Cheap-tier answers scoring below this are re-run on ANALYSIS_MODEL
+CONFIDENCE_THRESHOLD = float(os.getenv("ANALYSIS_CONFIDENCE_THRESHOLD", "0.7"))
+
+# Fields a listing is useless without; if any is undeterminable, escalate
+REQUIRED_FIELDS = ("product_name", "category", "condition")
+
+# Fields that count towards completeness
+KEY_FIELDS = REQUIRED_FIELDS + (
+    "subcategory", "description", "brand", "color", "material", "estimated_price_range",
+)
+
+UNDETERMINED_VALUES = {"", "not visible/determinable", "unknown", "unknown product", "n/a"}
+
+CASCADE_PROMPT = INVENTORY_ANALYSIS_PROMPT + """
+Also rate your overall confidence in this analysis from 0 to 1.
+"""
+
+
+class ScoredAnalysis(AIAnalysisResult):
+    confidence: Optional[float] = Field(
+        None, ge=0, le=1, description="Confidence in the analysis, 0 (guess) to 1 (certain)"
+    )
+
+
+CASCADE_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=gemini_response_schema(ScoredAnalysis),
+    temperature=0.2,
+)
+
+
+@dataclass
+class CascadeResult:
+    analysis: AIAnalysisResult
+    confidence: float
+    model: str
+    escalated: bool
+
+
+def _is_determined(value) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return value.strip().lower() not in UNDETERMINED_VALUES
+    if hasattr(value, "min"):
+        return value.min is not None or value.max is not None
+    return True
+
+
+def completeness(analysis: AIAnalysisResult) -> float:
+    """Fraction of KEY_FIELDS the analysis could determine"""
+    determined = sum(1 for name in KEY_FIELDS if _is_determined(getattr(analysis, name)))
+    return determined / len(KEY_FIELDS)
+
+
+def analysis_confidence(analysis: AIAnalysisResult) -> float:
+    """Self-reported confidence capped by completeness (completeness alone if not reported)"""
+    score = completeness(analysis)
+    reported = getattr(analysis, "confidence", None)
+    if reported is not None:
+        score = min(score, reported)
+    return round(score, 3)
+
+
+def needs_escalation(analysis: AIAnalysisResult, confidence: float) -> bool:
+    if confidence < CONFIDENCE_THRESHOLD:
+        return True
+    return not all(_is_determined(getattr(analysis, name)) for name in REQUIRED_FIELDS)
+
+
+def _parse_scored(response_text: str) -> ScoredAnalysis:
+    try:
+        return ScoredAnalysis.model_validate_json(response_text)
+    except ValueError as e:
+        raise AnalysisParseError(f"AI response did not match the analysis schema: {e}", response_text)
+
+
+async def _run_tier(model_name: str, image: Image.Image, image_bytes: Optional[bytes]) -> ScoredAnalysis:
+    coalesce_key = None
+    if image_bytes is not None:
+        coalesce_key = request_key(model_name, CASCADE_PROMPT, image_bytes, CASCADE_GENERATION_CONFIG)
+    response = await gemini_gateway.generate(
+        model_name,
+        [CASCADE_PROMPT, image],
+        generation_config=CASCADE_GENERATION_CONFIG,
+        coalesce_key=coalesce_key,
+        prompt_id="inventory_analysis_cascade",
+    )
+    return _parse_scored(response.text)
+
+
+async def analyze_with_cascade(image: Image.Image, image_bytes: Optional[bytes] = None) -> CascadeResult:
+    """Analyze with CHEAP_MODEL, escalating to ANALYSIS_MODEL when the answer is weak.
+
+    `image_bytes` (the raw upload) enables coalescing of identical concurrent
+    requests. A cheap-tier failure escalates; a failure of the final tier is
+    raised (GeminiUnavailable or AnalysisParseError).
+    """
+    escalated = False
+    if CHEAP_MODEL and CHEAP_MODEL != ANALYSIS_MODEL:
+        escalated = True
+        try:
+            cheap = await _run_tier(CHEAP_MODEL, image, image_bytes)
+            confidence = analysis_confidence(cheap)
+            if not needs_escalation(cheap, confidence):
+                return CascadeResult(cheap, confidence, CHEAP_MODEL, escalated=False)
+            print(f"Escalating analysis to {ANALYSIS_MODEL}: {CHEAP_MODEL} confidence {confidence:.2f}")
+        except (GeminiUnavailable, AnalysisParseError) as e:
+            print(f"Escalating analysis to {ANALYSIS_MODEL}: {CHEAP_MODEL} failed ({e})")
+
+    full = await _run_tier(ANALYSIS_MODEL, image, image_bytes)
+    return CascadeResult(full, analysis_confidence(full), ANALYSIS_MODEL, escalated)
@@ -0,0 +1,177 @@
+"""
+Text embeddings for semantic inventory search.
+
+An embedder turns an item's text fields (or a search query) into an
+L2-normalized float32 vector, so cosine similarity is a plain dot product.
+EMBEDDING_BACKEND selects the implementation:
+
+- `gemini` (default when GOOGLE_API_KEY is set): Gemini's text-embedding
+  model, truncated to EMBEDDING_DIM. Calls go through `gemini_gateway`:
+  item embeddings share the analysis rate limit and fair queue, while
+  search queries use the gateway's separate query limits.
+- `local` (default otherwise): a deterministic feature-hashing embedder with
+  no network calls. It only captures shared words and word fragments, not
+  meaning, and stands in for the real model in tests, benchmarks and
+  offline development.
+
+Vectors from different embedders are not comparable, so each stored vector
+records the `name` of the embedder that produced it.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from .gateway import gemini_gateway
+
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+
+# Fields embedded for each item, most descriptive first
+ITEM_TEXT_FIELDS = ("product_name", "category", "subcategory", "brand", "color", "material", "description")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def item_text(item) -> str:
+    """Text embedded for an inventory item (model instance or dict of its fields)"""
+    get = item.get if isinstance(item, dict) else lambda field: getattr(item, field, None)
+    parts = [str(get(field)) for field in ITEM_TEXT_FIELDS if get(field)]
+    for field in ("key_features", "tags"):
+        values = get(field)
+        if values:
+            parts.append(", ".join(str(value) for value in values))
+    return ". ".join(parts)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length; all-zero rows stay zero"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class Embedder(ABC):
+    name = "base"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    @abstractmethod
+    async def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 matrix of unit vectors for items being indexed"""
+
+    @abstractmethod
+    async def embed_query(self, text: str) -> np.ndarray:
+        """Unit vector for a search query"""
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic bag of words and character trigrams, hashed into `dim` signed buckets"""
+
+    name = "local-hashing-v1"
+
+    # Trigrams let "sweaters" land near "sweater" without a stemmer
+    TRIGRAM_WEIGHT = 0.5
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        super().__init__(dim)
+        self._buckets = {}
+
+    def _bucket(self, feature: str):
+        cached = self._buckets.get(feature)
+        if cached is None:
+            # blake2b rather than hash(): identical across processes and restarts
+            value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            cached = (value % self.dim, 1.0 if value >> 63 else -1.0)
+            if len(self._buckets) < 200_000:
+                self._buckets[feature] = cached
+        return cached
+
+    def _features(self, text: str) -> Iterable:
+        for word in _TOKEN.findall(text.lower()):
+            yield word, 1.0
+            padded = f"#{word}#"
+            for start in range(len(padded) - 2):
+                yield "3:" + padded[start:start + 3], self.TRIGRAM_WEIGHT
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) matrix of unit vectors (blocking; CPU only)"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, values = [], []
+            for feature, weight in self._features(text or ""):
+                index, sign = self._bucket(feature)
+                indices.append(index)
+                values.append(sign * weight)
+            if indices:
+                np.add.at(vectors[row], indices, values)
+        return normalize(vectors)
+
+    async def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.embed, texts)
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        return (await asyncio.to_thread(self.embed, [text]))[0]
+
+
+class GeminiEmbedder(Embedder):
+    """Gemini text embeddings; vectors are truncated to `dim` and renormalized"""
+
+    # Texts per embed_content request
+    BATCH_SIZE = 100
+
+    def __init__(self, model: str, dim: int = EMBEDDING_DIM):
+        super().__init__(dim)
+        self.model = model
+        self.name = f"{model.split('/')[-1]}:{dim}"
+
+    async def _embed(self, texts: List[str], is_query: bool) -> np.ndarray:
+        rows = []
+        for start in range(0, len(texts), self.BATCH_SIZE):
+            chunk = [text or " " for text in texts[start:start + self.BATCH_SIZE]]
+            result = await gemini_gateway.embed(
+                self.model,
+                chunk,
+                task_type="retrieval_query" if is_query else "retrieval_document",
+                output_dimensionality=self.dim,
+                interactive=is_query,
+            )
+            rows.extend(result["embedding"])
+        return normalize(np.asarray(rows, dtype=np.float32).reshape(len(texts), self.dim))
+
+    async def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return await self._embed(texts, False)
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        return (await self._embed([text], True))[0]
+
+
+_embedder: Optional[Embedder] = None
+
+
+def get_embedder() -> Embedder:
+    """Embedder chosen by EMBEDDING_BACKEND, created on first use"""
+    global _embedder
+    if _embedder is None:
+        default = "gemini" if os.getenv("GOOGLE_API_KEY") else "local"
+        backend = os.getenv("EMBEDDING_BACKEND", default).lower()
+        if backend == "gemini":
+            _embedder = GeminiEmbedder(os.getenv("EMBEDDING_MODEL", "models/text-embedding-004"))
+        elif backend == "local":
+            print("Warning: semantic search is using the local hashing embedder, which matches words, not meaning. "
+                  "Set GOOGLE_API_KEY or EMBEDDING_BACKEND=gemini for real embeddings.")
+            _embedder = HashingEmbedder()
+        else:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    return _embedder
+
+
+def set_embedder(embedder: Embedder):
+    """Replace the process-wide embedder (tests and benchmarks)"""
+    global _embedder
+    _embedder = embedder
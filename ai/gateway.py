@@ -0,0 +1,524 @@
+"""
+Shared gateway for all Gemini calls.
+
+Every `generate_content` and `embed_content` call in the API goes through
+`gemini_gateway`, which adds:
+
+- a token-bucket rate limiter sized to our quota, so bursts queue briefly
+  instead of turning into 429s from the API;
+- per-call timeouts and deadline-aware retries with full-jitter exponential
+  backoff for transient errors (429, 500, 503, 504, timeouts);
+- a circuit breaker that fails fast while the API is degraded and lets a
+  single probe through after a cool-down;
+- fair queuing across providers (see scheduler.py), streams included;
+- a separate rate limit, concurrency limit and shorter deadline for query
+  embeddings made while a customer waits (`embed(..., interactive=True)`),
+  so queued upload analysis cannot delay search;
+- a ledger entry per attempt with token usage, latency and outcome (see ledger.py).
+
+Limits are read from the environment (see `GeminiGateway.from_env`).
+"""
+
+import asyncio
+import contextlib
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Optional
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from .ledger import AICallLedger, ai_call_ledger, current_call_context
+from .scheduler import FairScheduler, SchedulerTimeout
+from .singleflight import SingleFlight
+
+# Errors worth retrying; anything else (bad request, permission denied...) fails immediately
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+    asyncio.TimeoutError,
+)
+
+
+def _chunk_text(chunk) -> str:
+    # Chunks without text parts (e.g. a final safety or usage-only chunk) raise on .text
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+class GeminiUnavailable(Exception):
+    """Gemini could not serve the request within its deadline"""
+
+    def __init__(self, message: str, retry_after: float = 1.0, status_code: int = 503):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after + 0.999))
+        self.status_code = status_code
+
+    def to_http_exception(self):
+        from fastapi import HTTPException
+        return HTTPException(
+            status_code=self.status_code,
+            detail=str(self),
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `capacity`.
+
+    Callers reserve a token (the balance may go negative) and sleep until it
+    becomes valid, which queues requests fairly in arrival order without a lock;
+    all bookkeeping happens synchronously on the event loop thread.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Reserve a token; return seconds to wait, or None if that exceeds max_wait"""
+        now = time.monotonic()
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+    async def acquire(self, max_wait: float) -> bool:
+        wait = self.reserve(max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def release_probe(self):
+        """Let another call probe; for a probe that ended without telling whether the API recovered"""
+        self.probe_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+
+class GeminiGateway:
+    def __init__(
+        self,
+        requests_per_minute: float = 1000,
+        burst: int = 20,
+        max_attempts: int = 4,
+        base_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        call_timeout: float = 30.0,
+        deadline: float = 60.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        ledger: Optional[AICallLedger] = None,
+        scheduler: Optional[FairScheduler] = None,
+        query_requests_per_minute: float = 600,
+        query_burst: int = 20,
+        query_deadline: float = 5.0,
+        query_scheduler: Optional[FairScheduler] = None,
+    ):
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.singleflight = SingleFlight()
+        self.ledger = ledger
+        self.scheduler = scheduler
+        self.query_bucket = TokenBucket(query_requests_per_minute / 60.0, query_burst)
+        self.query_deadline = query_deadline
+        self.query_scheduler = query_scheduler
+
+    @classmethod
+    def from_env(cls, ledger: Optional[AICallLedger] = None) -> "GeminiGateway":
+        query_concurrency = int(os.getenv("GEMINI_QUERY_MAX_CONCURRENCY", "8"))
+        return cls(
+            ledger=ledger,
+            scheduler=FairScheduler(
+                max_concurrency=int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "16")),
+                per_key_limit=int(os.getenv("ANALYSIS_PROVIDER_MAX_CONCURRENCY", "4")),
+            ),
+            requests_per_minute=float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "1000")),
+            burst=int(os.getenv("GEMINI_BURST", "20")),
+            max_attempts=int(os.getenv("GEMINI_MAX_ATTEMPTS", "4")),
+            call_timeout=float(os.getenv("GEMINI_CALL_TIMEOUT_SECONDS", "30")),
+            deadline=float(os.getenv("GEMINI_DEADLINE_SECONDS", "60")),
+            failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+            recovery_timeout=float(os.getenv("GEMINI_BREAKER_RECOVERY_SECONDS", "30")),
+            query_scheduler=FairScheduler(max_concurrency=query_concurrency, per_key_limit=query_concurrency),
+            query_requests_per_minute=float(os.getenv("GEMINI_QUERY_REQUESTS_PER_MINUTE", "600")),
+            query_burst=int(os.getenv("GEMINI_QUERY_BURST", "20")),
+            query_deadline=float(os.getenv("GEMINI_QUERY_DEADLINE_SECONDS", "5")),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform over [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    async def generate(
+        self,
+        model_name: str,
+        contents: Any,
+        generation_config: Any = None,
+        deadline: Optional[float] = None,
+        coalesce_key: Optional[str] = None,
+        prompt_id: Optional[str] = None,
+        cost: float = 1.0,
+    ):
+        """Call `generate_content` with rate limiting, retries and the circuit breaker.
+
+        Concurrent calls sharing a `coalesce_key` (see `singleflight.request_key`)
+        are served by a single upstream call. Calls are queued fairly per
+        provider (from `ai_call_context`); `cost` is the call's share of that
+        queue, e.g. the number of images in a batch request. Every attempt is
+        recorded in the ledger under `prompt_id`. The deadline covers the
+        whole call, time spent queued included.
+        """
+        expires = time.monotonic() + (deadline or self.deadline)
+        return await self.singleflight.do(
+            coalesce_key,
+            lambda: self._scheduled(
+                self.scheduler, cost, expires,
+                lambda slot: self._generate(model_name, contents, generation_config, expires, prompt_id, slot),
+            ),
+        )
+
+    async def _scheduled(self, scheduler: Optional[FairScheduler], cost: float, expires: float, call):
+        async with self._slot(scheduler, cost, expires) as slot:
+            return await call(slot)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, scheduler: Optional[FairScheduler], cost: float, expires: float):
+        """Hold a scheduler slot for the current provider; yields None without a scheduler"""
+        if scheduler is None:
+            yield None
+            return
+        provider_id = current_call_context().get("provider_id")
+        slot = scheduler.slot(provider_id, cost, timeout=max(0.0, expires - time.monotonic()))
+        try:
+            await slot.__aenter__()
+        except SchedulerTimeout as e:
+            raise GeminiUnavailable(
+                f"Too much AI work queued, please retry later ({e})",
+                retry_after=self.base_backoff * 4,
+                status_code=429,
+            )
+        try:
+            yield slot
+        finally:
+            await slot.__aexit__(None, None, None)
+
+    def _record(self, model_name: str, prompt_id: Optional[str], outcome: str, started: float, attempt: int, **kwargs):
+        if self.ledger is not None:
+            self.ledger.record(
+                model_name, outcome, time.monotonic() - started, prompt_id=prompt_id, attempt=attempt, **kwargs
+            )
+
+    async def _admit(
+        self, model_name: str, prompt_id: Optional[str], attempt: int, expires: float, bucket: Optional[TokenBucket] = None
+    ):
+        """Pass the circuit breaker and rate limiter (`bucket`, by default the shared one), or raise GeminiUnavailable.
+
+        Returns whether this call is the breaker's half-open probe; the caller
+        must settle it with record_success, _record_failure or release_probe.
+        """
+        bucket = bucket or self.bucket
+        started = time.monotonic()
+        if not self.breaker.allow():
+            self._record(model_name, prompt_id, "rejected", started, attempt + 1)
+            raise GeminiUnavailable(
+                "AI service is temporarily unavailable, please retry later",
+                retry_after=self.breaker.retry_after(),
+            )
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+        remaining = expires - time.monotonic()
+        try:
+            admitted = await bucket.acquire(max_wait=max(0.0, remaining - 1.0))
+        except asyncio.CancelledError:
+            if probe:
+                self.breaker.release_probe()
+            raise
+        if not admitted:
+            # Release a half-open probe slot we could not use
+            if probe:
+                self.breaker.release_probe()
+            self._record(model_name, prompt_id, "rejected", started, attempt + 1)
+            raise GeminiUnavailable(
+                "AI request rate limit reached, please retry later",
+                retry_after=1.0 / bucket.rate,
+                status_code=429,
+            )
+        return probe
+
+    def _record_failure(self, model_name: str, prompt_id: Optional[str], error: Exception, started: float, attempt: int):
+        if isinstance(error, RETRYABLE_ERRORS):
+            self.breaker.record_failure()
+        else:
+            # Not a capacity problem; don't count it against the breaker
+            self.breaker.release_probe()
+        timed_out = isinstance(error, (asyncio.TimeoutError, google_exceptions.DeadlineExceeded))
+        self._record(model_name, prompt_id, "timeout" if timed_out else "failed", started, attempt + 1, error=error)
+
+    async def _wait_before_retry(self, attempt: int, expires: float, error: Exception, slot=None) -> bool:
+        """Sleep before the next attempt; False if attempts or deadline are exhausted.
+
+        A scheduler slot is given up for the sleep, so other providers' calls
+        run meanwhile, and queued for again before the retry.
+        """
+        sleep = self._backoff(attempt)
+        if attempt + 1 >= self.max_attempts or time.monotonic() + sleep >= expires:
+            return False
+        print(f"Gemini call failed ({type(error).__name__}), retry {attempt + 1} in {sleep:.2f}s")
+        if slot is None:
+            await asyncio.sleep(sleep)
+        else:
+            await slot.pause(sleep, timeout=max(0.0, expires - time.monotonic() - sleep))
+        return True
+
+    @staticmethod
+    def _exhausted(error: Optional[Exception], retry_after: float) -> GeminiUnavailable:
+        return GeminiUnavailable(
+            f"AI service did not respond successfully: {type(error).__name__}: {error}",
+            retry_after=retry_after,
+        )
+
+    async def _generate(
+        self,
+        model_name: str,
+        contents: Any,
+        generation_config: Any,
+        expires: float,
+        prompt_id: Optional[str],
+        slot=None,
+    ):
+        model = genai.GenerativeModel(model_name, generation_config=generation_config)
+        return await self._call(
+            model_name, expires, prompt_id, slot,
+            lambda timeout: model.generate_content_async(contents, request_options={"timeout": timeout}),
+        )
+
+    async def embed(
+        self,
+        model_name: str,
+        content: Any,
+        deadline: Optional[float] = None,
+        prompt_id: Optional[str] = "embedding",
+        cost: float = 1.0,
+        interactive: bool = False,
+        **kwargs,
+    ):
+        """Call `embed_content` with the same rate limiting, retries, circuit breaker and queuing as `generate`.
+
+        `interactive` calls (a search query a customer is waiting on) use the
+        query rate limit and concurrency limit instead of the analysis ones,
+        and default to the shorter query deadline. Extra keyword arguments
+        (task_type, output_dimensionality...) are passed through.
+        """
+        if interactive:
+            scheduler, bucket, deadline = self.query_scheduler, self.query_bucket, deadline or self.query_deadline
+        else:
+            scheduler, bucket = self.scheduler, self.bucket
+        expires = time.monotonic() + (deadline or self.deadline)
+        return await self._scheduled(
+            scheduler, cost, expires,
+            lambda slot: self._call(
+                model_name, expires, prompt_id, slot,
+                lambda timeout: genai.embed_content_async(
+                    model=model_name, content=content, request_options={"timeout": timeout}, **kwargs
+                ),
+                bucket,
+            ),
+        )
+
+    async def _call(
+        self, model_name: str, expires: float, prompt_id: Optional[str], slot, request, bucket: Optional[TokenBucket] = None
+    ):
+        """Run `request(timeout)` until it succeeds, fails for good or the deadline passes"""
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_attempts):
+            probe = await self._admit(model_name, prompt_id, attempt, expires, bucket)
+
+            timeout = min(self.call_timeout, max(0.1, expires - time.monotonic()))
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(request(timeout), timeout=timeout)
+                self.breaker.record_success()
+                self._record(
+                    model_name, prompt_id, "success", started, attempt + 1,
+                    usage=getattr(response, "usage_metadata", None),
+                )
+                return response
+            except asyncio.CancelledError:
+                # The caller gave up (client disconnect, outer timeout); says nothing about the API
+                if probe:
+                    self.breaker.release_probe()
+                self._record(model_name, prompt_id, "cancelled", started, attempt + 1)
+                raise
+            except Exception as e:
+                self._record_failure(model_name, prompt_id, e, started, attempt)
+                if not isinstance(e, RETRYABLE_ERRORS):
+                    raise
+                last_error = e
+
+            if not await self._wait_before_retry(attempt, expires, last_error, slot):
+                break
+
+        raise self._exhausted(last_error, self.base_backoff * 2)
+
+    async def generate_stream(
+        self,
+        model_name: str,
+        contents: Any,
+        generation_config: Any = None,
+        deadline: Optional[float] = None,
+        prompt_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Stream the text of a `generate_content` call chunk by chunk.
+
+        The stream holds a fair-queue slot (see `generate`) from the first
+        attempt until it ends. Rate limiting, the circuit breaker and retries
+        apply until the first chunk arrives; after that an error ends the
+        stream. Each chunk must arrive within `call_timeout`. The whole stream
+        is one ledger entry.
+        """
+        expires = time.monotonic() + (deadline or self.deadline)
+        model = genai.GenerativeModel(model_name, generation_config=generation_config)
+        last_error: Optional[Exception] = None
+        chunks = first = None
+        # The stream is usually drained outside the caller's ai_call_context block
+        call_context = current_call_context()
+        async with self._slot(self.scheduler, 1.0, expires) as slot:
+            for attempt in range(self.max_attempts):
+                probe = await self._admit(model_name, prompt_id, attempt, expires)
+
+                timeout = min(self.call_timeout, max(0.1, expires - time.monotonic()))
+                started = time.monotonic()
+                try:
+                    response = await asyncio.wait_for(
+                        model.generate_content_async(contents, stream=True, request_options={"timeout": timeout}),
+                        timeout=timeout,
+                    )
+                    chunks = response.__aiter__()
+                    first = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                    break
+                except StopAsyncIteration:
+                    break
+                except (asyncio.CancelledError, GeneratorExit):
+                    if probe:
+                        self.breaker.release_probe()
+                    self._record(model_name, prompt_id, "cancelled", started, attempt + 1, context=call_context)
+                    raise
+                except Exception as e:
+                    self._record_failure(model_name, prompt_id, e, started, attempt)
+                    if not isinstance(e, RETRYABLE_ERRORS):
+                        raise
+                    last_error = e
+                    chunks = None
+
+                if not await self._wait_before_retry(attempt, expires, last_error, slot):
+                    break
+
+            if chunks is None:
+                raise self._exhausted(last_error, self.base_backoff * 2)
+
+            self.breaker.record_success()
+            usage = getattr(first, "usage_metadata", None)
+            outcome, error = "success", None
+            try:
+                chunk = first
+                while chunk is not None:
+                    text = _chunk_text(chunk)
+                    if text:
+                        yield text
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.call_timeout)
+                    except StopAsyncIteration:
+                        chunk = None
+                    else:
+                        usage = getattr(chunk, "usage_metadata", None) or usage
+            except (asyncio.CancelledError, GeneratorExit):
+                # Client went away mid-stream
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                outcome, error = "failed", e
+                raise
+            finally:
+                self._record(
+                    model_name, prompt_id, outcome, started, attempt + 1,
+                    usage=usage, error=error, context=call_context,
+                )
+
+    def stats(self) -> dict:
+        return {
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "tokens_available": round(self.bucket.tokens, 2),
+            **self.singleflight.stats(),
+            "scheduler": self.scheduler.stats() if self.scheduler is not None else None,
+            "query_tokens_available": round(self.query_bucket.tokens, 2),
+            "query_scheduler": self.query_scheduler.stats() if self.query_scheduler is not None else None,
+        }
+
+
+# Shared instance used by all routes
+gemini_gateway = GeminiGateway.from_env(ledger=ai_call_ledger)
@@ -0,0 +1,205 @@
+"""
+Accounting of every upstream AI call.
+
+The Gemini gateway records each attempt (model, prompt id, token usage from
+`response.usage_metadata`, latency and outcome) into an in-memory buffer.
+A background task flushes the buffer to `ai_call_ledger` in batches with
+`bulk_load`, so recording never adds a database round trip to a request.
+Which endpoint and provider a call belongs to comes from `ai_call_context`,
+set by the route around its model calls.
+
+Aggregates per endpoint, provider and model are served by GET /admin/ai-usage.
+"""
+
+import asyncio
+import contextlib
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database.bulk import bulk_load
+from database.database import engine
+from database.models import AICallRecord
+
+# USD per million tokens (input, output); update when pricing changes
+MODEL_PRICES_PER_MILLION = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+}
+
+_call_context: ContextVar[Dict[str, Any]] = ContextVar("ai_call_context", default={})
+
+
+@contextlib.contextmanager
+def ai_call_context(endpoint: str, provider_id=None):
+    """Attribute model calls made inside the block to an endpoint and provider"""
+    token = _call_context.set({"endpoint": endpoint, "provider_id": provider_id})
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def current_call_context() -> Dict[str, Any]:
+    return _call_context.get()
+
+
+def estimate_cost(model: str, input_tokens: Optional[int], output_tokens: Optional[int]) -> Optional[float]:
+    prices = MODEL_PRICES_PER_MILLION.get(model)
+    if prices is None or input_tokens is None:
+        return None
+    return round((input_tokens * prices[0] + (output_tokens or 0) * prices[1]) / 1_000_000, 8)
+
+
+class AICallLedger:
+    """Write-behind buffer for AICallRecord rows"""
+
+    def __init__(self, flush_interval: float = 2.0, batch_size: int = 500, max_buffer: int = 20_000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(
+        self,
+        model: str,
+        outcome: str,
+        latency_s: float,
+        prompt_id: Optional[str] = None,
+        usage: Any = None,
+        error: Optional[BaseException] = None,
+        attempt: int = 1,
+        context: Optional[Dict[str, Any]] = None,
+    ):
+        """Buffer one call; `usage` is the response's usage_metadata.
+
+        `context` overrides the current ai_call_context, for calls that finish
+        outside the block that started them (streams).
+        """
+        context = context if context is not None else _call_context.get()
+        input_tokens = getattr(usage, "prompt_token_count", None)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        row = {
+            "id": uuid.uuid4(),
+            "created_at": datetime.utcnow(),
+            "endpoint": context.get("endpoint"),
+            "provider_id": context.get("provider_id"),
+            "model": model,
+            "prompt_id": prompt_id,
+            "attempt": attempt,
+            "outcome": outcome,
+            "error_type": type(error).__name__ if error is not None else None,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": getattr(usage, "total_token_count", None),
+            "latency_ms": round(latency_s * 1000, 2),
+            "cost_usd": estimate_cost(model, input_tokens, output_tokens),
+        }
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                # Database unreachable for a long time; keep memory bounded
+                self._buffer.pop(0)
+                self.dropped += 1
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+
+    def flush(self, bind=None) -> int:
+        """Write buffered rows now (blocking); returns the number written"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        bind = bind if bind is not None else engine
+        try:
+            bulk_load(bind, AICallRecord, rows, chunk_size=self.batch_size * 4)
+        except Exception as e:
+            # Requeue for the next flush; rows already written are skipped on retry (same ids)
+            print(f"AI call ledger flush failed, keeping {len(rows)} records for retry: {e}")
+            with self._lock:
+                room = self.max_buffer - len(self._buffer)
+                kept = rows[-room:] if room > 0 else []
+                self.dropped += len(rows) - len(kept)
+                self._buffer = kept + self._buffer
+            return 0
+        self.written += len(rows)
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await asyncio.to_thread(self.flush)
+
+    def start(self):
+        """Start the background flusher on the running event loop"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._buffer), "written": self.written, "dropped": self.dropped}
+
+
+def get_ai_usage(db: Session, since: datetime) -> Dict[str, Any]:
+    """Call counts, tokens, cost and latency since `since`, grouped several ways"""
+    metrics = [
+        func.count().label("calls"),
+        func.count().filter(AICallRecord.outcome == "success").label("successful_calls"),
+        func.coalesce(func.sum(AICallRecord.input_tokens), 0).label("input_tokens"),
+        func.coalesce(func.sum(AICallRecord.output_tokens), 0).label("output_tokens"),
+        func.coalesce(func.sum(AICallRecord.cost_usd), 0.0).label("cost_usd"),
+        func.avg(AICallRecord.latency_ms).label("avg_latency_ms"),
+        func.percentile_cont(0.95).within_group(AICallRecord.latency_ms).label("p95_latency_ms"),
+    ]
+
+    def grouped(*columns) -> List[Dict[str, Any]]:
+        query = db.query(*columns, *metrics).filter(AICallRecord.created_at >= since)
+        if columns:
+            query = query.group_by(*columns).order_by(func.sum(AICallRecord.cost_usd).desc().nullslast())
+        rows = []
+        for row in query.all():
+            entry = dict(row._mapping)
+            for key in ("avg_latency_ms", "p95_latency_ms"):
+                entry[key] = round(entry[key], 1) if entry[key] is not None else None
+            entry["cost_usd"] = round(float(entry["cost_usd"]), 6)
+            if entry.get("provider_id") is not None:
+                entry["provider_id"] = str(entry["provider_id"])
+            rows.append(entry)
+        return rows
+
+    return {
+        "since": since.isoformat() + "Z",
+        "totals": grouped()[0],
+        "by_endpoint": grouped(AICallRecord.endpoint),
+        "by_provider": grouped(AICallRecord.provider_id),
+        "by_model": grouped(AICallRecord.model, AICallRecord.prompt_id),
+        "by_outcome": grouped(AICallRecord.outcome, AICallRecord.error_type),
+    }
+
+
+# Shared instance used by the Gemini gateway
+ai_call_ledger = AICallLedger()
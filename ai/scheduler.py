@@ -0,0 +1,172 @@
+"""
+Fair-share scheduling of model calls across providers.
+
+Each provider gets its own FIFO queue. Free slots are handed out by deficit
+round robin: every visit tops up a provider's deficit by `quantum * weight`,
+and a job is started once the deficit covers its cost (a batch request costs
+one unit per image). A per-provider concurrency cap stops one provider from
+occupying every slot, so a provider uploading a single image waits at most
+about one round even while another provider's bulk upload drains.
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Hashable, Optional
+
+UNATTRIBUTED = "unattributed"
+
+
+class SchedulerTimeout(Exception):
+    """A job waited longer than its timeout for a slot"""
+
+
+@dataclass
+class _Job:
+    future: asyncio.Future
+    cost: float
+
+
+@dataclass
+class _ProviderQueue:
+    weight: float = 1.0
+    deficit: float = 0.0
+    in_flight: int = 0
+    jobs: Deque[_Job] = field(default_factory=deque)
+
+
+class FairScheduler:
+    def __init__(self, max_concurrency: int, per_key_limit: int, quantum: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.per_key_limit = per_key_limit
+        self.quantum = quantum
+        self.in_flight = 0
+        self._queues: Dict[Hashable, _ProviderQueue] = {}
+        self._weights: Dict[Hashable, float] = {}
+        # Keys with waiting jobs, in round-robin order
+        self._active: Deque[Hashable] = deque()
+
+    def set_weight(self, key: Hashable, weight: float):
+        """Give a provider a larger (or smaller) share; default weight is 1"""
+        self._weights[key] = weight
+        if key in self._queues:
+            self._queues[key].weight = weight
+
+    async def acquire(self, key: Optional[Hashable], cost: float = 1.0, timeout: Optional[float] = None) -> Hashable:
+        """Wait for a slot; returns the key to pass to `release`"""
+        key = key if key is not None else UNATTRIBUTED
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _ProviderQueue(weight=self._weights.get(key, 1.0))
+        job = _Job(asyncio.get_running_loop().create_future(), cost)
+        queue.jobs.append(job)
+        if key not in self._active:
+            self._active.append(key)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(job.future), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if job.future.done() and not job.future.cancelled():
+                # Granted just as we gave up
+                self.release(key)
+            else:
+                job.future.cancel()
+                queue.jobs.remove(job)
+                self._forget_if_idle(key)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise SchedulerTimeout(f"No analysis slot within {timeout:.0f}s")
+        return key
+
+    def release(self, key: Hashable):
+        queue = self._queues[key]
+        queue.in_flight -= 1
+        self.in_flight -= 1
+        self._forget_if_idle(key)
+        self._dispatch()
+
+    def _forget_if_idle(self, key: Hashable):
+        queue = self._queues.get(key)
+        if queue is not None and not queue.jobs:
+            queue.deficit = 0.0
+            if key in self._active:
+                self._active.remove(key)
+            if queue.in_flight == 0:
+                del self._queues[key]
+
+    def _dispatch(self):
+        while self.in_flight < self.max_concurrency and self._active:
+            progressed = False
+            for _ in range(len(self._active)):
+                key = self._active[0]
+                queue = self._queues[key]
+                if queue.in_flight >= self.per_key_limit:
+                    self._active.rotate(-1)
+                    continue
+                job = queue.jobs[0]
+                if queue.deficit < job.cost:
+                    queue.deficit += self.quantum * queue.weight
+                    progressed = True
+                if queue.deficit < job.cost:
+                    self._active.rotate(-1)
+                    continue
+
+                queue.jobs.popleft()
+                queue.deficit -= job.cost
+                queue.in_flight += 1
+                self.in_flight += 1
+                job.future.set_result(None)
+                if not queue.jobs:
+                    self._active.popleft()
+                    queue.deficit = 0.0
+                elif queue.deficit < queue.jobs[0].cost:
+                    self._active.rotate(-1)
+                # Otherwise the visit goes on: the deficit left over still pays for the next job
+                progressed = True
+                break
+            if not progressed:
+                # Every waiting provider is at its concurrency cap
+                break
+
+    def slot(self, key: Optional[Hashable], cost: float = 1.0, timeout: Optional[float] = None):
+        return _Slot(self, key, cost, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        busiest = sorted(self._queues.items(), key=lambda item: -(len(item[1].jobs) + item[1].in_flight))[:10]
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queued": sum(len(queue.jobs) for queue in self._queues.values()),
+            "providers": {
+                str(key): {"in_flight": queue.in_flight, "queued": len(queue.jobs), "weight": queue.weight}
+                for key, queue in busiest
+            },
+        }
+
+
+class _Slot:
+    def __init__(self, scheduler: FairScheduler, key, cost: float, timeout: Optional[float]):
+        self.scheduler = scheduler
+        self.key = key
+        self.cost = cost
+        self.timeout = timeout
+        self.held = False
+
+    async def __aenter__(self):
+        self.key = await self.scheduler.acquire(self.key, self.cost, self.timeout)
+        self.held = True
+        return self
+
+    async def pause(self, seconds: float, timeout: Optional[float] = None):
+        """Give the slot up for `seconds` (e.g. a retry backoff), then queue for it again"""
+        self.scheduler.release(self.key)
+        self.held = False
+        await asyncio.sleep(seconds)
+        self.key = await self.scheduler.acquire(self.key, self.cost, timeout)
+        self.held = True
+
+    async def __aexit__(self, *exc_info):
+        if self.held:
+            self.held = False
+            self.scheduler.release(self.key)
@@ -0,0 +1,56 @@
+"""
+Single-flight coalescing of identical concurrent AI requests.
+
+When the same image is analyzed with the same prompt while an identical call
+is still in flight (client retries, several staff uploading the same photo),
+later callers await the first call's result instead of paying for another
+Gemini round trip. Nothing is cached once the call finishes.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def request_key(model_name: str, prompt: str, image_bytes: bytes, generation_config: Any = None) -> str:
+    """Identity of a model call: model, prompt, output config and image content"""
+    digest = hashlib.sha256()
+    for part in (model_name, prompt, repr(generation_config)):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Optional[str], fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` once per key among concurrent callers and share its outcome"""
+        if key is None:
+            return await fn()
+
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        # Shield so one caller disconnecting doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "calls": self.leaders, "coalesced": self.followers}
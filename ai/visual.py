@@ -0,0 +1,139 @@
+"""
+Compact visual signatures for "more like this" search.
+
+Computed locally from the decoded upload in a few milliseconds (mostly the
+initial downscale), with no model call:
+
+- A 52-bin HSV color histogram (12 hues x 2 saturations x 2 values for
+  colored pixels, plus 4 gray levels). Pixels are weighted towards the image
+  center and a uniform border color is masked out, so a white studio
+  backdrop does not make every product look alike.
+- A 64-bit perceptual hash (DCT of a 32x32 grayscale thumbnail), which
+  matches the same or near-identical photos regardless of scale and JPEG
+  quality.
+
+`signature_vectors` packs both into one unit vector whose dot product with
+another signature is
+COLOR_WEIGHT * Bhattacharyya coefficient + HASH_WEIGHT * (1 - 2 * hamming / 64),
+so nearest-neighbour search is a single matrix product.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+SIGNATURE_VERSION = "hsv52-phash64-v1"
+
+HUE_BINS = 12
+GRAY_BINS = 4
+HISTOGRAM_BINS = HUE_BINS * 4 + GRAY_BINS
+HASH_BITS = 64
+VECTOR_DIM = HISTOGRAM_BINS + HASH_BITS
+
+COLOR_WEIGHT = 0.7
+HASH_WEIGHT = 0.3
+
+# Longest edge of the pixel grid used for the histogram
+SAMPLE_SIDE = 64
+# Below these (0-255) a pixel counts as gray rather than colored
+MIN_SATURATION = 40
+MIN_VALUE = 40
+# Border pixels closer than this (RGB distance) to the border's median color are background
+BACKGROUND_DISTANCE = 30.0
+
+PHASH_SIDE = 32
+PHASH_LOW_FREQUENCIES = 8
+
+# Uploads are downscaled to this longest edge before either part is computed
+WORKING_SIDE = 128
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    n = np.arange(size)
+    return np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size)).astype(np.float32)
+
+
+_DCT = _dct_matrix(PHASH_SIDE)
+
+
+@dataclass
+class VisualSignature:
+    color_histogram: np.ndarray  # float32, HISTOGRAM_BINS weights summing to 1
+    phash: int  # signed 64-bit, as stored in BIGINT
+
+    def to_dict(self) -> dict:
+        return {"color_histogram": [round(float(value), 4) for value in self.color_histogram], "phash": f"{self.phash & (2 ** 64 - 1):016x}"}
+
+
+def color_histogram(image: Image.Image) -> np.ndarray:
+    scale = min(1.0, SAMPLE_SIDE / max(*image.size, 1))
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    sample = image.convert("RGB").resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    rgb = np.asarray(sample, dtype=np.float32)
+    hsv = np.asarray(sample.convert("HSV"), dtype=np.int32)
+    rows, cols = rgb.shape[:2]
+
+    # Center-weighted: the product is usually in the middle of the frame
+    y = (np.arange(rows) - (rows - 1) / 2) / max(rows / 2, 1)
+    x = (np.arange(cols) - (cols - 1) / 2) / max(cols / 2, 1)
+    weights = np.exp(-(y[:, None] ** 2 + x[None, :] ** 2) / 0.5)
+
+    # Drop a uniform backdrop, unless that would leave almost nothing
+    border = np.concatenate([rgb[0], rgb[-1], rgb[1:-1, 0], rgb[1:-1, -1]])
+    backdrop = np.median(border, axis=0)
+    if np.linalg.norm(border - backdrop, axis=1).mean() < BACKGROUND_DISTANCE:
+        foreground = np.linalg.norm(rgb - backdrop, axis=2) >= BACKGROUND_DISTANCE
+        if foreground.mean() > 0.05:
+            weights = weights * foreground
+
+    hue, saturation, value = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    colored = (saturation >= MIN_SATURATION) & (value >= MIN_VALUE)
+    colored_bin = (hue * HUE_BINS // 256) * 4 + (saturation >= 150) * 2 + (value >= 150)
+    gray_bin = HUE_BINS * 4 + value * GRAY_BINS // 256
+    bins = np.where(colored, colored_bin, gray_bin)
+
+    histogram = np.bincount(bins.ravel(), weights=weights.ravel(), minlength=HISTOGRAM_BINS).astype(np.float32)
+    total = histogram.sum()
+    return histogram / total if total > 0 else histogram
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    gray = np.asarray(image.convert("L").resize((PHASH_SIDE, PHASH_SIDE), Image.Resampling.BILINEAR), dtype=np.float32)
+    low = (_DCT @ gray @ _DCT.T)[:PHASH_LOW_FREQUENCIES, :PHASH_LOW_FREQUENCIES].ravel()
+    # The DC term only reflects overall brightness, so it is left out of the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big", signed=True)
+
+
+def visual_signature(image: Image.Image) -> VisualSignature:
+    # Shrink once; both parts only look at a few thousand pixels
+    scale = min(1.0, WORKING_SIDE / max(*image.size, 1))
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return VisualSignature(color_histogram(image), perceptual_hash(image))
+
+
+def signature_vectors(color_histograms: np.ndarray, phashes: np.ndarray) -> np.ndarray:
+    """(N, VECTOR_DIM) unit float32 rows whose dot products give the combined similarity"""
+    color = np.sqrt(np.asarray(color_histograms, dtype=np.float32).reshape(-1, HISTOGRAM_BINS))
+    hashes = np.asarray(phashes, dtype=">i8").reshape(-1, 1)
+    bits = np.unpackbits(hashes.view(np.uint8), axis=1)
+    signs = bits.astype(np.float32) * 2 - 1
+    return np.hstack([
+        np.float32(np.sqrt(COLOR_WEIGHT)) * color,
+        np.float32(np.sqrt(HASH_WEIGHT / HASH_BITS)) * signs,
+    ])
+
+
+def signature_vector(signature: VisualSignature) -> np.ndarray:
+    return signature_vectors(signature.color_histogram[None, :], np.array([signature.phash]))[0]
+
+
+def similarity_parts(query: np.ndarray, vectors: np.ndarray):
+    """(color Bhattacharyya coefficients, phash Hamming distances) of rows against a query vector"""
+    color = vectors[:, :HISTOGRAM_BINS] @ query[:HISTOGRAM_BINS] / COLOR_WEIGHT
+    agreement = vectors[:, HISTOGRAM_BINS:] @ query[HISTOGRAM_BINS:] / HASH_WEIGHT  # 1 - 2 * hamming / 64
+    hamming = np.rint((1 - agreement) * HASH_BITS / 2).astype(np.int64)
+    return color, hamming
@@ -0,0 +1,50 @@
+"""create_inventory_embeddings_table
+
+Revision ID: 7b3e9f1c2d4a
+Revises: 5d2e7a4c91b3
+Create Date: 2026-10-19 21:14:05.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e9f1c2d4a'
+down_revision = '5d2e7a4c91b3'
+branch_labels = None
+depends_on = None
+
+# Must match EMBEDDING_DIM; search falls back to the in-process index otherwise
+PGVECTOR_DIM = 256
+
+
+def upgrade() -> None:
+    op.create_table('inventory_embeddings',
+    sa.Column('inventory_item_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('dim', sa.Integer(), nullable=False),
+    sa.Column('vector', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['inventory_item_id'], ['inventory_items.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('inventory_item_id')
+    )
+    op.create_index('ix_inventory_embeddings_updated_at', 'inventory_embeddings', ['updated_at'], unique=False)
+
+    # Use pgvector's HNSW index where the extension is installed (e.g. Cloud SQL);
+    # without it, search/semantic.py keeps the vectors in an in-process index
+    bind = op.get_bind()
+    available = bind.execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")).scalar()
+    if available:
+        op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        op.execute(f"ALTER TABLE inventory_embeddings ADD COLUMN embedding_vector vector({PGVECTOR_DIM})")
+        op.execute(
+            "CREATE INDEX ix_inventory_embeddings_hnsw ON inventory_embeddings "
+            "USING hnsw (embedding_vector vector_cosine_ops)"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_embeddings_updated_at', table_name='inventory_embeddings')
+    op.drop_table('inventory_embeddings')
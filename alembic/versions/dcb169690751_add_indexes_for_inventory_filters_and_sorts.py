@@ -0,0 +1,71 @@
+"""add_indexes_for_inventory_filters_and_sorts
+
+Revision ID: dcb169690751
+Revises: ae08e21a2513
+Create Date: 2026-10-19 09:12:41.508114
+
+Indexes are built CONCURRENTLY so they can be applied to a live database
+without blocking writes; that requires running outside a transaction, hence
+the autocommit blocks. A failed concurrent build leaves an INVALID index
+behind, so a rerun drops and rebuilds those rather than skipping them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dcb169690751'
+down_revision = 'ae08e21a2513'
+branch_labels = None
+depends_on = None
+
+
+ACTIVE_ONLY = sa.text("status = 'ACTIVE'")
+
+# (name, table, columns, partial-index predicate)
+INDEXES = [
+    # Customer listing / random fallback: active items, newest first
+    ('ix_inventory_items_active_updated_at', 'inventory_items', [sa.text('updated_at DESC')], ACTIVE_ONLY),
+    ('ix_inventory_items_active_created_at', 'inventory_items', [sa.text('created_at DESC')], ACTIVE_ONLY),
+    # Active items within a category
+    ('ix_inventory_items_active_category', 'inventory_items', ['category', sa.text('updated_at DESC')], ACTIVE_ONLY),
+    # Provider inventory filtered by status and sorted by recency; also serves the providers join
+    ('ix_inventory_items_provider_status_updated_at', 'inventory_items',
+     ['provider_id', 'status', sa.text('updated_at DESC')], None),
+    # Provider inventory filtered by category
+    ('ix_inventory_items_provider_category', 'inventory_items', ['provider_id', 'category'], None),
+    # GET /providers filters on status
+    ('ix_providers_status', 'providers', ['status'], None),
+]
+
+
+def index_validity(name):
+    """True/False for an existing index's pg_index.indisvalid, None when it does not exist"""
+    return op.get_bind().execute(
+        sa.text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": name},
+    ).scalar()
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            valid = index_validity(name)
+            if valid:
+                continue
+            if valid is False:
+                # Left INVALID by an interrupted concurrent build; the planner never uses it
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
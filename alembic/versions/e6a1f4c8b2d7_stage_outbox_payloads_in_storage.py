@@ -0,0 +1,46 @@
+"""stage_outbox_payloads_in_storage
+
+Revision ID: e6a1f4c8b2d7
+Revises: c4a81e6f0b27
+Create Date: 2026-10-19 21:14:03.520917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a1f4c8b2d7'
+down_revision = 'c4a81e6f0b27'
+branch_labels = None
+depends_on = None
+
+
+def pending_uploads() -> int:
+    return op.get_bind().execute(sa.text(
+        "SELECT count(*) FROM storage_outbox WHERE operation = 'upload' AND status = 'pending'"
+    )).scalar()
+
+
+def upgrade() -> None:
+    # Image bytes now live in staging objects, which this migration cannot create
+    # for rows still holding them; let the running version drain its uploads first
+    if pending_uploads():
+        raise RuntimeError(
+            "storage_outbox has pending uploads; wait for the outbox worker to drain them, then upgrade"
+        )
+    op.add_column('storage_outbox', sa.Column('staged_path', sa.String(length=500), nullable=True))
+    op.drop_column('storage_outbox', 'payload')
+    op.drop_column('storage_outbox', 'blob_metadata')
+    op.drop_column('storage_outbox', 'content_type')
+
+
+def downgrade() -> None:
+    if pending_uploads():
+        raise RuntimeError(
+            "storage_outbox has pending uploads; wait for the outbox worker to drain them, then downgrade"
+        )
+    op.add_column('storage_outbox', sa.Column('content_type', sa.String(length=100), nullable=True))
+    op.add_column('storage_outbox', sa.Column('blob_metadata', sa.JSON(), nullable=True))
+    op.add_column('storage_outbox', sa.Column('payload', sa.LargeBinary(), nullable=True))
+    op.drop_column('storage_outbox', 'staged_path')
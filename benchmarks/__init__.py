@@ -0,0 +1,3 @@
+"""
+Offline benchmark suite for the BGN API
+"""
@@ -0,0 +1,171 @@
+"""
+Deterministic synthetic catalog for search benchmarks.
+
+Generates second-hand stores and inventory rows that look like what the
+Gemini analysis produces: varied categories, brands, colors, materials,
+free-text descriptions, key features and tags. The same seed and size always
+produce the same rows, so benchmark runs on different machines are comparable.
+"""
+
+import itertools
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from database.models import InventoryStatus, ProviderStatus
+
+# Namespace for synthetic UUIDs and prefix for synthetic SKUs/emails
+SYNTHETIC_NAMESPACE = uuid.UUID("7d1c2f4e-5b8a-4c3d-9e6f-0a1b2c3d4e5f")
+SYNTHETIC_SKU_PREFIX = "SYN"
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.bgn.test"
+
+CATEGORIES: Dict[str, Dict[str, List[str]]] = {
+    "Clothing": {
+        "subcategories": ["Jeans", "Jackets", "Sweaters", "T-Shirts", "Dresses", "Coats", "Shirts", "Skirts", "Hoodies"],
+        "brands": ["Levi's", "Carhartt", "Patagonia", "H&M", "Zara", "Uniqlo", "Ralph Lauren", "Tommy Hilfiger",
+                   "The North Face", "Diesel", "AGOLDE", "Gap", "Mango", "COS", "Wrangler"],
+        "materials": ["Cotton", "Denim", "Wool", "Polyester", "Linen", "Cashmere", "Fleece", "Corduroy"],
+        "nouns": ["jeans", "jacket", "sweater", "tee", "dress", "coat", "shirt", "skirt", "hoodie", "cardigan"],
+    },
+    "Shoes": {
+        "subcategories": ["Sneakers", "Boots", "Sandals", "Loafers", "Heels", "Running Shoes"],
+        "brands": ["Nike", "Adidas", "Dr. Martens", "Converse", "Vans", "New Balance", "Timberland", "Clarks",
+                   "Birkenstock", "Asics"],
+        "materials": ["Leather", "Suede", "Canvas", "Mesh", "Rubber"],
+        "nouns": ["sneakers", "boots", "sandals", "loafers", "heels", "trainers", "chelsea boots"],
+    },
+    "Accessories": {
+        "subcategories": ["Bags", "Belts", "Scarves", "Hats", "Sunglasses", "Wallets"],
+        "brands": ["Coach", "Fossil", "Ray-Ban", "Michael Kors", "Kate Spade", "Herschel", "Eastpak"],
+        "materials": ["Leather", "Canvas", "Wool", "Acetate", "Nylon"],
+        "nouns": ["tote bag", "belt", "scarf", "beanie", "sunglasses", "wallet", "backpack", "crossbody bag"],
+    },
+    "Home": {
+        "subcategories": ["Kitchenware", "Decor", "Lighting", "Textiles", "Furniture"],
+        "brands": ["IKEA", "Le Creuset", "Pyrex", "Habitat", "Villeroy & Boch", "Not visible/determinable"],
+        "materials": ["Ceramic", "Glass", "Oak", "Cast Iron", "Rattan", "Cotton"],
+        "nouns": ["mug set", "vase", "table lamp", "throw blanket", "side table", "casserole dish", "mirror"],
+    },
+    "Electronics": {
+        "subcategories": ["Audio", "Cameras", "Gaming", "Phones", "Computers"],
+        "brands": ["Sony", "Canon", "Nintendo", "Apple", "Samsung", "Bose", "Panasonic"],
+        "materials": ["Plastic", "Aluminium", "Metal"],
+        "nouns": ["headphones", "film camera", "game console", "smartphone", "laptop", "turntable", "speaker"],
+    },
+    "Books": {
+        "subcategories": ["Fiction", "Cookbooks", "Children's", "Travel", "Art"],
+        "brands": ["Penguin", "Vintage", "HarperCollins", "Taschen", "Lonely Planet"],
+        "materials": ["Paperback", "Hardcover"],
+        "nouns": ["novel", "cookbook", "picture book", "travel guide", "art book"],
+    },
+}
+
+COLORS = ["Black", "White", "Navy Blue", "Dark Blue", "Red", "Burgundy", "Green", "Olive", "Brown", "Tan",
+          "Cream", "Grey", "Pink", "Yellow", "Orange", "Purple", "Multicolor", "Beige"]
+CONDITIONS = ["New", "Like New", "Good", "Fair", "Used", "Refurbished"]
+ADJECTIVES = ["vintage", "classic", "oversized", "slim", "cozy", "lightweight", "retro", "minimalist",
+              "chunky", "waterproof", "handmade", "relaxed", "cropped", "tailored", "rugged", "soft"]
+FEATURES = ["Button fly", "Zip closure", "Two front pockets", "Adjustable strap", "Quilted lining",
+            "Ribbed cuffs", "Attached hood", "Padded sole", "Removable insole", "Original box",
+            "Cable knit", "Raw hem", "Contrast stitching", "Water resistant", "Dishwasher safe"]
+STYLES = ["casual", "streetwear", "workwear", "boho", "preppy", "y2k", "minimal", "outdoor", "formal", "sporty"]
+SEASONS = ["summer", "winter", "autumn", "spring", "all-season"]
+DESCRIPTION_TEMPLATES = [
+    "{adj} {color_l} {noun} by {brand} in {material_l}. {feature}. Great for {season} {style} outfits.",
+    "Pre-loved {brand} {noun} with a {adj} fit. {color} {material_l}, {condition_l} condition. {feature}.",
+    "{color} {noun} made from {material_l}. {adj_cap} look with {feature_l}. Ideal {style} piece.",
+    "Second-hand {adj} {noun}. {condition} with light signs of wear. {feature}. Pairs well with {style} looks.",
+]
+
+
+def synthetic_uuid(kind: str, seed: int, index: int) -> uuid.UUID:
+    """Stable UUID for the index-th synthetic row of a kind"""
+    return uuid.uuid5(SYNTHETIC_NAMESPACE, f"{kind}:{seed}:{index}")
+
+
+def generate_providers(count: int, seed: int = 42) -> Iterator[Dict]:
+    """Yield `count` deterministic provider rows"""
+    rng = random.Random(f"providers:{seed}")
+    kinds = ["Charity Shop", "Thrift Store", "Vintage Boutique", "Second-Hand Market", "Reuse Centre"]
+    streets = ["Main Street", "High Street", "Market Square", "Station Road", "Church Lane", "Mill Road"]
+    for index in range(count):
+        categories = rng.sample(list(CATEGORIES), k=rng.randint(1, 3))
+        name = f"{rng.choice(['North', 'South', 'East', 'West', 'Old Town', 'Riverside'])} {rng.choice(kinds)} #{index}"
+        yield {
+            "id": synthetic_uuid("provider", seed, index),
+            "name": name,
+            "email": f"provider-{seed}-{index}@{SYNTHETIC_EMAIL_DOMAIN}",
+            "phone": f"+1-555-{rng.randint(0, 9999):04d}",
+            "business_name": name,
+            "specializations": categories,
+            "bio": f"Community {rng.choice(kinds).lower()} focused on {', '.join(c.lower() for c in categories)}.",
+            "experience_years": rng.randint(0, 30),
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "total_tasks_completed": rng.randint(0, 5000),
+            "average_completion_time_minutes": rng.randint(5, 60),
+            "status": ProviderStatus.ACTIVE if rng.random() < 0.9 else ProviderStatus.INACTIVE,
+            "is_verified": rng.random() < 0.8,
+            "business_address": f"{rng.randint(1, 999)} {rng.choice(streets)}, Springfield",
+        }
+
+
+def generate_inventory(count: int, provider_ids: List[uuid.UUID], seed: int = 42) -> Iterator[Dict]:
+    """Yield `count` deterministic inventory rows spread across `provider_ids`.
+
+    Providers receive a skewed (Zipf-like) share of items, and statuses and
+    timestamps are distributed so filters and sorts see realistic selectivity.
+    """
+    rng = random.Random(f"inventory:{seed}")
+    category_names = list(CATEGORIES)
+    category_weights = [40, 15, 15, 12, 10, 8]
+    provider_cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(provider_ids))))
+    statuses = [InventoryStatus.ACTIVE, InventoryStatus.SOLD, InventoryStatus.RESERVED, InventoryStatus.INACTIVE]
+    status_weights = [75, 15, 5, 5]
+    epoch = datetime(2025, 1, 1)
+
+    for index in range(count):
+        category = rng.choices(category_names, weights=category_weights)[0]
+        spec = CATEGORIES[category]
+        subcategory = rng.choice(spec["subcategories"])
+        brand = rng.choice(spec["brands"])
+        material = rng.choice(spec["materials"])
+        noun = rng.choice(spec["nouns"])
+        color = rng.choice(COLORS)
+        condition = rng.choice(CONDITIONS)
+        adjective = rng.choice(ADJECTIVES)
+        style = rng.choice(STYLES)
+        season = rng.choice(SEASONS)
+        features = rng.sample(FEATURES, k=rng.randint(2, 5))
+        description = rng.choice(DESCRIPTION_TEMPLATES).format(
+            adj=adjective, adj_cap=adjective.capitalize(), color=color, color_l=color.lower(), noun=noun,
+            brand=brand, material_l=material.lower(), feature=features[0], feature_l=features[0].lower(),
+            season=season, style=style, condition=condition, condition_l=condition.lower(),
+        )
+        price_min = round(rng.uniform(2, 120), 2)
+        created_at = epoch + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+
+        yield {
+            "id": synthetic_uuid("inventory", seed, index),
+            "provider_id": rng.choices(provider_ids, cum_weights=provider_cum_weights)[0],
+            "product_name": f"{brand} {adjective.capitalize()} {noun.title()}",
+            "description": description,
+            "category": category,
+            "subcategory": subcategory,
+            "brand": brand,
+            "condition": condition,
+            "color": color,
+            "material": material,
+            "estimated_price_min": price_min,
+            "estimated_price_max": round(price_min * rng.uniform(1.2, 2.5), 2),
+            "currency": "EUR",
+            "marketability_score": round(rng.uniform(1, 10), 1),
+            "key_features": features,
+            "tags": sorted({noun.split()[-1], style, season, brand.lower(), color.lower(), material.lower()}),
+            "confidence_score": round(rng.uniform(0.5, 1.0), 2),
+            "status": rng.choices(statuses, weights=status_weights)[0],
+            "quantity": 1,
+            "sku": f"{SYNTHETIC_SKU_PREFIX}-{seed}-{index:07d}",
+            "created_at": created_at,
+            "updated_at": created_at + timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+        }
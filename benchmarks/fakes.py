@@ -0,0 +1,446 @@
+"""
+Local stand-ins for Google Gemini and Google Cloud Storage.
+
+The fakes replace `google.generativeai.GenerativeModel`,
+`google.generativeai.embed_content_async` and `google.cloud.storage.Client`
+in place, so the routes keep calling the same module attributes they use in
+production. Each fake sleeps for a configurable latency and fails at a
+configurable rate, which lets the benchmarks reproduce a slow or degraded
+upstream without network access.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import io
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.cloud import storage
+
+# Canned analyses returned by the fake model, picked deterministically per call
+CANNED_ANALYSES = [
+    {
+        "product_name": "Carhartt Duck Active Jacket",
+        "category": "Clothing",
+        "subcategory": "Jackets",
+        "description": "Brown cotton duck work jacket with a quilted flannel lining and an attached hood.",
+        "key_features": ["Attached hood", "Quilted lining", "Two front pockets"],
+        "brand": "Carhartt",
+        "model_number": "J130",
+        "condition": "Used",
+        "condition_notes": "Light fading on the cuffs",
+        "dimensions_estimate": "Men's size L",
+        "color": "Brown",
+        "material": "Cotton duck",
+        "estimated_price_range": {"min": "45", "max": "70", "currency": "EUR"},
+        "marketability_score": "8",
+        "tags": ["workwear", "jacket", "carhartt", "winter"],
+        "additional_notes": "Popular vintage workwear piece",
+    },
+    {
+        "product_name": "Levi's 501 Original Fit Jeans",
+        "category": "Clothing",
+        "subcategory": "Jeans",
+        "description": "Classic straight-leg jeans in a medium stone wash with a button fly.",
+        "key_features": ["Button fly", "Straight leg", "Five-pocket styling"],
+        "brand": "Levi's",
+        "model_number": "501",
+        "condition": "Used",
+        "condition_notes": "Minor wear at the hem",
+        "dimensions_estimate": "W32 L32",
+        "color": "Blue",
+        "material": "Denim",
+        "estimated_price_range": {"min": "25", "max": "40", "currency": "EUR"},
+        "marketability_score": "7",
+        "tags": ["denim", "jeans", "levis", "casual"],
+        "additional_notes": "Not visible/determinable",
+    },
+    {
+        "product_name": "Hand-Knit Wool Cardigan",
+        "category": "Clothing",
+        "subcategory": "Sweaters",
+        "description": "Chunky cream cable-knit cardigan with wooden buttons, cozy winter layer.",
+        "key_features": ["Cable knit", "Wooden buttons", "Relaxed fit"],
+        "brand": "Not visible/determinable",
+        "model_number": "Not visible/determinable",
+        "condition": "Used",
+        "condition_notes": "Slight pilling under the arms",
+        "dimensions_estimate": "Women's size M",
+        "color": "Cream",
+        "material": "Wool",
+        "estimated_price_range": {"min": "20", "max": "35", "currency": "EUR"},
+        "marketability_score": "6",
+        "tags": ["knitwear", "cardigan", "wool", "cozy"],
+        "additional_notes": "Handmade item",
+    },
+]
+
+
+@dataclass
+class FaultProfile:
+    """Latency and failure behaviour of a fake upstream service"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+    _rng: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    def next_delay(self) -> float:
+        """Return the next simulated latency in seconds"""
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def should_fail(self) -> bool:
+        """Decide whether the next call fails"""
+        if self.failure_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.failure_rate
+
+    def choice(self, options):
+        with self._lock:
+            return self._rng.choice(options)
+
+
+class FakeUsageMetadata:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeGenerateContentResponse:
+    """Minimal subset of `GenerateContentResponse` used by the routes"""
+
+    def __init__(self, text: str, prompt_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = FakeUsageMetadata(prompt_tokens, max(1, len(text) // 4))
+
+
+class FakeStreamingResponse:
+    """Async iterator over response chunks, like `AsyncGenerateContentResponse` with stream=True"""
+
+    def __init__(self, response: FakeGenerateContentResponse, profile: FaultProfile, chunk_words: int = 4):
+        words = response.text.split(" ")
+        self._texts = [" ".join(words[i:i + chunk_words]) + " " for i in range(0, len(words), chunk_words)]
+        self._texts[-1] = self._texts[-1].rstrip()
+        self._profile = profile
+        self.usage_metadata = response.usage_metadata
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        # The first chunk arrives after the usual latency, the rest trickle in
+        for index, text in enumerate(self._texts):
+            if index:
+                await asyncio.sleep(self._profile.next_delay() / 10)
+            chunk = FakeGenerateContentResponse(text)
+            chunk.usage_metadata = self.usage_metadata if index == len(self._texts) - 1 else None
+            yield chunk
+
+
+class FakeGenerativeModel:
+    """Drop-in replacement for `genai.GenerativeModel`"""
+
+    profile = FaultProfile()
+
+    def __init__(self, model_name: str = "gemini-2.0-flash", generation_config=None, **kwargs):
+        self.model_name = model_name
+        self._generation_config = generation_config
+        self.calls = 0
+
+    def _config_value(self, name: str, config=None):
+        config = config or self._generation_config
+        if isinstance(config, dict):
+            return config.get(name)
+        return getattr(config, name, None)
+
+    def _wants_json(self, config=None) -> bool:
+        return self._config_value("response_mime_type", config) == "application/json"
+
+    def _wants_array(self, config=None) -> bool:
+        schema = self._config_value("response_schema", config)
+        return isinstance(schema, dict) and schema.get("type") == "ARRAY"
+
+    @staticmethod
+    def _prompt_of(contents) -> str:
+        if isinstance(contents, str):
+            return contents
+        return " ".join(part for part in contents if isinstance(part, str))
+
+    def _respond(self, contents, generation_config=None) -> FakeGenerateContentResponse:
+        if self.profile.should_fail():
+            raise google_exceptions.ResourceExhausted("429 Resource has been exhausted (fake quota)")
+
+        prompt = self._prompt_of(contents)
+        if self._wants_array(generation_config):
+            images = sum(1 for part in contents if not isinstance(part, str))
+            text = json.dumps([
+                dict(self.profile.choice(CANNED_ANALYSES), image_index=index) for index in range(images)
+            ])
+        elif self._wants_json(generation_config):
+            text = json.dumps(self.profile.choice(CANNED_ANALYSES))
+        else:
+            text = "The image shows a single garment photographed on a plain background."
+        return FakeGenerateContentResponse(text, prompt_tokens=len(prompt) // 4 + 258)
+
+    def generate_content(self, contents, **kwargs):
+        self.calls += 1
+        time.sleep(self.profile.next_delay())
+        return self._respond(contents, kwargs.get("generation_config"))
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.profile.next_delay())
+        response = self._respond(contents, kwargs.get("generation_config"))
+        return FakeStreamingResponse(response, self.profile) if stream else response
+
+
+async def fake_embed_content_async(model, content, task_type=None, output_dimensionality=None, **kwargs):
+    """Drop-in replacement for `genai.embed_content_async`, answering with hashing-embedder vectors"""
+    from ai.embeddings import HashingEmbedder
+
+    profile = FakeGenerativeModel.profile
+    await asyncio.sleep(profile.next_delay())
+    if profile.should_fail():
+        raise google_exceptions.ResourceExhausted("429 Resource has been exhausted (fake quota)")
+    texts = [content] if isinstance(content, str) else list(content)
+    vectors = HashingEmbedder(output_dimensionality or 768).embed(texts).tolist()
+    return {"embedding": vectors[0] if isinstance(content, str) else vectors}
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.metadata: Optional[Dict[str, str]] = None
+        self.content_type: Optional[str] = None
+        self.size: Optional[int] = None
+
+    def _io(self):
+        profile = self.bucket.client.profile
+        time.sleep(profile.next_delay())
+        if profile.should_fail():
+            raise google_exceptions.ServiceUnavailable("503 Backend unavailable (fake storage)")
+
+    def upload_from_file(self, file_obj, content_type: Optional[str] = None, **kwargs):
+        self._io()
+        self.content_type = content_type
+        self.bucket.objects[self.name] = file_obj.read()
+
+    def upload_from_string(self, data, content_type: Optional[str] = None, **kwargs):
+        self._io()
+        self.content_type = content_type
+        self.bucket.objects[self.name] = data.encode() if isinstance(data, str) else bytes(data)
+
+    def download_as_bytes(self, **kwargs) -> bytes:
+        self._io()
+        try:
+            return self.bucket.objects[self.name]
+        except KeyError:
+            raise google_exceptions.NotFound(f"404 No such object: {self.bucket.name}/{self.name}")
+
+    def exists(self, **kwargs) -> bool:
+        self._io()
+        return self.name in self.bucket.objects
+
+    def open(self, mode: str = "rb", **kwargs) -> io.BytesIO:
+        return io.BytesIO(self.download_as_bytes())
+
+    def delete(self, **kwargs):
+        self._io()
+        if self.bucket.objects.pop(self.name, None) is None:
+            raise google_exceptions.NotFound(f"404 No such object: {self.bucket.name}/{self.name}")
+
+    def generate_signed_url(self, expiration, method: str = "GET", content_type: Optional[str] = None,
+                            headers: Optional[Dict[str, str]] = None, **kwargs) -> str:
+        expires_at = time.time() + expiration.total_seconds()
+        query = {
+            "method": method,
+            "expires": f"{expires_at:.0f}",
+            "content_type": content_type or "",
+            "length_range": (headers or {}).get("x-goog-content-length-range", ""),
+        }
+        query["signature"] = _fake_signature(self.bucket.name, self.name, query)
+        return f"{FAKE_STORAGE_URL}/{self.bucket.name}/{self.name}?{urlencode(query)}"
+
+
+class FakeBucket:
+    def __init__(self, client: "FakeStorageClient", name: str):
+        self.client = client
+        self.name = name
+        self.objects: Dict[str, bytes] = client.store.setdefault(name, {})
+
+    def blob(self, blob_name: str) -> FakeBlob:
+        return FakeBlob(self, blob_name)
+
+    def get_blob(self, blob_name: str, **kwargs) -> Optional[FakeBlob]:
+        blob = self.blob(blob_name)
+        blob._io()
+        if blob_name not in self.objects:
+            return None
+        blob.size = len(self.objects[blob_name])
+        return blob
+
+    def copy_blob(self, blob: FakeBlob, destination_bucket: "FakeBucket", new_name: Optional[str] = None, **kwargs):
+        blob._io()
+        try:
+            data = self.objects[blob.name]
+        except KeyError:
+            raise google_exceptions.NotFound(f"404 No such object: {self.name}/{blob.name}")
+        destination_bucket.objects[new_name or blob.name] = data
+        return destination_bucket.blob(new_name or blob.name)
+
+    def delete_blob(self, blob_name: str, **kwargs):
+        if self.client._batch is not None:
+            self.client._batch.deferred.append(self.blob(blob_name))
+        else:
+            self.blob(blob_name).delete()
+
+
+class FakeBatchResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+class FakeBatch:
+    """Deferred deletes sent as one round trip, like `storage.Batch`"""
+
+    def __init__(self, client: "FakeStorageClient", raise_exception: bool = True):
+        self.client = client
+        self.raise_exception = raise_exception
+        self.deferred: List[FakeBlob] = []
+        self._responses: List[FakeBatchResponse] = []
+
+    def __enter__(self):
+        self.client._batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.client._batch = None
+        if exc_type is not None:
+            return
+        time.sleep(self.client.profile.next_delay())
+        for blob in self.deferred:
+            if self.client.profile.should_fail():
+                self._responses.append(FakeBatchResponse(503))
+            elif blob.bucket.objects.pop(blob.name, None) is None:
+                self._responses.append(FakeBatchResponse(404))
+            else:
+                self._responses.append(FakeBatchResponse(204))
+        if self.raise_exception and any(response.status_code >= 300 for response in self._responses):
+            raise google_exceptions.ServiceUnavailable("Batch request had failures (fake storage)")
+
+
+class FakeStorageClient:
+    """Drop-in replacement for `storage.Client` backed by a shared dict"""
+
+    profile = FaultProfile()
+    store: Dict[str, Dict[str, bytes]] = {}
+
+    def __init__(self, project: Optional[str] = None, **kwargs):
+        self.project = project
+        self._batch: Optional[FakeBatch] = None
+
+    def batch(self, raise_exception: bool = True) -> FakeBatch:
+        return FakeBatch(self, raise_exception)
+
+    def bucket(self, bucket_name: str) -> FakeBucket:
+        return FakeBucket(self, bucket_name)
+
+
+FAKE_STORAGE_URL = "https://storage.fake.local"
+_FAKE_SIGNING_KEY = b"fake-storage-signing-key"
+
+
+def _fake_signature(bucket_name: str, blob_name: str, query: Dict[str, str]) -> str:
+    signed = "\n".join([bucket_name, blob_name] + [query[key] for key in sorted(query) if key != "signature"])
+    return hmac.new(_FAKE_SIGNING_KEY, signed.encode(), hashlib.sha256).hexdigest()
+
+
+def fake_signed_put(url: str, data: bytes, headers: Dict[str, str]) -> int:
+    """Upload through a URL from the fake `generate_signed_url`, as a client would; returns the HTTP status"""
+    parts = urlsplit(url)
+    bucket_name, _, blob_name = parts.path.lstrip("/").partition("/")
+    query = {key: values[0] for key, values in parse_qs(parts.query, keep_blank_values=True).items()}
+    if not hmac.compare_digest(query.get("signature", ""), _fake_signature(bucket_name, blob_name, query)):
+        return 403
+    if query["method"] != "PUT" or float(query["expires"]) < time.time():
+        return 403
+    if headers.get("Content-Type", "") != query["content_type"]:
+        return 403
+    if query["length_range"]:
+        if headers.get("x-goog-content-length-range") != query["length_range"]:
+            return 403
+        low, high = (int(bound) for bound in query["length_range"].split(","))
+        if not low <= len(data) <= high:
+            return 400
+    FakeStorageClient.store.setdefault(bucket_name, {})[blob_name] = bytes(data)
+    return 200
+
+
+@contextlib.contextmanager
+def install_fakes(gemini: Optional[FaultProfile] = None, gcs: Optional[FaultProfile] = None):
+    """Patch Gemini and GCS with local fakes for the duration of the block"""
+    FakeGenerativeModel.profile = gemini or FaultProfile()
+    FakeStorageClient.profile = gcs or FaultProfile()
+    FakeStorageClient.store = {}
+
+    originals = {
+        "model": genai.GenerativeModel,
+        "embed": genai.embed_content_async,
+        "configure": genai.configure,
+        "client": storage.Client,
+    }
+    saved_env = {key: os.environ.get(key) for key in ("GOOGLE_API_KEY", "GCS_BUCKET")}
+
+    genai.GenerativeModel = FakeGenerativeModel
+    genai.embed_content_async = fake_embed_content_async
+    genai.configure = lambda *args, **kwargs: None
+    storage.Client = FakeStorageClient
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-benchmark-key")
+    os.environ.setdefault("GCS_BUCKET", "fake-benchmark-bucket")
+    try:
+        yield FakeStorageClient.store
+    finally:
+        genai.GenerativeModel = originals["model"]
+        genai.embed_content_async = originals["embed"]
+        genai.configure = originals["configure"]
+        storage.Client = originals["client"]
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def sample_image_bytes(seed: int = 0, size=(640, 800)) -> bytes:
+    """Render a small deterministic JPEG to use as an upload payload"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+        x1, y1 = x0 + rng.randrange(40, 200), y0 + rng.randrange(40, 200)
+        draw.rectangle([x0, y0, x1, y1], fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
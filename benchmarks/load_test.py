@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Load test for the BGN API running in-process against local Gemini and GCS fakes.
+
+Drives concurrent upload, search, listing and delete workloads through the
+FastAPI app and reports p50/p95/p99 latency and requests/second per workload.
+Only the database is real; point DATABASE_URL at a disposable database.
+
+Uploads are followed by an "outbox" workload that drains the storage outbox
+into the selected backend: the GCS fake (default) or the local filesystem
+(--storage local).
+
+Usage:
+    python -m benchmarks.load_test --requests 200 --concurrency 16 \
+        --gemini-latency-ms 800 --gemini-failure-rate 0.02 --output bench.json
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+
+# Add the repository root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FaultProfile, install_fakes, sample_image_bytes
+from benchmarks.stats import LatencySummary, print_report, summarize, write_json
+
+WORKLOADS = ("upload", "outbox", "search", "list", "delete")
+
+SEARCH_QUERIES = [
+    "denim jacket",
+    "vintage leather boots",
+    "wool sweater",
+    "\"high rise\" jeans",
+    "carhartt",
+    "summer dress -maxi",
+    "kids winter coat",
+    "running shoes",
+]
+
+
+async def run_workload(
+    name: str,
+    total: int,
+    concurrency: int,
+    make_request: Callable[[int], Awaitable[httpx.Response]],
+) -> LatencySummary:
+    """Issue `total` requests with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(index)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            if failed:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return summarize(name, latencies, errors, time.perf_counter() - started)
+
+
+async def drain_outbox() -> LatencySummary:
+    """Apply pending storage outbox entries batch by batch, timing each batch"""
+    from image_storage import outbox_worker
+
+    latencies: List[float] = []
+    handled = 0
+    started = time.perf_counter()
+    while True:
+        batch_started = time.perf_counter()
+        count = await asyncio.to_thread(outbox_worker.process_batch)
+        if count == 0:
+            break
+        latencies.append(time.perf_counter() - batch_started)
+        handled += count
+    stats = outbox_worker.stats()
+    print(f"   {handled} outbox entries handled, {stats['failed']} failed permanently")
+    return summarize("outbox", latencies, stats["failed"], time.perf_counter() - started)
+
+
+async def run_benchmark(args) -> List[LatencySummary]:
+    from main import app
+
+    payloads = [sample_image_bytes(seed) for seed in range(8)]
+    created_ids: List[str] = []
+    summaries: List[LatencySummary] = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Uploads need at least one provider to attribute items to
+        await client.post("/admin/create-test-data")
+
+        async def upload(i):
+            files = {"file": (f"bench-{i}.jpg", payloads[i % len(payloads)], "image/jpeg")}
+            response = await client.post("/provider/upload-inventory", files=files)
+            if response.status_code == 200:
+                created_ids.append(response.json()["inventory_id"])
+            return response
+
+        async def search(i):
+            return await client.post("/customer/search", json={"query": SEARCH_QUERIES[i % len(SEARCH_QUERIES)]})
+
+        async def listing(i):
+            path = "/provider/inventories" if i % 2 == 0 else "/providers"
+            return await client.get(path)
+
+        async def delete(i):
+            return await client.delete(f"/provider/inventory/{created_ids[i]}")
+
+        handlers = {"upload": upload, "search": search, "list": listing, "delete": delete}
+
+        for name in args.workloads:
+            if name == "outbox":
+                print("🔄 Draining storage outbox...")
+                summaries.append(await drain_outbox())
+                continue
+            total = min(args.requests, len(created_ids)) if name == "delete" else args.requests
+            if total == 0:
+                print(f"⚠️  Skipping {name}: nothing to run")
+                continue
+            print(f"🔄 Running {name} workload ({total} requests, concurrency {args.concurrency})...")
+            summaries.append(await run_workload(name, total, args.concurrency, handlers[name]))
+
+    return summaries
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the BGN API")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per workload")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent in-flight requests")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--gemini-latency-ms", type=float, default=500.0)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0)
+    parser.add_argument("--gcs-latency-ms", type=float, default=40.0)
+    parser.add_argument("--gcs-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--gcs-failure-rate", type=float, default=0.0)
+    parser.add_argument("--storage", choices=("fake-gcs", "local"), default="fake-gcs",
+                        help="Storage backend the outbox writes to")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--max-error-rate", type=float, default=None,
+                        help="Exit non-zero if any workload exceeds this error rate (for CI)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    gemini = FaultProfile(args.gemini_latency_ms, args.gemini_jitter_ms, args.gemini_failure_rate, seed=args.seed)
+    gcs = FaultProfile(args.gcs_latency_ms, args.gcs_jitter_ms, args.gcs_failure_rate, seed=args.seed + 1)
+
+    print("🚀 Starting offline load test with local Gemini and GCS fakes")
+    with install_fakes(gemini=gemini, gcs=gcs), tempfile.TemporaryDirectory(prefix="bgn-storage-") as storage_root:
+        from image_storage import GCSStorageBackend, LocalStorageBackend, set_storage
+        if args.storage == "local":
+            set_storage(LocalStorageBackend(storage_root))
+        else:
+            set_storage(GCSStorageBackend())
+        summaries = asyncio.run(run_benchmark(args))
+
+    print()
+    print_report(summaries)
+
+    if args.output:
+        write_json(args.output, summaries, args=vars(args))
+        print(f"\n📊 Results written to {args.output}")
+
+    if args.max_error_rate is not None:
+        failing = [s.name for s in summaries if s.error_rate > args.max_error_rate]
+        if failing:
+            print(f"\n❌ Error rate above {args.max_error_rate:.2%} for: {', '.join(failing)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Search performance harness for InventoryCRUD.search_inventory.
+
+Seeds a deterministic synthetic catalog (see benchmarks/catalog.py) at a
+configurable size, replays a fixed query mix against the ranked full-text
+query and records latency percentiles plus the EXPLAIN ANALYZE plan of every
+query, so regressions in the search path show up as numbers and plan changes.
+
+Usage:
+    python -m benchmarks.search_benchmark --size 100000 --iterations 20
+    python -m benchmarks.search_benchmark --size 1000000 --skip-seed --output search.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+# Add the repository root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import (
+    SYNTHETIC_SKU_PREFIX, generate_inventory, generate_providers, synthetic_uuid,
+)
+from benchmarks.stats import print_report, summarize, write_json
+from database.bulk import bulk_load
+from database.crud import InventoryCRUD
+from database.database import SessionLocal, engine, check_database_connection
+from database.models import InventoryItem, Provider
+
+# (label, query, scoped to a provider) - mirrors what customers type
+QUERY_MIX = [
+    ("single-term", "jeans", False),
+    ("single-term-rare", "turntable", False),
+    ("two-terms", "denim jacket", False),
+    ("brand", "carhartt", False),
+    ("multi-term", "cozy wool winter sweater", False),
+    ("phrase", "\"button fly\"", False),
+    ("negation", "boots -leather", False),
+    ("long-tail", "vintage retro film camera canon", False),
+    ("no-match", "xylophone zeppelin", False),
+    ("provider-scoped", "jacket", True),
+]
+
+
+def seed_catalog(size: int, providers: int, seed: int, batch_size: int = 50_000):
+    """Insert the synthetic catalog unless a catalog of this size already exists"""
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(InventoryItem.id)).filter(
+            InventoryItem.sku.like(f"{SYNTHETIC_SKU_PREFIX}-{seed}-%")
+        ).scalar()
+        if existing >= size:
+            print(f"📋 Synthetic catalog already has {existing} rows for seed {seed}, skipping seed")
+            return
+        if existing:
+            print(f"⚠️  Found a partial catalog ({existing} rows); seeding the remaining rows")
+    finally:
+        db.close()
+
+    provider_ids = [synthetic_uuid("provider", seed, i) for i in range(providers)]
+    bulk_load(engine, Provider, generate_providers(providers, seed))
+
+    def progress(result):
+        print(f"   • {result.rows_read + existing}/{size} rows ({result.rows_per_second:.0f} rows/s)")
+
+    rows = itertools.islice(generate_inventory(size, provider_ids, seed), existing, None)
+    result = bulk_load(engine, InventoryItem, rows, chunk_size=batch_size, on_chunk=progress)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE providers"))
+        conn.execute(text("ANALYZE inventory_items"))
+
+    print(f"✅ Seeded {result.rows_inserted} inventory rows in {result.elapsed_s:.1f}s ({result.rows_per_second:.0f} rows/s)")
+
+
+class ExplainAnalyze(Executable, ClauseElement):
+    """EXPLAIN ANALYZE wrapper that keeps the wrapped statement's bind parameters"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(ExplainAnalyze, "postgresql")
+def _compile_explain_analyze(element, compiler, **kw):
+    return "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def explain_analyze(db, search_term: str, provider_id=None) -> Optional[Dict]:
+    """Run EXPLAIN ANALYZE on the exact statement search_inventory issues"""
+    query = InventoryCRUD.build_search_query(db, search_term, provider_id, limit=25)
+    if query is None:
+        return None
+    row = db.execute(ExplainAnalyze(query.statement)).scalar()
+    plan = row if isinstance(row, list) else json.loads(row)
+    return plan[0]
+
+
+def plan_node_types(plan: Dict) -> List[str]:
+    """Flatten the node types of a JSON plan, e.g. ['Limit', 'Sort', 'Seq Scan']"""
+    nodes = []
+    stack = [plan["Plan"]]
+    while stack:
+        node = stack.pop()
+        label = node["Node Type"]
+        if node.get("Relation Name"):
+            label += f" on {node['Relation Name']}"
+        if node.get("Index Name"):
+            label += f" using {node['Index Name']}"
+        nodes.append(label)
+        stack.extend(reversed(node.get("Plans", [])))
+    return nodes
+
+
+def run_queries(iterations: int, warmup: int, seed: int):
+    """Replay the query mix and collect latency summaries and plans"""
+    db = SessionLocal()
+    summaries = []
+    plans = {}
+    try:
+        scoped_provider = synthetic_uuid("provider", seed, 0)
+        for label, search_term, scoped in QUERY_MIX:
+            provider_id = scoped_provider if scoped else None
+
+            for _ in range(warmup):
+                InventoryCRUD.search_inventory(db, search_term, provider_id=provider_id, limit=25)
+
+            latencies = []
+            result_count = 0
+            started = time.perf_counter()
+            for _ in range(iterations):
+                query_started = time.perf_counter()
+                result_count = len(InventoryCRUD.search_inventory(db, search_term, provider_id=provider_id, limit=25))
+                latencies.append(time.perf_counter() - query_started)
+            summaries.append(summarize(label, latencies, 0, time.perf_counter() - started))
+
+            plan = explain_analyze(db, search_term, provider_id)
+            plans[label] = {
+                "query": search_term,
+                "provider_scoped": scoped,
+                "results": result_count,
+                "planning_ms": plan["Planning Time"],
+                "execution_ms": plan["Execution Time"],
+                "nodes": plan_node_types(plan),
+                "plan": plan,
+            }
+            db.rollback()
+    finally:
+        db.close()
+    return summaries, plans
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search benchmark over a synthetic catalog")
+    parser.add_argument("--size", type=int, default=100_000, help="Inventory rows in the catalog (up to 1,000,000)")
+    parser.add_argument("--providers", type=int, default=500, help="Number of synthetic providers")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=20, help="Timed runs per query")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed runs per query before measuring")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the catalog already in the database")
+    parser.add_argument("--output", help="Write latencies and EXPLAIN ANALYZE plans as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not check_database_connection():
+        print("❌ Database connection failed! Please check your DATABASE_URL in .env file")
+        sys.exit(1)
+
+    if not args.skip_seed:
+        print(f"🚀 Seeding synthetic catalog: {args.size} items, {args.providers} providers, seed {args.seed}")
+        seed_catalog(args.size, args.providers, args.seed)
+
+    print(f"🔄 Replaying {len(QUERY_MIX)} queries x {args.iterations} iterations...")
+    summaries, plans = run_queries(args.iterations, args.warmup, args.seed)
+
+    print()
+    print_report(summaries)
+    print()
+    for label, info in plans.items():
+        scans = [n for n in info["nodes"] if "Scan" in n]
+        print(f"{label:<22}{info['results']:>4} rows  exec {info['execution_ms']:>9.2f} ms  {', '.join(scans)}")
+
+    if args.output:
+        write_json(args.output, summaries, args=vars(args), plans=plans)
+        print(f"\n📊 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
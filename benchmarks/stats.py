@@ -0,0 +1,65 @@
+"""
+Latency statistics and reporting helpers shared by the benchmarks
+"""
+
+import json
+import math
+from dataclasses import dataclass, asdict
+from typing import List, Sequence
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class LatencySummary:
+    name: str
+    requests: int
+    errors: int
+    elapsed_s: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+
+def summarize(name: str, latencies_s: List[float], errors: int, elapsed_s: float) -> LatencySummary:
+    """Build a summary from per-request latencies in seconds"""
+    ordered = sorted(latencies_s)
+    total = len(ordered)
+    return LatencySummary(
+        name=name,
+        requests=total,
+        errors=errors,
+        elapsed_s=round(elapsed_s, 3),
+        rps=round(total / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        p50_ms=round(percentile(ordered, 50) * 1000, 2),
+        p95_ms=round(percentile(ordered, 95) * 1000, 2),
+        p99_ms=round(percentile(ordered, 99) * 1000, 2),
+        max_ms=round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    )
+
+
+def print_report(summaries: List[LatencySummary]):
+    """Print a fixed-width table of benchmark results"""
+    header = f"{'workload':<22}{'reqs':>7}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for s in summaries:
+        print(f"{s.name:<22}{s.requests:>7}{s.errors:>8}{s.rps:>10.2f}{s.p50_ms:>10.2f}{s.p95_ms:>10.2f}{s.p99_ms:>10.2f}{s.max_ms:>10.2f}")
+
+
+def write_json(path: str, summaries: List[LatencySummary], **context):
+    """Write results as JSON so CI can diff runs"""
+    with open(path, "w") as fh:
+        json.dump({"context": context, "results": [asdict(s) for s in summaries]}, fh, indent=2)
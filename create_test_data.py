@@ -13,7 +13,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database.database import SessionLocal, create_tables, check_database_connection
 from database.models import Provider, ProviderStatus, InventoryItem, InventoryStatus
-from database.crud import ProviderCRUD
+from database.bulk import bulk_load
 
 def create_test_providers():
     """Create test providers in the database"""
@@ -84,47 +84,27 @@ def create_test_providers():
     
     db = SessionLocal()
     try:
-        created_count = 0
-        
-        for provider_data in providers_data:
-            # Check if provider already exists
-            existing_provider = db.query(Provider).filter(
-                Provider.email == provider_data["email"]
-            ).first()
-            
-            if existing_provider:
-                print(f"⚠️  Provider {provider_data['name']} already exists, skipping...")
-                continue
-            
-            # Create new provider
-            new_provider = Provider(
-                id=uuid.UUID(provider_data["id"]),
-                name=provider_data["name"],
-                email=provider_data["email"],
-                phone=provider_data["phone"],
-                business_name=provider_data["business_name"],
-                specializations=provider_data["specializations"],
-                bio=provider_data["bio"],
-                experience_years=provider_data["experience_years"],
-                rating=provider_data["rating"],
-                total_tasks_completed=provider_data["total_tasks_completed"],
-                average_completion_time_minutes=provider_data["average_completion_time_minutes"],
-                status=provider_data["status"],
-                is_verified=provider_data["is_verified"],
-                verification_date=datetime.now(timezone.utc),
-                business_address=provider_data["business_address"],
-                tax_id=provider_data["tax_id"],
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
-                last_active=datetime.now(timezone.utc)
-            )
-            
-            db.add(new_provider)
-            created_count += 1
-            print(f"✅ Created provider: {provider_data['name']}")
+        now = datetime.now(timezone.utc)
+        provider_rows = (
+            {
+                **provider_data,
+                "id": uuid.UUID(provider_data["id"]),
+                "verification_date": now,
+                "created_at": now,
+                "updated_at": now,
+                "last_active": now
+            }
+            for provider_data in providers_data
+        )
         
+        # Existing providers (same id or email) are skipped by ON CONFLICT DO NOTHING
+        result = bulk_load(db, Provider, provider_rows, returning="name")
         db.commit()
         
+        created_count = result.rows_inserted
+        for name in result.returned:
+            print(f"✅ Created provider: {name}")
+        
         if created_count > 0:
             print(f"\n🎉 Successfully created {created_count} test providers!")
         else:
@@ -380,56 +360,27 @@ def create_test_inventory_items():
     
     db = SessionLocal()
     try:
-        created_count = 0
-        
-        for item_data in inventory_items_data:
-            # Check if inventory item already exists
-            existing_item = db.query(InventoryItem).filter(
-                InventoryItem.sku == item_data["sku"]
-            ).first()
-            
-            if existing_item:
-                print(f"⚠️  Inventory item {item_data['product_name']} already exists, skipping...")
-                continue
-            
-            # Create new inventory item
-            new_item = InventoryItem(
-                id=uuid.UUID(item_data["id"]),
-                provider_id=uuid.UUID(item_data["provider_id"]),
-                product_name=item_data["product_name"],
-                description=item_data["description"],
-                category=item_data["category"],
-                subcategory=item_data["subcategory"],
-                brand=item_data["brand"],
-                model_number=item_data["model_number"],
-                condition=item_data["condition"],
-                condition_notes=item_data["condition_notes"],
-                dimensions_estimate=item_data["dimensions_estimate"],
-                color=item_data["color"],
-                material=item_data["material"],
-                estimated_price_min=item_data["estimated_price_min"],
-                estimated_price_max=item_data["estimated_price_max"],
-                currency=item_data["currency"],
-                marketability_score=item_data["marketability_score"],
-                key_features=item_data["key_features"],
-                tags=item_data["tags"],
-                confidence_score=item_data["confidence_score"],
-                original_filename=item_data["original_filename"],
-                image_url=item_data["image_url"],
-                status=item_data["status"],
-                quantity=item_data["quantity"],
-                sku=item_data["sku"],
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
-                analyzed_at=datetime.now(timezone.utc)
-            )
-            
-            db.add(new_item)
-            created_count += 1
-            print(f"✅ Created inventory item: {item_data['product_name']}")
+        now = datetime.now(timezone.utc)
+        item_rows = (
+            {
+                **item_data,
+                "id": uuid.UUID(item_data["id"]),
+                "provider_id": uuid.UUID(item_data["provider_id"]),
+                "created_at": now,
+                "updated_at": now,
+                "analyzed_at": now
+            }
+            for item_data in inventory_items_data
+        )
         
+        # Existing items (same id or SKU) are skipped by ON CONFLICT DO NOTHING
+        result = bulk_load(db, InventoryItem, item_rows, returning="product_name")
         db.commit()
         
+        created_count = result.rows_inserted
+        for name in result.returned:
+            print(f"✅ Created inventory item: {name}")
+        
         if created_count > 0:
             print(f"\n🎉 Successfully created {created_count} test inventory items!")
         else:
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
+import uuid
 
 from database.database import get_database_session
-from database.schemas import InventorySearchRequest, InventorySearchResponse, InventoryItemWithProviderResponse
+from database.schemas import (
+    InventorySearchRequest, InventorySearchResponse, InventoryItemWithProviderResponse, SearchModeEnum,
+    SimilarInventoryItemResponse, SimilarItemsResponse, WeightedSearchRequest, WeightedSearchResponse
+)
 from database.crud import InventoryCRUD
+from image_storage import signed_url_cache
+from search import semantic_search, visual_search, attribute_search, EmbeddingUnavailable, SignatureNotFound
 
 # Create router for customer routes
 router = APIRouter(prefix="/customer", tags=["Customer"])
@@ -14,14 +20,25 @@ async def search_inventory(
     db: Session = Depends(get_database_session)
 ):
     """
-    Keyword search over inventory description.
-    - Accepts a single query string `q`.
-    - Splits into words and matches all occurrences in `description`.
-    - Returns best matches ranked by number of keyword hits.
+    Search active inventory.
+    - `hybrid` (default): nearest items by text embedding, so "cozy winter layer"
+      finds a knit sweater, reranked together with the full-text rank.
+    - `text`: ranked full-text search over description, name, brand and category.
+      Hybrid searches fall back to it while the query cannot be embedded.
     """
     try:
         q = search_request.query
-        matching_items = InventoryCRUD.search_inventory(db, search_term=q, provider_id=None, limit=25)
+        scores = {}
+        matching_items = None
+        if search_request.mode == SearchModeEnum.HYBRID:
+            try:
+                hits = await semantic_search.search(db, q, limit=25)
+                matching_items = [hit.item for hit in hits]
+                scores = {hit.item.id: round(hit.score, 4) for hit in hits}
+            except EmbeddingUnavailable as e:
+                print(f"Hybrid search unavailable, using text search: {e}")
+        if matching_items is None:
+            matching_items = InventoryCRUD.search_inventory(db, search_term=q, provider_id=None, limit=25)
 
         if not matching_items:
             matching_items = InventoryCRUD.get_random_inventory_items(db, limit=5)
@@ -29,11 +46,16 @@ async def search_inventory(
         else:
             message = f"Found {len(matching_items)} matching items"
 
+        # Signed in one pass for the whole page; cached URLs are reused
+        image_urls = await signed_url_cache.image_urls(matching_items)
+
         # Convert to response format and add provider information
         inventory_responses = []
-        for item in matching_items:
+        for item, image_url in zip(matching_items, image_urls):
             # Create the response object with provider information
             response_obj = InventoryItemWithProviderResponse.model_validate(item)
+            response_obj.image_url = image_url
+            response_obj.relevance_score = scores.get(item.id)
             response_obj.business_name = item.provider.business_name
             response_obj.business_address = item.provider.business_address
             response_obj.business_address_map_url = f"https://maps.google.com/maps?q={item.provider.business_address.replace(' ', '+')}" if item.provider.business_address else None
@@ -47,3 +69,89 @@ async def search_inventory(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching inventory: {str(e)}")
+
+@router.post("/search/attributes", response_model=WeightedSearchResponse)
+async def search_inventory_by_attributes(
+    search_request: WeightedSearchRequest,
+    db: Session = Depends(get_database_session)
+):
+    """
+    Structured search by category, subcategory, color, style and aesthetic.
+    Items matching any of them are ranked by the summed weights of those they
+    match (category 5, subcategory 4, color 3, style 3, aesthetic 3).
+    """
+    try:
+        criteria = search_request.model_dump(exclude={"limit"}, exclude_none=True)
+        if not InventoryCRUD.attribute_criteria(search_request):
+            raise HTTPException(status_code=400, detail="Give at least one of category, subcategory, color, style or aesthetic")
+
+        hits = attribute_search.search(db, search_request, limit=search_request.limit)
+        message = f"Found {len(hits)} matching items" if hits else "No items matched these attributes"
+
+        image_urls = await signed_url_cache.image_urls([item for item, _ in hits])
+
+        inventory_responses = []
+        for (item, score), image_url in zip(hits, image_urls):
+            response_obj = InventoryItemWithProviderResponse.model_validate(item)
+            response_obj.image_url = image_url
+            response_obj.relevance_score = score
+            response_obj.business_name = item.provider.business_name
+            response_obj.business_address = item.provider.business_address
+            response_obj.business_address_map_url = f"https://maps.google.com/maps?q={item.provider.business_address.replace(' ', '+')}" if item.provider.business_address else None
+            inventory_responses.append(response_obj)
+
+        return WeightedSearchResponse(
+            message=message,
+            inventory_items=inventory_responses,
+            total_matches=len(inventory_responses),
+            criteria=criteria
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching inventory: {str(e)}")
+
+@router.get("/inventory/{inventory_id}/similar", response_model=SimilarItemsResponse)
+async def get_similar_items(
+    inventory_id: uuid.UUID,
+    limit: int = Query(12, ge=1, le=50),
+    db: Session = Depends(get_database_session)
+):
+    """
+    "More like this": active items whose photos look like this item's, by
+    color distribution and perceptual hash. Served from a local index; no AI call.
+    """
+    try:
+        hits = visual_search.similar(db, inventory_id, limit=limit)
+        if hits:
+            message = f"Found {len(hits)} visually similar items"
+        elif not visual_search.loaded:
+            message = "The visual similarity index is still loading, try again shortly"
+        else:
+            message = "No visually similar items found"
+
+        image_urls = await signed_url_cache.image_urls([hit.item for hit in hits])
+
+        inventory_responses = []
+        for hit, image_url in zip(hits, image_urls):
+            item = hit.item
+            response_obj = SimilarInventoryItemResponse.model_validate(item)
+            response_obj.image_url = image_url
+            response_obj.relevance_score = round(hit.similarity, 4)
+            response_obj.color_similarity = round(hit.color_similarity, 4)
+            response_obj.near_duplicate = hit.near_duplicate
+            response_obj.business_name = item.provider.business_name
+            response_obj.business_address = item.provider.business_address
+            response_obj.business_address_map_url = f"https://maps.google.com/maps?q={item.provider.business_address.replace(' ', '+')}" if item.provider.business_address else None
+            inventory_responses.append(response_obj)
+
+        return SimilarItemsResponse(
+            message=message,
+            inventory_id=inventory_id,
+            inventory_items=inventory_responses,
+            total_matches=len(inventory_responses)
+        )
+    except SignatureNotFound:
+        raise HTTPException(status_code=404, detail=f"Inventory item {inventory_id} not found or its image has not been analyzed")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding similar items: {str(e)}")
@@ -3,6 +3,7 @@ Database module for BGN Provider System
 """
 
 from .database import get_database_session, create_tables, check_database_connection
+from .bulk import bulk_load, BulkLoadResult
 from .models import Provider, InventoryItem
 from .schemas import (
     ProviderCreate, ProviderUpdate, ProviderResponse,
@@ -15,6 +16,10 @@ __all__ = [
     "get_database_session",
     "create_tables", 
     "check_database_connection",
+
+    # Bulk loading
+    "bulk_load",
+    "BulkLoadResult",
     
     # Models
     "Provider",
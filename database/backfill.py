@@ -0,0 +1,214 @@
+"""
+Online batched backfills for Alembic migrations.
+
+A single UPDATE over inventory_items holds row locks on the whole table for
+the duration of the statement. A backfill instead walks the table in
+primary-key order (keyset pagination), updates one small batch per
+statement, pauses between batches and records its cursor in
+`backfill_checkpoints`, so an interrupted run resumes where it stopped and
+progress shows up in GET /admin/migration-status.
+
+Typical use inside a revision, after adding the new column:
+
+    from database.backfill import Backfill, run_backfill
+
+    def upgrade():
+        op.add_column('inventory_items', sa.Column('name_normalized', sa.String(255)))
+        with op.get_context().autocommit_block():
+            run_backfill(op.get_bind(), Backfill(
+                name='inventory_items.name_normalized',
+                table='inventory_items',
+                set_sql="name_normalized = lower(trim(product_name))",
+                where_sql="name_normalized IS NULL",
+            ))
+
+`bind` must be an Engine (each batch gets its own transaction) or a
+Connection in autocommit mode such as the one inside `autocommit_block()`.
+Each batch is a single statement that also advances the checkpoint, so the
+two can never disagree.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .models import BackfillCheckpoint
+
+# SQLSTATEs worth retrying: lock_not_available, deadlock_detected, query_canceled (statement timeout)
+RETRYABLE_SQLSTATES = {"55P03", "40P01", "57014"}
+
+
+@dataclass
+class Backfill:
+    name: str  # Unique checkpoint name, e.g. "inventory_items.search_vector"
+    table: str
+    set_sql: str  # SET clause applied to each row, may reference the row's columns
+    where_sql: Optional[str] = None  # Restrict to rows that still need work
+    key: str = "id"
+    key_type: str = "uuid"
+    batch_size: int = 1000
+    min_batch_size: int = 100
+    target_batch_seconds: float = 0.5  # Batches slower than this shrink, faster ones grow back
+    pause_seconds: float = 0.05  # Throttle between batches to leave room for production traffic
+    lock_timeout_ms: int = 2000
+    max_retries: int = 5
+
+
+def _batch_sql(backfill: Backfill) -> str:
+    predicate = f" AND ({backfill.where_sql})" if backfill.where_sql else ""
+    key = backfill.key
+    return f"""
+        WITH batch AS (
+            SELECT {key} FROM {backfill.table}
+            WHERE (CAST(:last_key AS TEXT) IS NULL OR {key} > CAST(:last_key AS {backfill.key_type})){predicate}
+            ORDER BY {key}
+            LIMIT :batch_size
+        ),
+        updated AS (
+            UPDATE {backfill.table} AS t SET {backfill.set_sql}
+            FROM batch WHERE t.{key} = batch.{key}
+            RETURNING 1
+        ),
+        progress AS (
+            UPDATE backfill_checkpoints SET
+                last_key = COALESCE((SELECT CAST({key} AS TEXT) FROM batch ORDER BY {key} DESC LIMIT 1), last_key),
+                rows_processed = rows_processed + (SELECT count(*) FROM updated),
+                batch_size = :batch_size,
+                updated_at = now() AT TIME ZONE 'utc'
+            WHERE name = :name
+            RETURNING last_key, rows_processed
+        )
+        SELECT last_key, rows_processed, (SELECT count(*) FROM batch) AS batch_rows FROM progress
+    """
+
+
+def _execute(bind: Union[Engine, Connection], sql: str, params: Dict[str, Any], lock_timeout_ms: int = 0):
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            if lock_timeout_ms:
+                conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+            return conn.execute(text(sql), params).fetchall()
+    return bind.execute(text(sql), params).fetchall()
+
+
+def _set_status(bind, name: str, status: str, error: Optional[str] = None):
+    completed = ", completed_at = now() AT TIME ZONE 'utc'" if status == "completed" else ""
+    _execute(bind, f"""
+        UPDATE backfill_checkpoints
+        SET status = :status, error = :error, updated_at = now() AT TIME ZONE 'utc'{completed}
+        WHERE name = :name
+    """, {"name": name, "status": status, "error": error})
+
+
+def run_backfill(
+    bind: Union[Engine, Connection],
+    backfill: Backfill,
+    max_batches: Optional[int] = None,
+    log: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """Run (or resume) a backfill until no rows are left or max_batches is hit"""
+    estimate = _execute(bind, "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)",
+                        {"table": backfill.table})
+    checkpoint = _execute(bind, """
+        INSERT INTO backfill_checkpoints
+            (name, table_name, status, rows_processed, estimated_total_rows, batch_size, started_at, updated_at)
+        VALUES (:name, :table, 'running', 0, :estimate, :batch_size, now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc')
+        ON CONFLICT (name) DO UPDATE SET
+            status = CASE WHEN backfill_checkpoints.status = 'completed' THEN 'completed' ELSE 'running' END,
+            estimated_total_rows = EXCLUDED.estimated_total_rows,
+            error = NULL
+        RETURNING status, last_key, rows_processed
+    """, {"name": backfill.name, "table": backfill.table, "estimate": estimate[0][0] if estimate else None,
+          "batch_size": backfill.batch_size})[0]
+
+    status, last_key, rows_processed = checkpoint
+    if status == "completed":
+        log(f"📋 Backfill {backfill.name} already completed ({rows_processed} rows), skipping")
+        return {"name": backfill.name, "status": status, "rows_processed": rows_processed}
+    if last_key:
+        log(f"🔄 Resuming backfill {backfill.name} after key {last_key} ({rows_processed} rows done)")
+
+    session_lock_timeout = not isinstance(bind, Engine)
+    if session_lock_timeout:
+        bind.execute(text(f"SET lock_timeout = {int(backfill.lock_timeout_ms)}"))
+
+    sql = _batch_sql(backfill)
+    batch_size = backfill.batch_size
+    batches = 0
+    retries = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            started = time.perf_counter()
+            try:
+                row = _execute(bind, sql, {"name": backfill.name, "last_key": last_key, "batch_size": batch_size},
+                               lock_timeout_ms=0 if session_lock_timeout else backfill.lock_timeout_ms)[0]
+            except OperationalError as e:
+                sqlstate = getattr(e.orig, "pgcode", None) or getattr(e.orig, "sqlstate", None)
+                if sqlstate not in RETRYABLE_SQLSTATES or retries >= backfill.max_retries:
+                    raise
+                retries += 1
+                batch_size = max(backfill.min_batch_size, batch_size // 2)
+                log(f"⚠️  Backfill {backfill.name} batch hit {sqlstate}, retry {retries} with batch size {batch_size}")
+                time.sleep(backfill.pause_seconds * (2 ** retries))
+                continue
+
+            elapsed = time.perf_counter() - started
+            retries = 0
+            batches += 1
+            last_key, rows_processed, batch_rows = row
+            if batch_rows == 0:
+                _set_status(bind, backfill.name, "completed")
+                log(f"✅ Backfill {backfill.name} completed: {rows_processed} rows")
+                return {"name": backfill.name, "status": "completed", "rows_processed": rows_processed}
+
+            # Keep each batch short so row locks are held only briefly
+            if elapsed > backfill.target_batch_seconds:
+                batch_size = max(backfill.min_batch_size, batch_size // 2)
+            elif elapsed < backfill.target_batch_seconds / 4:
+                batch_size = min(backfill.batch_size, batch_size * 2)
+
+            if backfill.pause_seconds:
+                time.sleep(backfill.pause_seconds)
+
+        log(f"⏸️  Backfill {backfill.name} paused after {batches} batches ({rows_processed} rows)")
+        return {"name": backfill.name, "status": "running", "rows_processed": rows_processed}
+
+    except Exception as e:
+        _set_status(bind, backfill.name, "failed", error=str(e))
+        raise
+    finally:
+        if session_lock_timeout:
+            bind.execute(text("RESET lock_timeout"))
+
+
+def get_backfill_status(db: Session) -> List[Dict[str, Any]]:
+    """Progress of every recorded backfill, for GET /admin/migration-status"""
+    checkpoints = db.query(BackfillCheckpoint).order_by(BackfillCheckpoint.started_at.desc()).all()
+    status = []
+    for checkpoint in checkpoints:
+        percent = None
+        if checkpoint.status == "completed":
+            percent = 100.0
+        elif checkpoint.estimated_total_rows:
+            percent = round(min(99.9, 100.0 * checkpoint.rows_processed / checkpoint.estimated_total_rows), 1)
+        status.append({
+            "name": checkpoint.name,
+            "table": checkpoint.table_name,
+            "status": checkpoint.status,
+            "rows_processed": checkpoint.rows_processed,
+            "estimated_total_rows": checkpoint.estimated_total_rows,
+            "percent_complete": percent,
+            "last_key": checkpoint.last_key,
+            "batch_size": checkpoint.batch_size,
+            "error": checkpoint.error,
+            "started_at": checkpoint.started_at.isoformat() + "Z" if checkpoint.started_at else None,
+            "updated_at": checkpoint.updated_at.isoformat() + "Z" if checkpoint.updated_at else None,
+            "completed_at": checkpoint.completed_at.isoformat() + "Z" if checkpoint.completed_at else None,
+        })
+    return status
@@ -0,0 +1,259 @@
+"""
+Bulk loading of providers and inventory items.
+
+Rows are streamed from any iterable of dicts into PostgreSQL with COPY into a
+temporary staging table, then moved into the target table with a single
+INSERT ... SELECT ... ON CONFLICT DO NOTHING, so re-running a load is safe.
+Drivers without COPY support fall back to multi-row INSERT ... ON CONFLICT
+DO NOTHING. Use this instead of per-row ORM inserts when seeding staging or
+benchmark databases.
+"""
+
+import enum
+import io
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from sqlalchemy import JSON, Table, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+
+@dataclass
+class BulkLoadResult:
+    table: str
+    rows_read: int = 0
+    rows_inserted: int = 0
+    elapsed_s: float = 0.0
+    returned: List[Any] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def _array_literal(values) -> str:
+    """Render a Python sequence as a PostgreSQL array literal"""
+    items = []
+    for value in values:
+        if value is None:
+            items.append("NULL")
+        else:
+            escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{escaped}"')
+    return "{" + ",".join(items) + "}"
+
+
+def _encoder_for(column) -> Callable[[Any], Any]:
+    """Return a function converting a Python value to its COPY CSV form"""
+    if isinstance(column.type, ARRAY):
+        return lambda value: _array_literal(value)
+    if isinstance(column.type, JSON):
+        return lambda value: json.dumps(value)
+
+    def encode(value):
+        if isinstance(value, enum.Enum):
+            # SQLAlchemy Enum columns store member names
+            return value.name
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+    return encode
+
+
+def _default_for(column) -> Optional[Callable[[], Any]]:
+    """Python-side column default (uuid4, utcnow, enum defaults...), if any"""
+    default = column.default
+    if default is None:
+        return None
+    if default.is_callable:
+        return lambda: default.arg(None)
+    if default.is_scalar:
+        return lambda: default.arg
+    return None
+
+
+class _CopyStream(io.TextIOBase):
+    """File-like object producing CSV text lazily from a row iterator"""
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._lines)
+            except StopIteration:
+                break
+        if size < 0:
+            chunk, self._buffer = self._buffer, ""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+def _resolve_table(target) -> Table:
+    return target if isinstance(target, Table) else target.__table__
+
+
+def _csv_field(value) -> str:
+    # Unquoted empty is NULL for COPY ... (FORMAT csv); everything else is
+    # quoted so empty strings survive as ''.
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _csv_lines(rows: Iterable[List[Any]]) -> Iterator[str]:
+    for row in rows:
+        yield ",".join(_csv_field(value) for value in row) + "\n"
+
+
+def _copy_chunk(conn: Connection, table: Table, columns, encoded_rows, returning) -> List[Any]:
+    """COPY one chunk into a staging table and merge it into the target"""
+    stage = f"bulk_stage_{table.name}"
+    column_list = ", ".join(f'"{c.name}"' for c in columns)
+    conn.execute(text(
+        f'CREATE TEMP TABLE IF NOT EXISTS {stage} (LIKE "{table.name}" INCLUDING DEFAULTS) ON COMMIT DROP'
+    ))
+    conn.execute(text(f"TRUNCATE {stage}"))
+
+    copy_sql = f"COPY {stage} ({column_list}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2
+            cursor.copy_expert(copy_sql, _CopyStream(_csv_lines(encoded_rows)))
+        else:
+            # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                for line in _csv_lines(encoded_rows):
+                    copy.write(line)
+    finally:
+        cursor.close()
+
+    returning_sql = f' RETURNING "{returning}"' if returning else ' RETURNING 1'
+    result = conn.execute(text(
+        f'INSERT INTO "{table.name}" ({column_list}) SELECT {column_list} FROM {stage} '
+        f'ON CONFLICT DO NOTHING{returning_sql}'
+    ))
+    return list(result.scalars())
+
+
+def _insert_chunk(conn: Connection, table: Table, columns, raw_rows, returning) -> List[Any]:
+    """Multi-row INSERT ... ON CONFLICT DO NOTHING for drivers without COPY"""
+    returned_column = table.c[returning] if returning else list(table.primary_key.columns)[0]
+    stmt = pg_insert(table).on_conflict_do_nothing().returning(returned_column)
+    params = [{c.key: value for c, value in zip(columns, row)} for row in raw_rows]
+    return list(conn.execute(stmt, params).scalars())
+
+
+def _supports_copy(conn: Connection) -> bool:
+    dbapi_connection = conn.connection.dbapi_connection
+    cursor = dbapi_connection.cursor()
+    try:
+        return hasattr(cursor, "copy_expert") or hasattr(cursor, "copy")
+    finally:
+        cursor.close()
+
+
+def bulk_load(
+    bind: Union[Engine, Connection, Session],
+    target,
+    rows: Iterable[Dict[str, Any]],
+    chunk_size: int = 50_000,
+    returning: Optional[str] = None,
+    use_copy: bool = True,
+    on_chunk: Optional[Callable[[BulkLoadResult], None]] = None,
+) -> BulkLoadResult:
+    """Stream `rows` into the table of `target` (a model class or Table).
+
+    Rows already present (any unique or primary key conflict) are skipped.
+    Missing keys are filled from the model's Python-side defaults. The
+    columns loaded are those of the first row, so a later row setting a
+    column the first row left out raises ValueError.
+
+    With an Engine each chunk is committed on its own, so long loads make
+    durable progress; with a Connection or Session the caller owns the
+    transaction. `returning` names a column whose values for newly inserted
+    rows are collected in `BulkLoadResult.returned`.
+    """
+    table = _resolve_table(target)
+    result = BulkLoadResult(table=table.name)
+    iterator = iter(rows)
+
+    first = next(iterator, None)
+    if first is None:
+        return result
+
+    columns = [c for c in table.columns if c.key in first or c.default is not None]
+    encoders = [_encoder_for(c) for c in columns]
+    defaults = [_default_for(c) for c in columns]
+    keys = [c.key for c in columns]
+    # Columns are fixed by the first row; a later row setting one of these would lose it
+    unloaded = {c.key for c in table.columns} - set(keys)
+
+    def materialize(row):
+        if not unloaded.isdisjoint(row):
+            raise ValueError(
+                f"Row sets {sorted(unloaded.intersection(row))} for {table.name}, which the first row "
+                "did not; give every row the same keys"
+            )
+        values = []
+        for key, default in zip(keys, defaults):
+            if key in row:
+                values.append(row[key])
+            else:
+                values.append(default() if default else None)
+        return values
+
+    def load_chunk(conn: Connection, chunk: List[Dict[str, Any]], copy_supported: bool) -> List[Any]:
+        raw_rows = [materialize(row) for row in chunk]
+        if copy_supported:
+            encoded = (
+                [None if v is None else enc(v) for enc, v in zip(encoders, values)]
+                for values in raw_rows
+            )
+            return _copy_chunk(conn, table, columns, encoded, returning)
+        return _insert_chunk(conn, table, columns, raw_rows, returning)
+
+    started = time.perf_counter()
+    all_rows = itertools.chain([first], iterator)
+    while True:
+        chunk = list(itertools.islice(all_rows, chunk_size))
+        if not chunk:
+            break
+
+        if isinstance(bind, Engine):
+            with bind.begin() as conn:
+                inserted = load_chunk(conn, chunk, use_copy and _supports_copy(conn))
+        else:
+            conn = bind.connection() if isinstance(bind, Session) else bind
+            inserted = load_chunk(conn, chunk, use_copy and _supports_copy(conn))
+
+        result.rows_read += len(chunk)
+        result.rows_inserted += len(inserted)
+        if returning:
+            result.returned.extend(inserted)
+        result.elapsed_s = time.perf_counter() - started
+        if on_chunk:
+            on_chunk(result)
+
+    result.elapsed_s = time.perf_counter() - started
+    return result
@@ -1,17 +1,28 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, Query, contains_eager
 from sqlalchemy import and_, or_, func, case
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import uuid
 import random
+import re
 
 from .models import Provider, InventoryItem, InventoryStatus
 from .schemas import (
     ProviderCreate, ProviderUpdate,
     InventoryItemCreate, InventoryItemUpdate,
-    InventorySearchRequest
+    WeightedSearchRequest
 )
 
+# Structured attribute search: request field -> (inventory column, weight)
+ATTRIBUTE_SEARCH_FIELDS = {
+    "category": ("category", 5),
+    "subcategory": ("subcategory", 4),
+    "color": ("color", 3),
+    "style": ("key_features", 3),
+    "aesthetic": ("tags", 3),
+}
+ARRAY_ATTRIBUTE_COLUMNS = ("key_features", "tags")
+
 # Provider CRUD Operations
 class ProviderCRUD:
     
@@ -144,7 +155,8 @@ class InventoryCRUD:
         if category:
             query = query.filter(InventoryItem.category == category)
         
-        return query.offset(skip).limit(limit).all()
+        # Newest first; served by ix_inventory_items_provider_status_updated_at
+        return query.order_by(InventoryItem.updated_at.desc()).offset(skip).limit(limit).all()
     
     @staticmethod
     def update_inventory_item(
@@ -190,15 +202,47 @@ class InventoryCRUD:
         ts_rank_cd descending, then by most recent update. Not all words need
         to match; ranking promotes best matches.
         """
+        query = InventoryCRUD.build_search_query(db, search_term, provider_id, skip, limit)
+        if query is None:
+            return []
+        return query.all()
+
+    @staticmethod
+    def build_search_query(
+        db: Session,
+        search_term: str,
+        provider_id: Optional[uuid.UUID] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Optional[Query]:
+        """Build the ranked full-text query used by search_inventory.
+
+        Returns None for a blank search term. Exposed separately so the
+        search benchmark can EXPLAIN exactly the statement the API runs.
+        """
         cleaned_query = (search_term or "").strip()
         if not cleaned_query:
-            return []
+            return None
 
         base_query = db.query(InventoryItem).join(Provider).filter(InventoryItem.status == InventoryStatus.ACTIVE)
 
         if provider_id:
             base_query = base_query.filter(InventoryItem.provider_id == provider_id)
 
+        combined_vec, tsquery = InventoryCRUD.text_search_expressions(cleaned_query)
+        rank_expr = func.ts_rank_cd(combined_vec, tsquery)
+
+        return (
+            base_query
+            .filter(combined_vec.op('@@')(tsquery))
+            .order_by(rank_expr.desc(), InventoryItem.updated_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+    
+    @staticmethod
+    def text_search_expressions(search_term: str):
+        """Weighted document tsvector and web-style tsquery shared by the text search paths"""
         # Build weighted tsvector
         desc_vec = func.setweight(
             func.to_tsvector('english', func.coalesce(InventoryItem.description, '')),
@@ -219,103 +263,89 @@ class InventoryCRUD:
         combined_vec = desc_vec.op('||')(name_vec).op('||')(brand_vec).op('||')(cat_vec)
 
         # Build tsquery using web-style parsing (supports quotes, -exclude, etc.)
-        tsquery = func.websearch_to_tsquery('english', cleaned_query)
+        tsquery = func.websearch_to_tsquery('english', search_term)
+        return combined_vec, tsquery
 
-        rank_expr = func.ts_rank_cd(combined_vec, tsquery)
+    @staticmethod
+    def text_search_ids(db: Session, search_term: str, limit: int = 100) -> List[Tuple[uuid.UUID, float]]:
+        """(id, ts_rank_cd) of the best full-text matches among active items"""
+        query = InventoryCRUD.build_search_query(db, search_term, limit=limit)
+        if query is None:
+            return []
+        combined_vec, tsquery = InventoryCRUD.text_search_expressions(search_term.strip())
+        return [tuple(row) for row in query.with_entities(InventoryItem.id, func.ts_rank_cd(combined_vec, tsquery)).all()]
 
-        results = (
-            base_query
-            .filter(combined_vec.op('@@')(tsquery))
-            .order_by(rank_expr.desc(), InventoryItem.updated_at.desc())
-            .offset(skip)
-            .limit(limit)
+    @staticmethod
+    def get_active_items_with_text_rank(
+        db: Session, item_ids: List[uuid.UUID], search_term: str
+    ) -> List[Tuple[InventoryItem, float]]:
+        """Active items among item_ids, each with its ts_rank_cd for search_term (0 when it does not match)"""
+        if not item_ids:
+            return []
+        combined_vec, tsquery = InventoryCRUD.text_search_expressions(search_term.strip())
+        rows = (
+            db.query(InventoryItem, func.ts_rank_cd(combined_vec, tsquery))
+            .join(Provider)
+            .options(contains_eager(InventoryItem.provider))
+            .filter(InventoryItem.id.in_(item_ids), InventoryItem.status == InventoryStatus.ACTIVE)
             .all()
         )
-
-        return results
+        return [(item, float(rank or 0.0)) for item, rank in rows]
     
+    @staticmethod
+    def attribute_tokens(text: Optional[str]) -> List[str]:
+        """Lowercase words of an attribute value or query"""
+        return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+    @staticmethod
+    def attribute_criteria(search_request: WeightedSearchRequest) -> Dict[str, Tuple[List[str], float]]:
+        """{inventory column: (query words, weight)} for the attributes a request names"""
+        criteria = {}
+        for field, (column, weight) in ATTRIBUTE_SEARCH_FIELDS.items():
+            words = InventoryCRUD.attribute_tokens(getattr(search_request, field))
+            if words:
+                criteria[column] = (words, weight)
+        return criteria
+
     @staticmethod
     def weighted_search_inventory(
         db: Session,
-        search_request: InventorySearchRequest,
+        search_request: WeightedSearchRequest,
         skip: int = 0,
         limit: int = 100
-    ) -> List[InventoryItem]:
-        """Weighted search for inventory items based on multiple criteria"""
-        query = db.query(InventoryItem).filter(InventoryItem.status == InventoryStatus.ACTIVE)
-        
-        # Build weighted search conditions
-        conditions = []
-        weights = []
-        
-        # Category (required) - highest weight
-        if search_request.category:
-            category_condition = InventoryItem.category.ilike(f"%{search_request.category}%")
-            conditions.append(category_condition)
-            weights.append(5)  # Highest weight for required field
-        
-        # Subcategory (optional) - high weight
-        if search_request.subcategory:
-            subcategory_condition = InventoryItem.subcategory.ilike(f"%{search_request.subcategory}%")
-            conditions.append(subcategory_condition)
-            weights.append(4)
-        
-        # Color (optional) - medium weight
-        if search_request.color:
-            color_condition = InventoryItem.color.ilike(f"%{search_request.color}%")
-            conditions.append(color_condition)
-            weights.append(3)
-        
-        # Style in key_features (optional) - medium weight
-        if search_request.style:
-            style_condition = func.array_to_string(InventoryItem.key_features, ',').ilike(f"%{search_request.style}%")
-            conditions.append(style_condition)
-            weights.append(3)
-        
-        # Aesthetic in tags (optional) - medium weight
-        if search_request.aesthetic:
-            aesthetic_condition = func.array_to_string(InventoryItem.tags, ',').ilike(f"%{search_request.aesthetic}%")
-            conditions.append(aesthetic_condition)
-            weights.append(3)
-        
-        # If no conditions, return empty list
-        if not conditions:
+    ) -> List[Tuple[InventoryItem, float]]:
+        """Active items matching any requested attribute, with the summed weights of those they match.
+
+        An attribute matches when each query word begins a word of the item's
+        value, so "knit" matches "Chunky knitted sweater" but "red" does not
+        match "Bored". Scored and ranked in one statement; ties go to the most
+        recently updated item.
+        """
+        criteria = InventoryCRUD.attribute_criteria(search_request)
+        if not criteria:
             return []
-        
-        # Apply OR logic for matching any criteria
-        search_filter = and_(*conditions)
-        matching_items = query.filter(search_filter).all()
-        
-        # Calculate weighted scores for each item
-        scored_items = []
-        for item in matching_items:
-            score = 0
-            
-            # Check each condition and add weight if matched
-            if search_request.category and item.category and search_request.category.lower() in item.category.lower():
-                score += weights[0] if len(weights) > 0 else 0
-            
-            if search_request.subcategory and item.subcategory and search_request.subcategory.lower() in item.subcategory.lower():
-                score += weights[1] if len(weights) > 1 else 0
-            
-            if search_request.color and item.color and search_request.color.lower() in item.color.lower():
-                score += weights[2] if len(weights) > 2 else 0
-            
-            if search_request.style and item.key_features:
-                style_found = any(search_request.style.lower() in feature.lower() for feature in item.key_features)
-                if style_found:
-                    score += weights[3] if len(weights) > 3 else 0
-            
-            if search_request.aesthetic and item.tags:
-                aesthetic_found = any(search_request.aesthetic.lower() in tag.lower() for tag in item.tags)
-                if aesthetic_found:
-                    score += weights[4] if len(weights) > 4 else 0
-            
-            scored_items.append((item, score))
-        
-        # Sort by score (descending) and return top results
-        scored_items.sort(key=lambda x: x[1], reverse=True)
-        return [item for item, score in scored_items[skip:skip+limit]]
+
+        terms = []
+        for column, (words, weight) in criteria.items():
+            value = getattr(InventoryItem, column)
+            if column in ARRAY_ATTRIBUTE_COLUMNS:
+                value = func.array_to_string(value, ' ')
+            # Word-start match; words are plain [a-z0-9]+, so safe to embed in the pattern
+            matched = and_(*(func.lower(value).regexp_match(f"(^|[^a-z0-9]){word}") for word in words))
+            terms.append(case((matched, weight), else_=0))
+        score = sum(terms[1:], terms[0])
+
+        rows = (
+            db.query(InventoryItem, score)
+            .join(Provider)
+            .options(contains_eager(InventoryItem.provider))
+            .filter(InventoryItem.status == InventoryStatus.ACTIVE, score > 0)
+            .order_by(score.desc(), InventoryItem.updated_at.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return [(item, float(item_score)) for item, item_score in rows]
     
     @staticmethod
     def get_random_inventory_items(db: Session, limit: int = 5) -> List[InventoryItem]:
@@ -328,6 +358,7 @@ class InventoryCRUD:
         # Get random offset
         random_offset = random.randint(0, max(0, total_count - limit))
         
+        # Ordering lets the offset walk ix_inventory_items_active_updated_at instead of a seq scan
         return db.query(InventoryItem).join(Provider).filter(
             InventoryItem.status == InventoryStatus.ACTIVE
-        ).offset(random_offset).limit(limit).all()
\ No newline at end of file
+        ).order_by(InventoryItem.updated_at.desc()).offset(random_offset).limit(limit).all()
\ No newline at end of file
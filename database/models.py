@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, Boolean, JSON, ForeignKey, Enum as SQLEnum
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Text, Float, DateTime, Boolean, JSON, LargeBinary, ForeignKey, Index, text, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
@@ -57,6 +57,10 @@ class Provider(Base):
     
     # Relationships
     inventory_items = relationship("InventoryItem", back_populates="provider")
+    
+    __table_args__ = (
+        Index("ix_providers_status", "status"),
+    )
 
 class InventoryItem(Base):
     __tablename__ = "inventory_items"
@@ -108,4 +112,156 @@ class InventoryItem(Base):
     analyzed_at = Column(DateTime, nullable=True)
     
     # Relationships
-    provider = relationship("Provider", back_populates="inventory_items")
\ No newline at end of file
+    provider = relationship("Provider", back_populates="inventory_items")
+    
+    # Indexes for the hot filter/sort paths (see migration dcb169690751)
+    __table_args__ = (
+        Index("ix_inventory_items_active_updated_at", updated_at.desc(), postgresql_where=text("status = 'ACTIVE'")),
+        Index("ix_inventory_items_active_created_at", created_at.desc(), postgresql_where=text("status = 'ACTIVE'")),
+        Index("ix_inventory_items_active_category", category, updated_at.desc(), postgresql_where=text("status = 'ACTIVE'")),
+        Index("ix_inventory_items_provider_status_updated_at", provider_id, status, updated_at.desc()),
+        Index("ix_inventory_items_provider_category", provider_id, category),
+    )
+
+
+class BackfillCheckpoint(Base):
+    """Progress of an online batched backfill (see database/backfill.py)"""
+    __tablename__ = "backfill_checkpoints"
+    
+    name = Column(String(100), primary_key=True)
+    table_name = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default="running")  # running, completed, failed
+    last_key = Column(String(100), nullable=True)  # Highest key processed so far (keyset cursor)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    estimated_total_rows = Column(Integer, nullable=True)
+    batch_size = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    
+    # Timestamps
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+class AICallRecord(Base):
+    """One upstream model call, written in batches by ai/ledger.py"""
+    __tablename__ = "ai_call_ledger"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    # What made the call; no FK so ledger rows survive provider deletion
+    endpoint = Column(String(100), nullable=True)
+    provider_id = Column(UUID(as_uuid=True), nullable=True)
+    model = Column(String(100), nullable=False)
+    prompt_id = Column(String(100), nullable=True)
+    attempt = Column(Integer, nullable=False, default=1)
+    
+    # Result
+    outcome = Column(String(20), nullable=False)  # success, failed, timeout, rejected
+    error_type = Column(String(100), nullable=True)
+    input_tokens = Column(Integer, nullable=True)
+    output_tokens = Column(Integer, nullable=True)
+    total_tokens = Column(Integer, nullable=True)
+    latency_ms = Column(Float, nullable=True)
+    cost_usd = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_ai_call_ledger_created_at", created_at),
+        Index("ix_ai_call_ledger_endpoint_created_at", endpoint, created_at),
+        Index("ix_ai_call_ledger_provider_created_at", provider_id, created_at),
+    )
+
+class IdempotencyRecord(Base):
+    """Stored response for an Idempotency-Key (see idempotency.py)"""
+    __tablename__ = "idempotency_keys"
+    
+    key = Column(String(255), primary_key=True)
+    scope = Column(String(255), primary_key=True)  # "METHOD /path" the key was used on
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed
+    
+    # Response replayed to retries
+    response_status = Column(Integer, nullable=True)
+    response_content_type = Column(String(100), nullable=True)
+    response_body = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", expires_at),
+    )
+
+class StorageOutbox(Base):
+    """Pending storage side effect, committed with the row change that needs it (see image_storage/outbox.py)"""
+    __tablename__ = "storage_outbox"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    operation = Column(String(20), nullable=False)  # upload, delete
+    storage_path = Column(String(500), nullable=False)
+    inventory_item_id = Column(UUID(as_uuid=True), nullable=True)  # item to update once uploaded
+    
+    # Staging object holding the upload's bytes until it is copied to storage_path
+    staged_path = Column(String(500), nullable=True)
+    
+    # Delivery state
+    status = Column(String(20), nullable=False, default="pending")  # pending, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_storage_outbox_pending", available_at, postgresql_where=text("status = 'pending'")),
+    )
+
+class UploadSession(Base):
+    """Direct-to-storage upload issued by POST /provider/upload-sessions, pending until finalized"""
+    __tablename__ = "upload_sessions"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    provider_id = Column(UUID(as_uuid=True), ForeignKey("providers.id"), nullable=False)
+    # The item id is chosen up front so the object is uploaded straight to its final path
+    inventory_item_id = Column(UUID(as_uuid=True), nullable=False)
+    storage_path = Column(String(500), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    original_filename = Column(String(255), nullable=True)
+    
+    status = Column(String(20), nullable=False, default="pending")  # pending, finalizing, finalized, expired
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    finalized_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_upload_sessions_pending_expiry", expires_at, postgresql_where=text("status = 'pending'")),
+    )
+
+class InventoryEmbedding(Base):
+    """Text embedding of an inventory item for semantic search (see search/semantic.py)"""
+    __tablename__ = "inventory_embeddings"
+    
+    inventory_item_id = Column(UUID(as_uuid=True), ForeignKey("inventory_items.id", ondelete="CASCADE"), primary_key=True)
+    model = Column(String(100), nullable=False)  # Embedder name; vectors from different models are not comparable
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # Unit-length little-endian float32 array
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Migration 7b3e9f1c2d4a also adds an HNSW-indexed `embedding_vector vector(256)`
+    # column when the pgvector extension is available; it is maintained with raw SQL
+    __table_args__ = (
+        Index("ix_inventory_embeddings_updated_at", updated_at),
+    )
+
+class InventoryVisualSignature(Base):
+    """Color histogram and perceptual hash of an item's image for "more like this" (see ai/visual.py)"""
+    __tablename__ = "inventory_visual_signatures"
+    
+    inventory_item_id = Column(UUID(as_uuid=True), ForeignKey("inventory_items.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(String(50), nullable=False)  # Signature algorithm; rows from other versions are recomputed
+    color_histogram = Column(LargeBinary, nullable=False)  # Little-endian float32 array
+    phash = Column(BigInteger, nullable=False)  # 64-bit DCT perceptual hash
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_inventory_visual_signatures_updated_at", updated_at),
+    )
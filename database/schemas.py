@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
+import re
 import uuid
 
 # Enums
@@ -86,23 +87,82 @@ class InventoryItemUpdate(BaseModel):
     status: Optional[InventoryStatusEnum] = None
     quantity: Optional[int] = Field(None, ge=0)
 
+# One amount: optional sign, digits with optional thousands separators and decimal part
+_NUMBER = r"[+-]?(?:\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d{1,3}(?:\.\d{3})+,\d+|\d+(?:[.,]\d+)?)"
+_CURRENCY = r"(?:[€$£]|[A-Z]{3})?"
+# A whole value: an amount with optional currency, or a range "45-60" / "45 to 60" (first amount taken)
+_NUMBER_VALUE = re.compile(
+    rf"\s*{_CURRENCY}\s*(?P<number>{_NUMBER})(?:\s*(?:-|–|to)\s*{_CURRENCY}\s*{_NUMBER})?\s*{_CURRENCY}\s*"
+)
+
+# A lone dot before exactly three digits: 1.2 with a decimal point, 1200 with European grouping
+_AMBIGUOUS_GROUPING = re.compile(r"[+-]?\d{1,3}\.\d{3}")
+
+def _coerce_number(value):
+    """Accept numbers or numeric strings ("45", "€45.50", "1,200", "1.200,50", "45-60"); anything else becomes None.
+
+    "1.200" is rejected rather than guessed: with EUR prices it usually means
+    1200, but read as a decimal point it is 1.2. "1,200" is taken as 1200,
+    since prices never carry three decimals.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    match = _NUMBER_VALUE.fullmatch(str(value))
+    if match is None:
+        return None
+    number = match.group("number")
+    if _AMBIGUOUS_GROUPING.fullmatch(number):
+        return None
+    if "," in number and "." in number:
+        # Whichever separator comes last is the decimal point
+        decimal = "," if number.rindex(",") > number.rindex(".") else "."
+        thousands = "." if decimal == "," else ","
+        number = number.replace(thousands, "").replace(decimal, ".")
+    elif "," in number:
+        # "1,200" groups thousands; "12,5" is a decimal comma
+        number = number.replace(",", "") if re.fullmatch(r"[+-]?\d{1,3}(?:,\d{3})+", number) else number.replace(",", ".")
+    return float(number)
+
+class PriceRange(BaseModel):
+    min: Optional[float] = Field(None, description="Minimum estimated resale price")
+    max: Optional[float] = Field(None, description="Maximum estimated resale price")
+    currency: Optional[str] = Field("EUR", description="ISO currency code, e.g. EUR")
+
+    @field_validator("min", "max", mode="before")
+    @classmethod
+    def _parse_price(cls, value):
+        return _coerce_number(value)
+
 class AIAnalysisResult(BaseModel):
-    product_name: str
-    category: Optional[str] = None
-    subcategory: Optional[str] = None
-    description: Optional[str] = None
-    key_features: List[str] = []
-    brand: Optional[str] = None
-    model_number: Optional[str] = None
-    condition: Optional[str] = None
-    condition_notes: Optional[str] = None
-    dimensions_estimate: Optional[str] = None
-    color: Optional[str] = None
-    material: Optional[str] = None
-    estimated_price_range: Optional[Dict[str, Any]] = None
-    marketability_score: Optional[float] = Field(None, ge=1, le=10)
-    tags: List[str] = []
-    additional_notes: Optional[str] = None
+    product_name: str = Field(..., description="Clear, descriptive product name")
+    category: Optional[str] = Field(None, description="Primary product category")
+    subcategory: Optional[str] = Field(None, description="More specific subcategory")
+    description: Optional[str] = Field(None, description="Detailed product description")
+    key_features: List[str] = Field([], description="Key features and specifications")
+    brand: Optional[str] = Field(None, description="Brand name if visible")
+    model_number: Optional[str] = Field(None, description="Model/SKU if visible")
+    condition: Optional[str] = Field(None, description="New/Used/Refurbished assessment")
+    condition_notes: Optional[str] = Field(None, description="Specific condition observations")
+    dimensions_estimate: Optional[str] = Field(None, description="Estimated size description")
+    color: Optional[str] = Field(None, description="Primary color(s)")
+    material: Optional[str] = Field(None, description="Material type if identifiable")
+    estimated_price_range: Optional[PriceRange] = Field(None, description="Estimated resale price range in EUR")
+    marketability_score: Optional[float] = Field(None, ge=1, le=10, description="1-10 rating for market appeal")
+    tags: List[str] = Field([], description="Search tags")
+    additional_notes: Optional[str] = Field(None, description="Any other relevant observations")
+
+    @field_validator("key_features", "tags", mode="before")
+    @classmethod
+    def _none_to_empty_list(cls, value):
+        return value or []
+
+    @field_validator("marketability_score", mode="before")
+    @classmethod
+    def _parse_score(cls, value):
+        score = _coerce_number(value)
+        return min(10.0, max(1.0, score)) if score is not None else None
 
 class InventoryItemResponse(InventoryItemBase):
     model_config = ConfigDict(from_attributes=True)
@@ -135,6 +195,7 @@ class InventoryItemWithProviderResponse(InventoryItemResponse):
     business_name: Optional[str] = None
     business_address: Optional[str] = None
     business_address_map_url: Optional[str] = None
+    relevance_score: Optional[float] = None  # Search score, when ranked by one
 
 class InventoryUploadResponse(BaseModel):
     inventory_id: uuid.UUID
@@ -159,12 +220,49 @@ class InventoryListResponse(BaseModel):
     total_items: int
     active_items: int
 
+class InventoryBulkDeleteRequest(BaseModel):
+    inventory_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=500, description="Items to delete")
+
+class UploadSessionCreate(BaseModel):
+    content_type: str = Field(..., pattern=r"^image/[\w.+-]+$", description="MIME type the client will upload")
+    filename: Optional[str] = Field(None, max_length=255)
+
 # Search Schemas
+class SearchModeEnum(str, Enum):
+    HYBRID = "hybrid"  # Embedding nearest neighbours reranked with full-text rank
+    TEXT = "text"  # Full-text search only
+
 class InventorySearchRequest(BaseModel):
     query: str = Field(..., min_length=1, max_length=255, description="Search query; keywords matched in description")
+    mode: SearchModeEnum = Field(SearchModeEnum.HYBRID, description="hybrid (semantic + full-text) or text")
 
 class InventorySearchResponse(BaseModel):
     message: str
     inventory_items: List[InventoryItemWithProviderResponse]
     total_matches: int
-    query: str
\ No newline at end of file
+    query: str
+
+class WeightedSearchRequest(BaseModel):
+    """Structured attribute search; an item scores the weights of the attributes it matches"""
+    category: Optional[str] = Field(None, max_length=100, description="Weight 5")
+    subcategory: Optional[str] = Field(None, max_length=100, description="Weight 4")
+    color: Optional[str] = Field(None, max_length=50, description="Weight 3")
+    style: Optional[str] = Field(None, max_length=100, description="Weight 3, matched against key features")
+    aesthetic: Optional[str] = Field(None, max_length=100, description="Weight 3, matched against tags")
+    limit: int = Field(25, ge=1, le=100)
+
+class WeightedSearchResponse(BaseModel):
+    message: str
+    inventory_items: List[InventoryItemWithProviderResponse]
+    total_matches: int
+    criteria: Dict[str, str]
+
+class SimilarInventoryItemResponse(InventoryItemWithProviderResponse):
+    color_similarity: Optional[float] = None
+    near_duplicate: bool = False  # Same or nearly the same photo
+
+class SimilarItemsResponse(BaseModel):
+    message: str
+    inventory_id: uuid.UUID
+    inventory_items: List[SimilarInventoryItemResponse]
+    total_matches: int
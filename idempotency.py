@@ -0,0 +1,376 @@
+"""
+Idempotency-Key support for uploads and mutations.
+
+A client that retries a request with the same `Idempotency-Key` header gets
+the response of the first attempt replayed instead of a second Gemini call,
+GCS upload or database write. Keys are scoped to the method and path they
+were used on and stored with their response in `idempotency_keys` for
+IDEMPOTENCY_TTL_HOURS (24 by default); recent ones are also kept in an
+in-process LRU so most retries never reach the database.
+
+- A retry while the first attempt is still running gets 409 with Retry-After.
+- Reusing a key with a different request body gets 422.
+- Only 2xx and definitive 4xx responses (400, 404, 422) are stored. Transient
+  ones (408, 409, 425, 429) and 5xx release the key, so the client can retry
+  them for real.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Pattern, Tuple
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database.database import SessionLocal
+from database.models import IdempotencyRecord
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# 4xx responses that a retry of the same request would get again; other
+# statuses outside 2xx (408, 409, 425, 429, 5xx, ...) release the key
+FINAL_CLIENT_ERRORS = frozenset({400, 404, 422})
+
+# (method, path pattern) of endpoints honouring Idempotency-Key
+IDEMPOTENT_ROUTES: List[Tuple[str, Pattern]] = [
+    ("POST", re.compile(r"^/provider/upload-inventory(/batch)?$")),
+    ("POST", re.compile(r"^/provider/upload-sessions/[^/]+/finalize$")),
+    ("PUT", re.compile(r"^/provider/update/[^/]+$")),
+    ("PUT", re.compile(r"^/provider/inventory/[^/]+$")),
+    ("DELETE", re.compile(r"^/provider/inventory/[^/]+$")),
+    ("POST", re.compile(r"^/provider/inventory/bulk-delete$")),
+]
+
+
+@dataclass
+class StoredResponse:
+    request_hash: str
+    status: int
+    content_type: Optional[str]
+    body: str
+    expires_at: datetime
+
+
+class IdempotencyStore:
+    """Postgres-backed key store with an in-memory LRU of completed responses"""
+
+    def __init__(self, ttl: timedelta, lock_timeout: timedelta, cache_size: int = 2048):
+        self.ttl = ttl
+        # An in_progress claim older than this is assumed abandoned (crashed worker)
+        self.lock_timeout = lock_timeout
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], StoredResponse]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "IdempotencyStore":
+        return cls(
+            ttl=timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))),
+            lock_timeout=timedelta(seconds=float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "300"))),
+        )
+
+    def cached(self, key: str, scope: str) -> Optional[StoredResponse]:
+        stored = self._cache.get((key, scope))
+        if stored is None:
+            return None
+        if stored.expires_at <= datetime.utcnow():
+            del self._cache[(key, scope)]
+            return None
+        self._cache.move_to_end((key, scope))
+        return stored
+
+    def _remember(self, key: str, scope: str, stored: StoredResponse):
+        self._cache[(key, scope)] = stored
+        self._cache.move_to_end((key, scope))
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def claim(self, key: str, scope: str, request_hash: str) -> Tuple[str, Optional[StoredResponse]]:
+        """Claim a key for a new request.
+
+        Returns ("claimed", None), ("completed", response), ("in_progress", None)
+        or ("mismatch", None) when the key was used with a different request.
+        """
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            inserted = db.execute(
+                pg_insert(IdempotencyRecord)
+                .values(
+                    key=key, scope=scope, request_hash=request_hash, status="in_progress",
+                    created_at=now, expires_at=now + self.ttl,
+                )
+                .on_conflict_do_nothing()
+                .returning(IdempotencyRecord.key)
+            ).first()
+            if inserted:
+                db.commit()
+                return "claimed", None
+
+            record = db.execute(
+                select(IdempotencyRecord)
+                .where(IdempotencyRecord.key == key, IdempotencyRecord.scope == scope)
+                .with_for_update()
+            ).scalar_one_or_none()
+            if record is None:
+                # Purged between the insert and the select; treat as new next time
+                db.rollback()
+                return "in_progress", None
+
+            abandoned = record.status == "in_progress" and record.created_at < now - self.lock_timeout
+            if record.expires_at <= now or abandoned:
+                record.request_hash = request_hash
+                record.status = "in_progress"
+                record.response_status = record.response_content_type = record.response_body = None
+                record.created_at = now
+                record.expires_at = now + self.ttl
+                db.commit()
+                return "claimed", None
+
+            db.rollback()
+            if record.request_hash != request_hash:
+                return "mismatch", None
+            if record.status != "completed":
+                return "in_progress", None
+            stored = StoredResponse(
+                record.request_hash, record.response_status, record.response_content_type,
+                record.response_body or "", record.expires_at,
+            )
+        self._remember(key, scope, stored)
+        return "completed", stored
+
+    def complete(self, key: str, scope: str, request_hash: str, status: int, content_type: Optional[str], body: str):
+        with SessionLocal() as db:
+            record = db.get(IdempotencyRecord, (key, scope))
+            if record is None:
+                return
+            record.status = "completed"
+            record.response_status = status
+            record.response_content_type = content_type
+            record.response_body = body
+            db.commit()
+            expires_at = record.expires_at
+        self._remember(key, scope, StoredResponse(request_hash, status, content_type, body, expires_at))
+
+    def release(self, key: str, scope: str):
+        """Drop an in_progress claim so the request can be retried"""
+        with SessionLocal() as db:
+            db.execute(
+                delete(IdempotencyRecord).where(
+                    IdempotencyRecord.key == key,
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.status == "in_progress",
+                )
+            )
+            db.commit()
+
+    def purge_expired(self, batch_size: int = 5000) -> int:
+        """Delete expired keys in small batches; returns the number deleted"""
+        deleted = 0
+        while True:
+            with SessionLocal() as db:
+                expired = (
+                    select(IdempotencyRecord.key, IdempotencyRecord.scope)
+                    .where(IdempotencyRecord.expires_at <= datetime.utcnow())
+                    .limit(batch_size)
+                )
+                result = db.execute(
+                    delete(IdempotencyRecord).where(
+                        tuple_(IdempotencyRecord.key, IdempotencyRecord.scope).in_(expired)
+                    )
+                )
+                db.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                return deleted
+
+
+def _request_hash(method: str, path: str, content_type: str, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}\0".encode())
+    # Multipart boundaries are random per attempt; strip them so retries hash alike
+    match = re.search(r"boundary=\"?([^\";]+)", content_type)
+    if match:
+        body = body.replace(match.group(1).encode(), b"")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware replaying stored responses for repeated Idempotency-Keys"""
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        key = headers.get(IDEMPOTENCY_HEADER, b"").decode("latin-1").strip()
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"})
+            return
+
+        body = await _read_body(receive)
+        key_scope = f"{scope['method']} {scope['path']}"
+        request_hash = _request_hash(
+            scope["method"], scope["path"], headers.get(b"content-type", b"").decode("latin-1"), body
+        )
+
+        stored = self.store.cached(key, key_scope)
+        if stored is not None:
+            state = "completed" if stored.request_hash == request_hash else "mismatch"
+        else:
+            try:
+                state, stored = await asyncio.to_thread(self.store.claim, key, key_scope, request_hash)
+            except Exception as e:
+                # Key store unavailable: serve the request without idempotency rather than fail it
+                print(f"Idempotency store unavailable, processing without key: {e}")
+                await self.app(scope, _replay(body, receive), send)
+                return
+
+        if state == "completed":
+            await _send_stored(send, stored)
+            return
+        if state == "mismatch":
+            await _send_json(send, 422, {"detail": "Idempotency-Key was already used with a different request"})
+            return
+        if state == "in_progress":
+            await _send_json(
+                send, 409, {"detail": "A request with this Idempotency-Key is still being processed"},
+                extra_headers=[(b"retry-after", b"1")],
+            )
+            return
+
+        # Claimed: run the request, capturing the response as it is sent
+        response = {"status": 500, "content_type": None, "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay(body, receive), capture_send)
+        except BaseException:
+            await asyncio.to_thread(self.store.release, key, key_scope)
+            raise
+
+        try:
+            if not _is_final(response["status"]):
+                await asyncio.to_thread(self.store.release, key, key_scope)
+            else:
+                await asyncio.to_thread(
+                    self.store.complete, key, key_scope, request_hash, response["status"],
+                    response["content_type"], b"".join(response["body"]).decode("utf-8", errors="replace"),
+                )
+        except Exception as e:
+            # The response is already sent; the claim expires via the lock timeout
+            print(f"Could not store idempotent response for key {key}: {e}")
+
+    @staticmethod
+    def _applies(scope) -> bool:
+        method, path = scope.get("method", ""), scope.get("path", "")
+        return any(method == route_method and pattern.match(path) for route_method, pattern in IDEMPOTENT_ROUTES)
+
+
+def _is_final(status: int) -> bool:
+    """Whether a response is stored for replay rather than releasing the key"""
+    return 200 <= status < 300 or status in FINAL_CLIENT_ERRORS
+
+
+def _replay(body: bytes, receive):
+    """A receive callable that yields the already-read body, then defers to `receive`"""
+    pending = [body]
+
+    async def replay_receive():
+        if pending:
+            return {"type": "http.request", "body": pending.pop(), "more_body": False}
+        return await receive()
+
+    return replay_receive
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+async def _send_json(send, status: int, payload: dict, extra_headers=None):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *(extra_headers or []),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_stored(send, stored: StoredResponse):
+    body = stored.body.encode()
+    headers = [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+    if stored.content_type:
+        headers.append((b"content-type", stored.content_type.encode("latin-1")))
+    await send({"type": "http.response.start", "status": stored.status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyJanitor:
+    """Background task purging expired keys"""
+
+    def __init__(self, store: IdempotencyStore, interval: float = 3600.0):
+        self.store = store
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            try:
+                deleted = await asyncio.to_thread(self.store.purge_expired)
+                if deleted:
+                    print(f"🧹 Purged {deleted} expired idempotency keys")
+            except Exception as e:
+                print(f"Idempotency key cleanup failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+# Shared instances used by main.py
+idempotency_store = IdempotencyStore.from_env()
+idempotency_janitor = IdempotencyJanitor(idempotency_store)
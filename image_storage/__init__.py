@@ -0,0 +1,62 @@
+"""
+Image storage module for BGN Provider System
+"""
+
+from .base import (
+    StorageBackend, StoredObject, PendingWrite, SigningNotSupported, inventory_storage_path, encode_jpeg
+)
+from .gcs import GCSStorageBackend, get_bucket
+from .local import LocalStorageBackend
+from .storage import get_storage, set_storage
+from .signed_uploads import (
+    signed_upload_url, load_uploaded_image, UploadNotFound, UploadTooLarge, UPLOAD_URL_TTL, MAX_UPLOAD_BYTES,
+    expire_upload_sessions, upload_session_janitor
+)
+from .signed_urls import SignedUrlCache, signed_url_cache
+from .renditions import RENDITIONS, ImageNotFound, ImageProxy, DiskLRUCache, image_proxy
+from .outbox import enqueue_uploads, discard_staged, enqueue_deletes, outbox_worker, get_outbox_status
+
+__all__ = [
+    # Backends
+    "StorageBackend",
+    "StoredObject",
+    "PendingWrite",
+    "SigningNotSupported",
+    "GCSStorageBackend",
+    "LocalStorageBackend",
+    "get_storage",
+    "set_storage",
+    "get_bucket",
+
+    # Object helpers
+    "inventory_storage_path",
+    "encode_jpeg",
+
+    # Outbox
+    "enqueue_uploads",
+    "discard_staged",
+    "enqueue_deletes",
+    "outbox_worker",
+    "get_outbox_status",
+
+    # Signed uploads
+    "signed_upload_url",
+    "load_uploaded_image",
+    "UploadNotFound",
+    "UploadTooLarge",
+    "UPLOAD_URL_TTL",
+    "MAX_UPLOAD_BYTES",
+    "expire_upload_sessions",
+    "upload_session_janitor",
+
+    # Signed read URLs
+    "SignedUrlCache",
+    "signed_url_cache",
+
+    # Renditions
+    "RENDITIONS",
+    "ImageNotFound",
+    "ImageProxy",
+    "DiskLRUCache",
+    "image_proxy"
+]
@@ -0,0 +1,163 @@
+"""
+Storage backend interface shared by the GCS and local-filesystem backends.
+
+Backends implement a small blocking API (write, copy, read, stat,
+delete_many, iter_chunks). The base class builds the concurrent and async variants on
+top of it, so every backend gets parallel uploads and deletes and streaming
+reads the same way.
+"""
+
+import asyncio
+import io
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+class SigningNotSupported(Exception):
+    """The backend cannot issue signed URLs (e.g. local filesystem)"""
+
+
+@dataclass
+class StoredObject:
+    storage_path: str
+    size: int
+    content_type: Optional[str] = None
+
+
+@dataclass
+class PendingWrite:
+    storage_path: str
+    data: bytes
+    content_type: str = "image/jpeg"
+    metadata: Optional[Dict[str, str]] = None
+
+
+class StorageBackend(ABC):
+    name = "base"
+    supports_signing = False
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    # Blocking primitives
+
+    @abstractmethod
+    def write(self, storage_path: str, data: bytes, content_type: str = "image/jpeg",
+              metadata: Optional[Dict[str, str]] = None):
+        """Store an object; readers never see a partially written one"""
+
+    @abstractmethod
+    def copy(self, source_path: str, storage_path: str):
+        """Copy an object with its content type and metadata; raises FileNotFoundError when the source is missing"""
+
+    @abstractmethod
+    def read(self, storage_path: str) -> bytes:
+        """Object contents; raises FileNotFoundError when missing"""
+
+    @abstractmethod
+    def stat(self, storage_path: str) -> Optional[StoredObject]:
+        """Size and content type, or None when the object does not exist"""
+
+    @abstractmethod
+    def delete_many(self, storage_paths: List[str]) -> Dict[str, str]:
+        """Delete objects; missing ones count as deleted. Returns {storage_path: error} for failures"""
+
+    @abstractmethod
+    def iter_chunks(self, storage_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Object contents in chunks; raises FileNotFoundError when missing"""
+
+    @abstractmethod
+    def public_url(self, storage_path: str) -> str:
+        pass
+
+    def signed_url(self, storage_path: str, method: str, expiration: timedelta,
+                   content_type: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> str:
+        raise SigningNotSupported(f"The {self.name} storage backend cannot sign URLs")
+
+    def sign_many(self, storage_paths: List[str], expiration: timedelta) -> Dict[str, str]:
+        """Signed GET URLs for many objects; failed ones are left out"""
+        def sign(storage_path):
+            try:
+                return self.signed_url(storage_path, "GET", expiration)
+            except Exception as e:
+                print(f"Could not sign URL for {storage_path}: {e}")
+                return None
+        signed = self._map(sign, storage_paths)
+        return {path: url for path, url in zip(storage_paths, signed) if url is not None}
+
+    # Concurrency built on the primitives
+
+    def _map(self, fn, items: list) -> list:
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"storage-{self.name}")
+        return list(self._pool.map(fn, items))
+
+    def write_many(self, writes: List[PendingWrite]) -> Dict[str, Optional[Exception]]:
+        """Write objects in parallel (blocking); returns {storage_path: error or None}"""
+        def write(pending: PendingWrite):
+            try:
+                self.write(pending.storage_path, pending.data, pending.content_type, pending.metadata)
+                return None
+            except Exception as e:
+                return e
+        return dict(zip((pending.storage_path for pending in writes), self._map(write, writes)))
+
+    def copy_many(self, copies: List[Tuple[str, str]]) -> Dict[str, Optional[Exception]]:
+        """Copy (source_path, storage_path) pairs in parallel (blocking); returns {storage_path: error or None}"""
+        def copy(pair):
+            try:
+                self.copy(*pair)
+                return None
+            except Exception as e:
+                return e
+        return dict(zip((storage_path for _, storage_path in copies), self._map(copy, copies)))
+
+    async def upload(self, storage_path: str, data: bytes, content_type: str = "image/jpeg",
+                     metadata: Optional[Dict[str, str]] = None):
+        await asyncio.to_thread(self.write, storage_path, data, content_type, metadata)
+
+    async def upload_many(self, writes: List[PendingWrite]) -> Dict[str, Optional[Exception]]:
+        return await asyncio.to_thread(self.write_many, writes)
+
+    async def delete(self, storage_paths: List[str]) -> Dict[str, str]:
+        return await asyncio.to_thread(self.delete_many, storage_paths)
+
+    async def download(self, storage_path: str) -> bytes:
+        return await asyncio.to_thread(self.read, storage_path)
+
+    async def stream(self, storage_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Async iterator over an object's contents, reading each chunk off the event loop"""
+        chunks = self.iter_chunks(storage_path, chunk_size)
+        done = object()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, done)
+                if chunk is done:
+                    return
+                yield chunk
+        finally:
+            chunks.close()
+
+
+def inventory_storage_path(provider_id, inventory_id, filename: Optional[str]) -> str:
+    """Object path for an item's image: inventory/{provider_id}/{inventory_id}{ext}"""
+    file_extension = os.path.splitext(filename)[1] if filename else '.jpg'
+    return f"inventory/{provider_id}/{inventory_id}{file_extension}"
+
+
+def encode_jpeg(image: Image.Image) -> bytes:
+    """Re-encode an image the way it is stored in the bucket"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85, optimize=True)
+    return buffer.getvalue()
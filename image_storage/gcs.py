@@ -0,0 +1,153 @@
+"""
+Google Cloud Storage backend.
+"""
+
+import os
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional
+
+import google.auth.transport.requests
+from google.api_core import exceptions as google_exceptions
+from google.auth.credentials import Signing
+from google.cloud import storage
+
+from .base import STREAM_CHUNK_SIZE, StorageBackend, StoredObject
+
+# GCS accepts at most 100 calls per batch request
+DELETE_BATCH_SIZE = 100
+
+_clients = {}
+
+
+def get_bucket():
+    """Bucket named by GCS_BUCKET; the client is created once per process"""
+    bucket_name = os.getenv("GCS_BUCKET")
+    if not bucket_name:
+        raise Exception("Google Cloud Storage bucket not configured")
+
+    # On Cloud Run the project is auto-detected; for local development set
+    # GOOGLE_CLOUD_PROJECT and run `gcloud auth application-default login`
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+    cache_key = (storage.Client, project_id)
+    client = _clients.get(cache_key)
+    if client is None:
+        client = storage.Client(project=project_id) if project_id else storage.Client()
+        _clients[cache_key] = client
+    return client.bucket(bucket_name)
+
+
+def signing_kwargs(bucket) -> Dict[str, str]:
+    """Extra generate_signed_url() arguments needed by the client's credentials.
+
+    Cloud Run's metadata-server credentials hold no private key, so URLs are
+    signed through IAM with the service account's access token instead. The
+    token is only refreshed when it is about to expire.
+    """
+    credentials = getattr(bucket.client, "_credentials", None)
+    if credentials is None or isinstance(credentials, Signing):
+        return {}
+    if not credentials.valid:
+        credentials.refresh(google.auth.transport.requests.Request())
+    return {"service_account_email": credentials.service_account_email, "access_token": credentials.token}
+
+
+class GCSStorageBackend(StorageBackend):
+    name = "gcs"
+    supports_signing = True
+
+    def write(self, storage_path: str, data: bytes, content_type: str = "image/jpeg",
+              metadata: Optional[Dict[str, str]] = None):
+        blob = get_bucket().blob(storage_path)
+        blob.metadata = metadata
+        # Single-request upload; GCS objects only become visible once complete
+        blob.upload_from_string(data, content_type=content_type)
+
+    def copy(self, source_path: str, storage_path: str):
+        bucket = get_bucket()
+        try:
+            # Server-side rewrite; content type and metadata come along, the bytes never leave GCS
+            bucket.copy_blob(bucket.blob(source_path), bucket, storage_path)
+        except google_exceptions.NotFound:
+            raise FileNotFoundError(source_path)
+
+    def read(self, storage_path: str) -> bytes:
+        try:
+            return get_bucket().blob(storage_path).download_as_bytes()
+        except google_exceptions.NotFound:
+            raise FileNotFoundError(storage_path)
+
+    def stat(self, storage_path: str) -> Optional[StoredObject]:
+        blob = get_bucket().get_blob(storage_path)
+        if blob is None:
+            return None
+        return StoredObject(storage_path, blob.size or 0, blob.content_type)
+
+    def delete_many(self, storage_paths: List[str]) -> Dict[str, str]:
+        """Delete using batch requests; objects that are already gone count as deleted,
+        so callers never need an exists() round trip first."""
+        bucket = get_bucket()
+        failures = {}
+        for start in range(0, len(storage_paths), DELETE_BATCH_SIZE):
+            chunk = storage_paths[start:start + DELETE_BATCH_SIZE]
+            try:
+                with bucket.client.batch() as batch:
+                    for storage_path in chunk:
+                        bucket.delete_blob(storage_path)
+            except Exception:
+                # A batch only reports one of its failures (404s included), so
+                # delete the chunk's objects one by one to learn which failed
+                failures.update(self._delete_each(bucket, chunk))
+        return failures
+
+    def _delete_each(self, bucket, storage_paths: List[str]) -> Dict[str, str]:
+        def delete(storage_path):
+            try:
+                bucket.blob(storage_path).delete()
+            except google_exceptions.NotFound:
+                pass
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+            return None
+        errors = self._map(delete, storage_paths)
+        return {path: error for path, error in zip(storage_paths, errors) if error is not None}
+
+    def iter_chunks(self, storage_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        blob = get_bucket().blob(storage_path)
+        try:
+            # Ranged downloads, so a large object is never held in memory at once
+            with blob.open("rb", chunk_size=chunk_size) as reader:
+                while chunk := reader.read(chunk_size):
+                    yield chunk
+        except google_exceptions.NotFound:
+            raise FileNotFoundError(storage_path)
+
+    def public_url(self, storage_path: str) -> str:
+        return f"https://storage.googleapis.com/{os.getenv('GCS_BUCKET')}/{storage_path}"
+
+    def signed_url(self, storage_path: str, method: str, expiration: timedelta,
+                   content_type: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> str:
+        bucket = get_bucket()
+        return bucket.blob(storage_path).generate_signed_url(
+            version="v4",
+            expiration=expiration,
+            method=method,
+            content_type=content_type,
+            headers=headers,
+            **signing_kwargs(bucket),
+        )
+
+    def sign_many(self, storage_paths: List[str], expiration: timedelta) -> Dict[str, str]:
+        # Check credentials once for the whole page; every signature reuses them
+        bucket = get_bucket()
+        credentials = signing_kwargs(bucket)
+
+        def sign(storage_path):
+            try:
+                return bucket.blob(storage_path).generate_signed_url(
+                    version="v4", expiration=expiration, method="GET", **credentials
+                )
+            except Exception as e:
+                print(f"Could not sign URL for {storage_path}: {e}")
+                return None
+        signed = self._map(sign, storage_paths)
+        return {path: url for path, url in zip(storage_paths, signed) if url is not None}
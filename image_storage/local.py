@@ -0,0 +1,117 @@
+"""
+Local-filesystem backend for tests, benchmarks and on-prem deployments.
+
+Objects live under STORAGE_LOCAL_ROOT at their storage_path, with content
+type and metadata in a JSON sidecar under `.meta/`. Writes go to a temporary
+file in the target directory, are fsynced, and are renamed into place, so a
+reader never sees a partial object. Reads are memory-mapped.
+"""
+
+import contextlib
+import json
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from .base import STREAM_CHUNK_SIZE, StorageBackend, StoredObject
+
+META_DIR = ".meta"
+
+
+class LocalStorageBackend(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str, base_url: str = "/storage", max_workers: int = 16):
+        super().__init__(max_workers=max_workers)
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, storage_path: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, storage_path))
+        if not path.startswith(self.root + os.sep) or f"{os.sep}{META_DIR}{os.sep}" in path[len(self.root):]:
+            raise ValueError(f"Invalid storage path: {storage_path}")
+        return path
+
+    def _meta_path(self, storage_path: str) -> str:
+        return os.path.join(self.root, META_DIR, storage_path + ".json")
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+
+    def write(self, storage_path: str, data: bytes, content_type: str = "image/jpeg",
+              metadata: Optional[Dict[str, str]] = None):
+        path = self._path(storage_path)
+        # Sidecar first: a visible object always has its content type recorded
+        meta = json.dumps({"content_type": content_type, "metadata": metadata or {}}).encode()
+        self._atomic_write(self._meta_path(storage_path), meta)
+        self._atomic_write(path, data)
+
+    def copy(self, source_path: str, storage_path: str):
+        with open(self._path(source_path), "rb") as f:
+            data = f.read()
+        with contextlib.suppress(FileNotFoundError):
+            with open(self._meta_path(source_path), "rb") as f:
+                self._atomic_write(self._meta_path(storage_path), f.read())
+        self._atomic_write(self._path(storage_path), data)
+
+    @contextmanager
+    def _mapped(self, storage_path: str):
+        with open(self._path(storage_path), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def read(self, storage_path: str) -> bytes:
+        with self._mapped(storage_path) as mapped:
+            return bytes(mapped)
+
+    def iter_chunks(self, storage_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        with self._mapped(storage_path) as mapped:
+            for start in range(0, len(mapped), chunk_size):
+                yield mapped[start:start + chunk_size]
+
+    def stat(self, storage_path: str) -> Optional[StoredObject]:
+        try:
+            size = os.stat(self._path(storage_path)).st_size
+        except FileNotFoundError:
+            return None
+        content_type = None
+        with contextlib.suppress(FileNotFoundError):
+            with open(self._meta_path(storage_path)) as f:
+                content_type = json.load(f).get("content_type")
+        return StoredObject(storage_path, size, content_type)
+
+    def delete_many(self, storage_paths: List[str]) -> Dict[str, str]:
+        def delete(storage_path):
+            try:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(self._path(storage_path))
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(self._meta_path(storage_path))
+                return None
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+        errors = self._map(delete, storage_paths)
+        return {path: error for path, error in zip(storage_paths, errors) if error is not None}
+
+    def public_url(self, storage_path: str) -> str:
+        return f"{self.base_url}/{storage_path}"
+
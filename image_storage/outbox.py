@@ -0,0 +1,325 @@
+"""
+Transactional outbox for storage side effects.
+
+Routes add a `storage_outbox` row in the same transaction as the inventory
+change that needs it, so a single commit makes both durable (or neither).
+Image bytes never go into the row: the route first writes them to a staging
+object under `outbox/` and the row keeps only that path. `OutboxWorker`
+drains the outbox in the background:
+
+- upload: copies the staged object to its final path (a server-side copy on
+  GCS; a batch's copies run in parallel), then sets the item's
+  image_url/storage_path in the same transaction that removes the outbox row,
+  so an item never points at an object that does not exist. If the item was
+  deleted meanwhile, the entry turns into a delete of the copied object. The
+  staged object is deleted last.
+- delete: removes objects left behind by deleted items. Deletes are sent as
+  GCS batch requests, and objects that are already gone count as deleted.
+
+Storage access goes through the configured backend (see storage.py).
+
+Rows are claimed with FOR UPDATE SKIP LOCKED and leased by pushing their
+`available_at` out by `lease_seconds`; the claim is committed before any
+storage call, so no row lock is held during network I/O and several API
+instances can run workers side by side. An entry whose worker dies becomes
+due again when its lease runs out. Failed entries are retried with
+exponential backoff and marked `failed` after `max_attempts`.
+
+Staged objects of transactions that rolled back are deleted by the route on
+a best-effort basis; a lifecycle rule on the `outbox/` prefix (see
+GCS-SETUP.md) catches the rest.
+"""
+
+import asyncio
+import contextlib
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal
+from database.models import InventoryItem, StorageOutbox
+from .base import PendingWrite, StorageBackend
+from .gcs import DELETE_BATCH_SIZE
+from .storage import get_storage
+
+
+# Prefix of image bytes waiting for the outbox worker to copy them into place
+STAGING_PREFIX = "outbox/"
+
+
+async def enqueue_uploads(db: Session, uploads: List[Tuple[uuid.UUID, PendingWrite]]) -> List[StorageOutbox]:
+    """Stage image uploads for (inventory_item_id, write) pairs; they happen only if the caller's transaction commits.
+
+    The bytes are written to staging objects right away (in parallel), so the
+    outbox rows only carry their paths. Pass the returned entries to
+    `discard_staged` if the transaction is rolled back.
+    """
+    now = datetime.utcnow()
+    entries, staged = [], []
+    for inventory_item_id, pending in uploads:
+        entry_id = uuid.uuid4()
+        staged_path = f"{STAGING_PREFIX}{entry_id}{os.path.splitext(pending.storage_path)[1]}"
+        staged.append(PendingWrite(staged_path, pending.data, pending.content_type, pending.metadata))
+        entries.append(StorageOutbox(
+            id=entry_id,
+            operation="upload",
+            storage_path=pending.storage_path,
+            staged_path=staged_path,
+            inventory_item_id=inventory_item_id,
+            status="pending",
+            attempts=0,
+            available_at=now,
+            created_at=now,
+        ))
+
+    storage = get_storage()
+    errors = await storage.upload_many(staged)
+    failed = [error for error in errors.values() if error is not None]
+    if failed:
+        await discard_staged(entries)
+        raise failed[0]
+    db.add_all(entries)
+    return entries
+
+
+async def discard_staged(entries: List[StorageOutbox]):
+    """Best-effort removal of staged objects whose transaction did not commit"""
+    staged_paths = [entry.staged_path for entry in entries if entry.staged_path]
+    if not staged_paths:
+        return
+    try:
+        failures = await get_storage().delete(staged_paths)
+    except Exception as e:
+        failures = {path: f"{type(e).__name__}: {e}" for path in staged_paths}
+    for path, error in failures.items():
+        print(f"Could not discard staged upload {path}: {error}")
+
+
+def enqueue_deletes(db: Session, storage_paths: Iterable[str]) -> int:
+    """Stage object deletions in the caller's transaction; returns how many were queued"""
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "operation": "delete",
+            "storage_path": storage_path,
+            "status": "pending",
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+        }
+        for storage_path in storage_paths
+        if storage_path
+    ]
+    if rows:
+        db.execute(insert(StorageOutbox), rows)
+    return len(rows)
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        batch_size: int = 20,
+        delete_batch_size: int = DELETE_BATCH_SIZE,
+        poll_interval: float = 5.0,
+        max_attempts: int = 8,
+        lease_seconds: float = 300.0,
+    ):
+        # Uploads each copy an image, so fewer are claimed at a time than deletes
+        self.batch_size = batch_size
+        self.delete_batch_size = delete_batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.processed = 0
+        self.failed = 0
+
+    def notify(self):
+        """Process new entries now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    def _apply_upload(db: Session, storage: StorageBackend, entry: StorageOutbox) -> bool:
+        """Point the item at its uploaded object; False when the item no longer exists"""
+        updated = (
+            db.query(InventoryItem)
+            .filter(InventoryItem.id == entry.inventory_item_id)
+            .update(
+                {"image_url": storage.public_url(entry.storage_path), "storage_path": entry.storage_path},
+                synchronize_session=False,
+            )
+        )
+        return bool(updated)
+
+    def _retry_later(self, entry: StorageOutbox, error: str, now: datetime):
+        # attempts was already counted when the entry was claimed
+        entry.last_error = error[:2000]
+        if entry.attempts >= self.max_attempts:
+            entry.status = "failed"
+            self.failed += 1
+            print(f"❌ Storage outbox entry {entry.id} ({entry.operation} {entry.storage_path}) failed: {error}")
+        else:
+            entry.available_at = now + timedelta(seconds=min(600, 2 ** entry.attempts))
+
+    def _claim(self, operation: str, limit: int) -> List[StorageOutbox]:
+        """Lease due entries and commit, so no row lock is held while storage is called"""
+        now = datetime.utcnow()
+        with SessionLocal(expire_on_commit=False) as db:
+            entries = (
+                db.query(StorageOutbox)
+                .filter(
+                    StorageOutbox.operation == operation,
+                    StorageOutbox.status == "pending",
+                    StorageOutbox.available_at <= now,
+                )
+                .order_by(StorageOutbox.available_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for entry in entries:
+                entry.attempts += 1
+                entry.available_at = now + timedelta(seconds=self.lease_seconds)
+            db.commit()
+        return entries
+
+    @staticmethod
+    def _reclaim(db: Session, entries: List[StorageOutbox]) -> Dict[uuid.UUID, StorageOutbox]:
+        """Lock claimed entries again to record their outcome; ones another worker holds or finished are left out"""
+        if not entries:
+            return {}
+        rows = (
+            db.query(StorageOutbox)
+            .filter(StorageOutbox.id.in_([entry.id for entry in entries]), StorageOutbox.status == "pending")
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        return {row.id: row for row in rows}
+
+    def process_batch(self) -> int:
+        """Claim and apply one batch of due entries (blocking); returns how many were handled"""
+        uploads = self._claim("upload", self.batch_size)
+        deletes = self._claim("delete", self.delete_batch_size)
+        if not uploads and not deletes:
+            return 0
+
+        # Storage I/O, with no transaction open
+        storage = get_storage()
+        copy_errors = {}
+        if uploads:
+            copy_errors = storage.copy_many([(entry.staged_path, entry.storage_path) for entry in uploads])
+        delete_failures = {}
+        if deletes:
+            try:
+                delete_failures = storage.delete_many([entry.storage_path for entry in deletes])
+            except Exception as e:
+                delete_failures = {entry.storage_path: f"{type(e).__name__}: {e}" for entry in deletes}
+
+        now = datetime.utcnow()
+        published = []
+        with SessionLocal() as db:
+            rows = self._reclaim(db, uploads)
+            for entry in uploads:
+                row = rows.get(entry.id)
+                if row is None:
+                    continue
+                error = copy_errors.get(entry.storage_path)
+                if error is not None:
+                    self._retry_later(row, f"{type(error).__name__}: {error}", now)
+                    continue
+                try:
+                    with db.begin_nested():
+                        if self._apply_upload(db, storage, row):
+                            db.delete(row)
+                        else:
+                            # Item deleted before its image landed; the entry becomes a
+                            # delete of the copied object, retried until it succeeds
+                            row.operation = "delete"
+                            row.attempts = 0
+                            row.available_at = now
+                    published.append(entry.staged_path)
+                    self.processed += 1
+                except Exception as e:
+                    self._retry_later(row, f"{type(e).__name__}: {e}", now)
+
+            rows = self._reclaim(db, deletes)
+            for entry in deletes:
+                row = rows.get(entry.id)
+                if row is None:
+                    continue
+                if entry.storage_path in delete_failures:
+                    self._retry_later(row, delete_failures[entry.storage_path], now)
+                else:
+                    db.delete(row)
+                    self.processed += 1
+            db.commit()
+
+        if published:
+            # Only after the commit: a retry of an uncommitted entry still needs its staged copy
+            try:
+                failures = storage.delete_many(published)
+            except Exception as e:
+                failures = {path: f"{type(e).__name__}: {e}" for path in published}
+            for path, error in failures.items():
+                print(f"Could not remove staged upload {path}: {error}")
+        return len(uploads) + len(deletes)
+
+    async def _run(self):
+        while True:
+            try:
+                # Drain everything that is due (failures back off), then wait for a nudge or the poll
+                while await asyncio.to_thread(self.process_batch) > 0:
+                    pass
+            except Exception as e:
+                print(f"Storage outbox worker error: {e}")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"processed": self.processed, "failed": self.failed}
+
+
+def get_outbox_status(db: Session) -> Dict[str, Any]:
+    """Backlog per operation and status, with the age of the oldest pending entry"""
+    rows = (
+        db.query(StorageOutbox.operation, StorageOutbox.status, func.count(), func.min(StorageOutbox.created_at))
+        .group_by(StorageOutbox.operation, StorageOutbox.status)
+        .all()
+    )
+    now = datetime.utcnow()
+    return {
+        "queues": [
+            {
+                "operation": operation,
+                "status": status,
+                "count": count,
+                "oldest_age_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+            }
+            for operation, status, count, oldest in rows
+        ],
+        "worker": outbox_worker.stats(),
+    }
+
+
+# Shared worker started with the app
+outbox_worker = OutboxWorker()
@@ -0,0 +1,273 @@
+"""
+Image renditions served by GET /images/{inventory_id}/{rendition}.
+
+Renditions are generated from the stored original on first request and kept
+in a bounded on-disk LRU cache (IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB), so
+repeat requests are served straight from local disk without touching the
+database or the storage backend. Concurrent misses for the same rendition
+share one generation. Each cached file's name carries a hash of its
+contents, used as a stable ETag across restarts and instances. Files are
+handed out already open (`ImageProxy.open_file`), so evicting one while a
+response is being prepared cannot pull it out from under that response.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, BinaryIO, Callable, Dict, Optional, Tuple
+
+from PIL import Image
+
+from ai.singleflight import SingleFlight
+from .base import encode_jpeg
+from .storage import get_storage
+
+# Longest edge in pixels per rendition; None serves the stored original as is
+RENDITIONS: Dict[str, Optional[int]] = {
+    "thumb": 160,
+    "small": 320,
+    "medium": 768,
+    "large": 1600,
+    "original": None,
+}
+
+
+class ImageNotFound(Exception):
+    pass
+
+
+# File extension and media type by leading bytes; everything else is treated as JPEG
+_SIGNATURES = [
+    (b"\x89PNG", "png", "image/png"),
+    (b"GIF8", "gif", "image/gif"),
+    (b"RIFF", "webp", "image/webp"),
+]
+_MEDIA_TYPES = {extension: media_type for _, extension, media_type in _SIGNATURES}
+
+# Cached files are named {key hash}.{etag}.{extension}
+_CACHED_NAME = re.compile(r"([0-9a-f]{40})\.([0-9a-f]{32})\.(jpg|png|gif|webp)")
+
+
+def _extension_for(data: bytes) -> str:
+    for signature, extension, _ in _SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    return "jpg"
+
+
+@dataclass
+class CachedFile:
+    path: str
+    size: int
+    etag: str
+    extension: str = "jpg"
+
+    @property
+    def media_type(self) -> str:
+        return _MEDIA_TYPES.get(self.extension, "image/jpeg")
+
+
+class DiskLRUCache:
+    """Files under `root`, evicted least recently used first beyond max_bytes"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def _key_hash(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()[:40]
+
+    def _load(self):
+        """Index files left by a previous run, oldest first; files the cache did not write are left alone"""
+        found = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if filename.startswith(".tmp-"):
+                    # Leftover from an interrupted write
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(path)
+                    continue
+                match = _CACHED_NAME.fullmatch(filename)
+                if match is None:
+                    continue
+                key_hash, etag, extension = match.groups()
+                stat = os.stat(path)
+                found.append((stat.st_mtime, key_hash, CachedFile(path, stat.st_size, etag, extension)))
+        for _, key_hash, cached in sorted(found, key=lambda entry: entry[0]):
+            self._entries[key_hash] = cached
+            self._bytes += cached.size
+        self._evict()
+
+    def get(self, key: str) -> Optional[CachedFile]:
+        key_hash = self._key_hash(key)
+        with self._lock:
+            cached = self._entries.get(key_hash)
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key_hash)
+            self.hits += 1
+            return cached
+
+    def put(self, key: str, data: bytes) -> CachedFile:
+        """Store data atomically under key (blocking)"""
+        key_hash = self._key_hash(key)
+        etag = hashlib.sha256(data).hexdigest()[:32]
+        extension = _extension_for(data)
+        directory = os.path.join(self.root, key_hash[:2])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{key_hash}.{etag}.{extension}")
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+        cached = CachedFile(path, len(data), etag, extension)
+        with self._lock:
+            previous = self._entries.pop(key_hash, None)
+            if previous is not None:
+                self._bytes -= previous.size
+                if previous.path != path:
+                    self._unlink(previous.path)
+            self._entries[key_hash] = cached
+            self._bytes += cached.size
+            self._evict()
+        return cached
+
+    def invalidate(self, key: str, stale: Optional[CachedFile] = None):
+        """Drop key's entry, or with `stale` only if the entry is still that one"""
+        key_hash = self._key_hash(key)
+        with self._lock:
+            cached = self._entries.get(key_hash)
+            if cached is None or (stale is not None and cached is not stale):
+                return
+            del self._entries[key_hash]
+            self._bytes -= cached.size
+            self._unlink(cached.path)
+
+    def _evict(self):
+        # Keep the newest entry even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, cached = self._entries.popitem(last=False)
+            self._bytes -= cached.size
+            self.evictions += 1
+            # Responses hold an open handle (ImageProxy.open_file), which outlives the unlink
+            self._unlink(cached.path)
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def render(original: bytes, max_side: int) -> bytes:
+    """JPEG no larger than max_side on its longest edge (blocking)"""
+    image = Image.open(io.BytesIO(original))
+    # JPEGs decode straight at a reduced scale when the target is much smaller
+    image.draft("RGB", (max_side, max_side))
+    image = image.convert("RGB") if image.mode != "RGB" else image
+    image.thumbnail((max_side, max_side))
+    return encode_jpeg(image)
+
+
+class ImageProxy:
+    def __init__(self, cache: DiskLRUCache):
+        self.cache = cache
+        self._flight = SingleFlight()
+        self.generated = 0
+
+    @classmethod
+    def from_env(cls) -> "ImageProxy":
+        root = os.getenv("IMAGE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "bgn-image-cache")
+        max_bytes = int(float(os.getenv("IMAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+        return cls(DiskLRUCache(root, max_bytes))
+
+    async def get(self, inventory_id: str, rendition: str,
+                  lookup_storage_path: Callable[[], Awaitable[Optional[str]]]) -> CachedFile:
+        """Cached rendition file; `lookup_storage_path` is only called on a miss"""
+        key = f"{inventory_id}/{rendition}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return await self._flight.do(key, lambda: self._generate(inventory_id, rendition, lookup_storage_path))
+
+    async def open_file(self, inventory_id: str, rendition: str,
+                        lookup_storage_path: Callable[[], Awaitable[Optional[str]]]) -> Tuple[CachedFile, BinaryIO]:
+        """Cached rendition and an open handle to it, readable even if the file is evicted meanwhile"""
+        cached = await self.get(inventory_id, rendition, lookup_storage_path)
+        try:
+            return cached, await asyncio.to_thread(open, cached.path, "rb")
+        except FileNotFoundError:
+            # Evicted between the lookup and the open (or deleted behind the cache's back); generate it again
+            self.cache.invalidate(f"{inventory_id}/{rendition}", stale=cached)
+            cached = await self.get(inventory_id, rendition, lookup_storage_path)
+            return cached, await asyncio.to_thread(open, cached.path, "rb")
+
+    async def _generate(self, inventory_id: str, rendition: str, lookup_storage_path) -> CachedFile:
+        key = f"{inventory_id}/{rendition}"
+        max_side = RENDITIONS[rendition]
+        if max_side is None:
+            storage_path = await lookup_storage_path()
+            if not storage_path:
+                raise ImageNotFound(inventory_id)
+            try:
+                data = await get_storage().download(storage_path)
+            except FileNotFoundError:
+                raise ImageNotFound(inventory_id)
+        else:
+            # Derive from the cached original so each object is fetched from storage once
+            original = await self.get(inventory_id, "original", lookup_storage_path)
+            try:
+                data = await asyncio.to_thread(_render_file, original.path, max_side)
+            except FileNotFoundError:
+                # Original evicted in the meantime; fetch it again
+                self.cache.invalidate(f"{inventory_id}/original")
+                original = await self.get(inventory_id, "original", lookup_storage_path)
+                data = await asyncio.to_thread(_render_file, original.path, max_side)
+        self.generated += 1
+        return await asyncio.to_thread(self.cache.put, key, data)
+
+    def invalidate(self, inventory_id: str):
+        for rendition in RENDITIONS:
+            self.cache.invalidate(f"{inventory_id}/{rendition}")
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "generated": self.generated, "single_flight": self._flight.stats()}
+
+
+def _render_file(path: str, max_side: int) -> bytes:
+    with open(path, "rb") as f:
+        return render(f.read(), max_side)
+
+
+# Shared proxy used by main.py
+image_proxy = ImageProxy.from_env()
@@ -0,0 +1,117 @@
+"""
+Direct-to-storage uploads with V4 signed URLs.
+
+The API hands out a short-lived signed PUT URL for the object's final path,
+the client uploads the image straight to GCS, and the finalize call reads it
+back (server side, inside Google's network) for analysis. Image bytes from
+clients never pass through the API servers.
+
+A session that is not finalized before it expires is rejected with 410, and
+`UploadSessionJanitor` marks it expired and queues its object (if the client
+uploaded one) for deletion through the storage outbox.
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from database.database import SessionLocal
+from database.models import UploadSession
+from .outbox import enqueue_deletes, outbox_worker
+from .storage import get_storage
+
+UPLOAD_URL_TTL = timedelta(minutes=float(os.getenv("UPLOAD_URL_TTL_MINUTES", "15")))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+
+
+class UploadNotFound(Exception):
+    """The client has not uploaded the object (yet)"""
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def signed_upload_url(storage_path: str, content_type: str) -> Tuple[str, Dict[str, str]]:
+    """V4 signed PUT URL for storage_path; returns (url, headers the client must send)"""
+    headers = {"x-goog-content-length-range": f"0,{MAX_UPLOAD_BYTES}"}
+    url = get_storage().signed_url(storage_path, "PUT", UPLOAD_URL_TTL, content_type=content_type, headers=headers)
+    return url, {"Content-Type": content_type, **headers}
+
+
+def load_uploaded_image(storage_path: str, max_side: int) -> Image.Image:
+    """Read an uploaded object and decode it at no more than max_side pixels per edge (blocking)"""
+    storage = get_storage()
+    stored = storage.stat(storage_path)
+    if stored is None:
+        raise UploadNotFound(storage_path)
+    if stored.size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"Uploaded image is {stored.size} bytes; the limit is {MAX_UPLOAD_BYTES}")
+
+    image = Image.open(io.BytesIO(storage.read(storage_path)))
+    # JPEGs decode straight at 1/2, 1/4 or 1/8 scale, skipping most of the full-size work
+    image.draft("RGB", (max_side, max_side))
+    image = image.convert("RGB") if image.mode != "RGB" else image
+    image.thumbnail((max_side, max_side))
+    return image
+
+
+def expire_upload_sessions(batch_size: int = 500) -> int:
+    """Mark pending sessions past their expiry as expired and queue their objects for deletion; returns how many"""
+    expired = 0
+    while True:
+        with SessionLocal() as db:
+            sessions = (
+                db.query(UploadSession)
+                .filter(UploadSession.status == "pending", UploadSession.expires_at <= datetime.utcnow())
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for session in sessions:
+                session.status = "expired"
+            # Deleted in the same transaction that expires the session; missing objects count as deleted
+            enqueue_deletes(db, [session.storage_path for session in sessions])
+            db.commit()
+        expired += len(sessions)
+        if len(sessions) < batch_size:
+            return expired
+
+
+class UploadSessionJanitor:
+    """Background task expiring abandoned upload sessions"""
+
+    def __init__(self, interval: float = 300.0):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            try:
+                expired = await asyncio.to_thread(expire_upload_sessions)
+                if expired:
+                    print(f"🧹 Expired {expired} abandoned upload sessions")
+                    outbox_worker.notify()
+            except Exception as e:
+                print(f"Upload session cleanup failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+# Shared janitor started with the app
+upload_session_janitor = UploadSessionJanitor()
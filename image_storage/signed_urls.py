@@ -0,0 +1,109 @@
+"""
+Signed read URLs for private inventory images.
+
+With SIGNED_IMAGE_URLS enabled, API responses carry a V4 signed GET URL per
+image instead of the stored public `image_url`. Signing costs a
+private-key operation, or an IAM signBlob round trip on Cloud Run, so URLs
+are cached by storage_path and reused until they get within
+SIGNED_URL_REFRESH_MINUTES of expiring. Whole result pages are signed in
+one call, with the cache misses signed in parallel.
+"""
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .storage import get_storage
+
+
+class SignedUrlCache:
+    def __init__(self, enabled: bool, ttl: timedelta, refresh_margin: timedelta, max_entries: int = 20000):
+        self.enabled = enabled
+        self.ttl = ttl
+        # Never hand out a URL with less than this much validity left
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self._urls: "OrderedDict[str, Tuple[str, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "SignedUrlCache":
+        return cls(
+            enabled=os.getenv("SIGNED_IMAGE_URLS", "false").lower() in ("1", "true", "yes"),
+            ttl=timedelta(minutes=float(os.getenv("SIGNED_URL_TTL_MINUTES", "60"))),
+            refresh_margin=timedelta(minutes=float(os.getenv("SIGNED_URL_REFRESH_MINUTES", "10"))),
+        )
+
+    def cached(self, storage_path: str) -> Optional[str]:
+        with self._lock:
+            entry = self._urls.get(storage_path)
+            if entry is None or entry[1] - self.refresh_margin <= datetime.utcnow():
+                return None
+            self._urls.move_to_end(storage_path)
+            return entry[0]
+
+    def _store(self, storage_path: str, url: str, expires_at: datetime):
+        with self._lock:
+            self._urls[storage_path] = (url, expires_at)
+            self._urls.move_to_end(storage_path)
+            while len(self._urls) > self.max_entries:
+                self._urls.popitem(last=False)
+
+    def sign_many(self, storage_paths: Iterable[str]) -> Dict[str, str]:
+        """Sign every path not already cached (blocking); returns {storage_path: url}"""
+        urls = {}
+        missing = []
+        for storage_path in dict.fromkeys(storage_paths):
+            url = self.cached(storage_path)
+            if url is None:
+                missing.append(storage_path)
+            else:
+                urls[storage_path] = url
+        self.hits += len(urls)
+        if not missing:
+            return urls
+        self.misses += len(missing)
+
+        expires_at = datetime.utcnow() + self.ttl
+        signed = get_storage().sign_many(missing, self.ttl)
+        self.errors += len(missing) - len(signed)
+        for storage_path, url in signed.items():
+            self._store(storage_path, url, expires_at)
+        urls.update(signed)
+        return urls
+
+    async def image_urls(self, items) -> List[Optional[str]]:
+        """URL to show for each item: a signed URL when enabled, else the stored image_url"""
+        if not self.enabled or not get_storage().supports_signing:
+            return [item.image_url for item in items]
+        paths = [item.storage_path for item in items if item.storage_path]
+        urls = {path: url for path in paths if (url := self.cached(path)) is not None}
+        if len(urls) < len(set(paths)):
+            try:
+                urls = await asyncio.to_thread(self.sign_many, paths)
+            except Exception as e:
+                # Storage credentials unavailable: fall back to the stored URLs for this page
+                self.errors += 1
+                print(f"Could not sign image URLs: {e}")
+        else:
+            self.hits += len(paths)
+        return [urls.get(item.storage_path, item.image_url) if item.storage_path else item.image_url for item in items]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "cached": len(self._urls),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+# Shared cache used by the routes
+signed_url_cache = SignedUrlCache.from_env()
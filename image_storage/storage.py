@@ -0,0 +1,41 @@
+"""
+Selection of the storage backend from the environment.
+
+STORAGE_BACKEND=gcs (default) uses the GCS_BUCKET bucket; STORAGE_BACKEND=local
+stores objects under STORAGE_LOCAL_ROOT and serves them from
+STORAGE_LOCAL_BASE_URL.
+"""
+
+import os
+from typing import Optional
+
+from .base import StorageBackend
+from .gcs import GCSStorageBackend
+from .local import LocalStorageBackend
+
+_backend: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        kind = os.getenv("STORAGE_BACKEND", "gcs").lower()
+        max_workers = int(os.getenv("STORAGE_MAX_CONCURRENCY", "16"))
+        if kind == "local":
+            _backend = LocalStorageBackend(
+                root=os.getenv("STORAGE_LOCAL_ROOT", "./data/storage"),
+                base_url=os.getenv("STORAGE_LOCAL_BASE_URL", "/storage"),
+                max_workers=max_workers,
+            )
+        elif kind == "gcs":
+            _backend = GCSStorageBackend(max_workers=max_workers)
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {kind}")
+    return _backend
+
+
+def set_storage(backend: Optional[StorageBackend]):
+    """Replace the backend (tests and benchmarks); None re-reads the environment on next use"""
+    global _backend
+    _backend = backend
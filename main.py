@@ -1,18 +1,36 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Request, Response
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import google.generativeai as genai
 from PIL import Image
+import asyncio
 import io
+import json
 import os
+import re
+from datetime import datetime, timedelta
+from typing import BinaryIO, Optional, Tuple
 import subprocess
 import sys
+import uuid
 from dotenv import load_dotenv
+from admission import AdmissionMiddleware, admission_stats
+from idempotency import IdempotencyMiddleware, idempotency_janitor
 from provider_routes import router as provider_router
 from customer_routes import router as customer_router
 from database.database import get_database_session
+from database.models import InventoryItem
+from database.backfill import get_backfill_status
+from ai.gateway import gemini_gateway, GeminiUnavailable
+from ai.ledger import ai_call_ledger, ai_call_context, get_ai_usage
+from ai.singleflight import request_key
+from image_storage import (
+    outbox_worker, get_outbox_status, get_storage, LocalStorageBackend, RENDITIONS, ImageNotFound, image_proxy,
+    upload_session_janitor
+)
+from search import semantic_search, visual_search, attribute_search
 
 # Load environment variables
 load_dotenv()
@@ -31,6 +49,14 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Replay stored responses for retried Idempotency-Keys. Added first so it runs
+# inside admission: a shed request is rejected before its body is buffered or
+# its key claimed
+app.add_middleware(IdempotencyMiddleware)
+
+# Bound concurrent AI work and keep separate capacity for cheap reads (outermost)
+app.add_middleware(AdmissionMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -38,6 +64,26 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 app.include_router(provider_router)
 app.include_router(customer_router)
 
+@app.on_event("startup")
+async def start_background_tasks():
+    ai_call_ledger.start()
+    idempotency_janitor.start()
+    outbox_worker.start()
+    upload_session_janitor.start()
+    semantic_search.start()
+    visual_search.start()
+    attribute_search.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await attribute_search.stop()
+    await visual_search.stop()
+    await semantic_search.stop()
+    await upload_session_janitor.stop()
+    await outbox_worker.stop()
+    await idempotency_janitor.stop()
+    await ai_call_ledger.stop()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -67,6 +113,131 @@ async def info():
     """Info endpoint that displays 'It works'"""
     return {"message": "It works"}
 
+@app.get("/storage/{storage_path:path}")
+async def serve_local_object(storage_path: str):
+    """Serve images stored by the local-filesystem storage backend (STORAGE_BACKEND=local)"""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorageBackend):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        stored = await asyncio.to_thread(storage.stat, storage_path)
+    except ValueError:
+        stored = None
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return StreamingResponse(
+        storage.stream(storage_path),
+        media_type=stored.content_type or "application/octet-stream",
+        headers={"Content-Length": str(stored.size)}
+    )
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header is * or lists etag, compared weakly (W/ prefixes ignored)"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+_BYTE_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def _byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) byte of a single `bytes=` range, or None to send the whole file.
+
+    Multiple or malformed ranges are ignored, as RFC 9110 allows; a range
+    starting past the end raises RangeNotSatisfiable.
+    """
+    match = _BYTE_RANGE.fullmatch(range_header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+        if last and end < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable()
+        start, end = max(0, size - int(last)), size - 1
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+async def _file_chunks(file: BinaryIO, start: int, length: int, chunk_size: int = 64 * 1024):
+    """Read `length` bytes from `start` off the event loop, closing the file afterwards"""
+    try:
+        await asyncio.to_thread(file.seek, start)
+        while length > 0:
+            chunk = await asyncio.to_thread(file.read, min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+@app.get("/images/{inventory_id}/{rendition}")
+async def get_inventory_image(
+    inventory_id: uuid.UUID, rendition: str, request: Request, db: Session = Depends(get_database_session)
+):
+    """
+    Inventory image at a fixed size (thumb, small, medium, large or original).
+    Served from the local rendition cache; supports Range and If-None-Match.
+    """
+    if rendition not in RENDITIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown rendition '{rendition}'; use one of {', '.join(RENDITIONS)}")
+
+    async def lookup_storage_path():
+        return await asyncio.to_thread(
+            lambda: db.query(InventoryItem.storage_path).filter(InventoryItem.id == inventory_id).scalar()
+        )
+
+    try:
+        cached, file = await image_proxy.open_file(str(inventory_id), rendition, lookup_storage_path)
+    except ImageNotFound:
+        raise HTTPException(status_code=404, detail=f"No image for inventory item {inventory_id}")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error loading image: {str(e)}")
+
+    # Renditions of an item never change in place, so clients and CDNs may keep them for a year
+    headers = {
+        "ETag": f'"{cached.etag}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if _etag_matches(request.headers.get("if-none-match", ""), cached.etag):
+        file.close()
+        return Response(status_code=304, headers=headers)
+
+    # Served from the handle opened above, which stays valid if the file is evicted meanwhile
+    size = os.fstat(file.fileno()).st_size
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if "range" in request.headers and (if_range is None or if_range.strip() == headers["ETag"]):
+        try:
+            byte_range = _byte_range(request.headers["range"], size)
+        except RangeNotSatisfiable:
+            file.close()
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _file_chunks(file, start, end - start + 1), status_code=status_code, media_type=cached.media_type,
+        headers=headers
+    )
+
 @app.get("/admin")
 async def admin_panel():
     """Serve the admin panel for migrations"""
@@ -112,8 +283,8 @@ async def run_migrations():
         )
 
 @app.get("/admin/migration-status")
-async def get_migration_status():
-    """Check current migration status"""
+async def get_migration_status(db: Session = Depends(get_database_session)):
+    """Check current migration status, including progress of online backfills"""
     try:
         # Get current migration version
         result = subprocess.run([
@@ -125,10 +296,19 @@ async def get_migration_status():
             sys.executable, "-m", "alembic", "history", "--verbose"
         ], capture_output=True, text=True, cwd=os.getcwd())
         
+        # Backfill progress lives in backfill_checkpoints, which older schemas don't have yet
+        try:
+            backfills = get_backfill_status(db)
+        except Exception as backfill_error:
+            db.rollback()
+            print(f"Could not read backfill checkpoints: {backfill_error}")
+            backfills = []
+        
         return {
             "status": "success",
             "current_version": result.stdout.strip() if result.returncode == 0 else "unknown",
             "migration_history": history_result.stdout if history_result.returncode == 0 else "unavailable",
+            "backfills": backfills,
             "database_connected": True,  # If we got here, basic app startup worked
             "timestamp": "2025-10-18T23:00:00Z"
         }
@@ -141,6 +321,103 @@ async def get_migration_status():
             "timestamp": "2025-10-18T23:00:00Z"
         }
 
+@app.get("/admin/ai-usage")
+async def get_ai_usage_report(hours: float = 24, db: Session = Depends(get_database_session)):
+    """Gemini calls, tokens, estimated cost and latency per endpoint, provider and model"""
+    try:
+        # Write buffered records first so the report includes the latest calls
+        await asyncio.to_thread(ai_call_ledger.flush)
+        since = datetime.utcnow() - timedelta(hours=hours)
+        return {
+            "status": "success",
+            **get_ai_usage(db, since),
+            "ledger": ai_call_ledger.stats(),
+            "gateway": gemini_gateway.stats()
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error building AI usage report: {str(e)}")
+
+@app.get("/admin/admission")
+async def get_admission_status():
+    """In-flight, queued and rejected requests per admission class"""
+    return {
+        "status": "success",
+        "classes": admission_stats(),
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+@app.get("/admin/storage-outbox")
+async def get_storage_outbox_status(db: Session = Depends(get_database_session)):
+    """Pending and failed storage operations waiting on the outbox worker"""
+    try:
+        return {
+            "status": "success",
+            **get_outbox_status(db),
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error reading storage outbox: {str(e)}")
+
+@app.get("/admin/semantic-search")
+async def get_semantic_search_status():
+    """Embedder, nearest-neighbour backend and in-process index size"""
+    return {
+        "status": "success",
+        **semantic_search.stats(),
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+@app.post("/admin/semantic-search/backfill")
+async def backfill_embeddings(limit: int = 500, db: Session = Depends(get_database_session)):
+    """Embed up to `limit` items created before semantic search, or by a different embedder; call until done"""
+    try:
+        embedded = await semantic_search.backfill(db, limit)
+        return {
+            "status": "success",
+            "embedded": embedded,
+            "done": embedded < limit,
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error backfilling embeddings: {str(e)}")
+
+@app.get("/admin/visual-search")
+async def get_visual_search_status():
+    """Visual signature index size and lookup latency"""
+    return {
+        "status": "success",
+        **visual_search.stats(),
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+@app.post("/admin/visual-search/backfill")
+async def backfill_visual_signatures(limit: int = 100, db: Session = Depends(get_database_session)):
+    """Compute visual signatures for up to `limit` stored images that lack one; call until done"""
+    try:
+        signed, failed = await asyncio.to_thread(visual_search.backfill, db, limit)
+        return {
+            "status": "success",
+            "signed": signed,
+            "failed": failed,
+            "done": signed + failed < limit,
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error backfilling visual signatures: {str(e)}")
+
+@app.get("/admin/attribute-search")
+async def get_attribute_search_status():
+    """Attribute index size and search latency"""
+    return {
+        "status": "success",
+        **attribute_search.stats(),
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
 @app.post("/admin/create-test-data")
 async def create_test_data(db: Session = Depends(get_database_session)):
     """Create test data for providers and inventory items"""
@@ -149,7 +426,7 @@ async def create_test_data(db: Session = Depends(get_database_session)):
         
         # Import the test data creation functions
         from database.models import Provider, ProviderStatus, InventoryItem, InventoryStatus
-        from database.crud import ProviderCRUD
+        from database.bulk import bulk_load
         import uuid
         from datetime import datetime
         
@@ -191,21 +468,9 @@ async def create_test_data(db: Session = Depends(get_database_session)):
             }
         ]
         
-        created_providers = []
-        created_items = []
-        
-        # Create test providers
-        for provider_data in providers_data:
-            # Check if provider already exists
-            existing_provider = db.query(Provider).filter(Provider.id == provider_data["id"]).first()
-            if not existing_provider:
-                provider = Provider(**provider_data)
-                db.add(provider)
-                created_providers.append(provider_data["name"])
-        
         # Create sample inventory item
         sample_inventory = {
-            "id": uuid.uuid4(),
+            "id": uuid.UUID("660e8400-e29b-41d4-a716-446655440000"),
             "provider_id": uuid.UUID("550e8400-e29b-41d4-a716-446655440001"),
             "product_name": "AGOLDE High-Rise Wide-Leg Jeans",
             "description": "High-rise, wide-leg jeans in a classic blue wash. Features include a zip fly, button closure, five-pocket styling, and a comfortable fit.",
@@ -228,12 +493,9 @@ async def create_test_data(db: Session = Depends(get_database_session)):
             }
         }
         
-        # Check if inventory item already exists
-        existing_item = db.query(InventoryItem).filter(InventoryItem.product_name == sample_inventory["product_name"]).first()
-        if not existing_item:
-            inventory_item = InventoryItem(**sample_inventory)
-            db.add(inventory_item)
-            created_items.append(sample_inventory["product_name"])
+        # Insert everything in bulk; rows that already exist are skipped by ON CONFLICT DO NOTHING
+        created_providers = bulk_load(db, Provider, providers_data, returning="name").returned
+        created_items = bulk_load(db, InventoryItem, [sample_inventory], returning="product_name").returned
         
         # Commit all changes
         db.commit()
@@ -310,6 +572,16 @@ async def get_all_providers(db: Session = Depends(get_database_session)):
 
 # ============== GENERAL CLASSIFICATION ROUTES (For testing/demo) ==============
 
+CLASSIFY_PROMPT = "Analyze this image and classify what you see. Describe the main objects, scenes, or subjects in the image in detail."
+
+CLASSIFY_OBJECTS_PROMPT = """Analyze this image and provide a structured classification. Please identify:
+        1. Main objects or subjects
+        2. For men/women
+        3. Colors and composition
+        4. Size and dimensions
+        
+        Format your response in a clear, organized way."""
+
 @app.post("/classify")
 async def classify_image(file: UploadFile = File(...)):
     """Classify an uploaded image using Google Gemini Vision API"""
@@ -330,12 +602,17 @@ async def classify_image(file: UploadFile = File(...)):
         if not os.getenv("GOOGLE_API_KEY"):
             raise HTTPException(status_code=500, detail="Google API key not configured")
         
-        # Initialize the Gemini model
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # Generate content with the image
-        prompt = "Analyze this image and classify what you see. Describe the main objects, scenes, or subjects in the image in detail."
-        response = model.generate_content([prompt, image])
+        # Generate content with the image through the shared Gemini gateway
+        prompt = CLASSIFY_PROMPT
+        try:
+            with ai_call_context("classify"):
+                response = await gemini_gateway.generate(
+                    'gemini-2.0-flash', [prompt, image],
+                    coalesce_key=request_key('gemini-2.0-flash', prompt, image_data),
+                    prompt_id="classify"
+                )
+        except GeminiUnavailable as e:
+            raise e.to_http_exception()
         
         return {
             "filename": file.filename,
@@ -344,6 +621,9 @@ async def classify_image(file: UploadFile = File(...)):
             "status": "success"
         }
         
+    except HTTPException:
+        # Re-raise HTTP exceptions (bad file type, AI rate limit/unavailable)
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
@@ -367,19 +647,18 @@ async def classify_objects(file: UploadFile = File(...)):
         if not os.getenv("GOOGLE_API_KEY"):
             raise HTTPException(status_code=500, detail="Google API key not configured")
         
-        # Initialize the Gemini model
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
         # Generate structured classification
-        prompt = """Analyze this image and provide a structured classification. Please identify:
-        1. Main objects or subjects
-        2. For men/women
-        3. Colors and composition
-        4. Size and dimensions
-        
-        Format your response in a clear, organized way."""
-        
-        response = model.generate_content([prompt, image])
+        prompt = CLASSIFY_OBJECTS_PROMPT
+        
+        try:
+            with ai_call_context("classify_objects"):
+                response = await gemini_gateway.generate(
+                    'gemini-2.0-flash', [prompt, image],
+                    coalesce_key=request_key('gemini-2.0-flash', prompt, image_data),
+                    prompt_id="classify_objects"
+                )
+        except GeminiUnavailable as e:
+            raise e.to_http_exception()
         
         return {
             "filename": file.filename,
@@ -388,6 +667,79 @@ async def classify_objects(file: UploadFile = File(...)):
             "status": "success"
         }
         
+    except HTTPException:
+        # Re-raise HTTP exceptions (bad file type, AI rate limit/unavailable)
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_classification(file: UploadFile, prompt: str, endpoint: str):
+    """Stream a Gemini classification of an uploaded image as Server-Sent Events.
+
+    Validation errors and an unavailable or rate-limited model are reported as
+    regular HTTP errors before the stream starts. Once the first chunk has
+    arrived the response is 200, and a later failure ends the stream with an
+    `error` event.
+    """
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    image = Image.open(io.BytesIO(await file.read()))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    if not os.getenv("GOOGLE_API_KEY"):
+        raise HTTPException(status_code=500, detail="Google API key not configured")
+    
+    with ai_call_context(endpoint):
+        chunks = gemini_gateway.generate_stream('gemini-2.0-flash', [prompt, image], prompt_id=endpoint)
+        # Wait for the first chunk so upstream failures still map to 429/503
+        try:
+            first = await chunks.__anext__()
+        except StopAsyncIteration:
+            first = ""
+        except GeminiUnavailable as e:
+            raise e.to_http_exception()
+    
+    async def events():
+        yield _sse_event("start", {"filename": file.filename, "content_type": file.content_type})
+        if first:
+            yield _sse_event("chunk", {"text": first})
+        try:
+            async for text in chunks:
+                yield _sse_event("chunk", {"text": text})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Error processing image: {str(e)}"})
+            return
+        yield _sse_event("done", {"status": "success"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/classify/stream")
+async def classify_image_stream(file: UploadFile = File(...)):
+    """Same as /classify, streamed as Server-Sent Events (start, chunk..., done | error)"""
+    try:
+        return await _stream_classification(file, CLASSIFY_PROMPT, "classify_stream")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+@app.post("/classify/objects/stream")
+async def classify_objects_stream(file: UploadFile = File(...)):
+    """Same as /classify/objects, streamed as Server-Sent Events"""
+    try:
+        return await _stream_classification(file, CLASSIFY_OBJECTS_PROMPT, "classify_objects_stream")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
@@ -1,22 +1,40 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
 from fastapi.responses import JSONResponse
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
 import google.generativeai as genai
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
+import asyncio
 import io
-import json
 import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import uuid
 
-from database.models import InventoryItem, Provider
+from database.models import InventoryItem, Provider, UploadSession
 from database.database import get_database_session
-from google.cloud import storage
+from database.schemas import InventoryBulkDeleteRequest, UploadSessionCreate
+from ai.analysis import AnalysisParseError, analysis_to_item_fields
+from ai.attributes import extract_attributes, apply_local_attributes
+from ai.visual import visual_signature
+from ai.batch import MAX_IMAGE_SIDE, analyze_images
+from ai.cascade import analyze_with_cascade, analysis_confidence
+from ai.gateway import GeminiUnavailable
+from ai.ledger import ai_call_context
+from image_storage import (
+    enqueue_uploads, discard_staged, enqueue_deletes, encode_jpeg, inventory_storage_path, outbox_worker,
+    get_storage, PendingWrite,
+    signed_upload_url, load_uploaded_image, UploadNotFound, UploadTooLarge, UPLOAD_URL_TTL, signed_url_cache,
+    SigningNotSupported, image_proxy
+)
+from search import semantic_search, visual_search, attribute_search
 
 # Create router for provider routes
 router = APIRouter(prefix="/provider", tags=["Provider"])
 
+# Upper bound on images accepted by one batch upload request
+MAX_BATCH_UPLOAD_FILES = 50
+
 # I need an endpoint to update the provider
 @router.put("/update/{provider_id}")
 async def update_provider(provider_id: str, provider_data: Dict[str, Any], db: Session = Depends(get_database_session)):
@@ -76,6 +94,11 @@ async def upload_inventory(file: UploadFile = File(...), db: Session = Depends(g
         if image.mode != 'RGB':
             image = image.convert('RGB')
         
+        # Colors, shape and texture computed locally; fills gaps in the AI analysis
+        attributes = extract_attributes(image)
+        # Color histogram and perceptual hash for "more like this"
+        signature = visual_signature(image)
+        
         # Configure Google Generative AI with API key
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
@@ -83,178 +106,76 @@ async def upload_inventory(file: UploadFile = File(...), db: Session = Depends(g
         
         genai.configure(api_key=api_key)
         
-        # Initialize the Gemini model
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # Comprehensive inventory analysis prompt
-        prompt = """
-        Analyze this product image and extract detailed inventory information. Provide a comprehensive analysis in the following JSON format:
-
-        {
-            "product_name": "Clear, descriptive product name",
-            "category": "Primary product category",
-            "subcategory": "More specific subcategory",
-            "description": "Detailed product description",
-            "key_features": ["feature1", "feature2", "feature3"],
-            "brand": "Brand name if visible",
-            "model_number": "Model/SKU if visible",
-            "condition": "New/Used/Refurbished assessment",
-            "condition_notes": "Specific condition observations",
-            "dimensions_estimate": "Estimated size description",
-            "color": "Primary color(s)",
-            "material": "Material type if identifiable",
-            "estimated_price_range": {
-                "min": "Minimum estimated price in EUR",
-                "max": "Maximum estimated price in EUR",
-                "currency": "EUR"
-            },
-            "marketability_score": "1-10 rating for market appeal",
-            "tags": ["tag1", "tag2", "tag3"],
-            "additional_notes": "Any other relevant observations"
-        }
-
-        Be thorough and professional in your analysis. If certain information cannot be determined from the image, indicate "Not visible/determinable" for that field.
-        """
-        
-        response = model.generate_content([prompt, image])
+        # Get first provider from providers table
+        # Let's assume we
+        provider = db.query(Provider).first()
+        provider_id = provider.id
         
-        # Try to parse the AI response as JSON, fallback to text if needed
+        # Cheap model first, escalating to the full model when the answer is weak.
+        # Structured output is parsed and validated by the cascade
         try:
-            # Clean the response text to extract JSON
-            response_text = response.text.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            elif response_text.startswith("```"):
-                response_text = response_text.replace("```", "").strip()
-            
-            inventory_data = json.loads(response_text)
+            with ai_call_context("upload_inventory", provider_id):
+                cascade = await analyze_with_cascade(image, image_data)
+            analysis = cascade.analysis
+            inventory_data = analysis.model_dump()
+            inventory_data.update({
+                "confidence_score": cascade.confidence,
+                "analysis_model": cascade.model,
+                "local_attributes": attributes.to_dict()
+            })
 
-            # Get first provider from providers table
-            # Let's assume we
-            provider = db.query(Provider).first()
-            provider_id = provider.id
-            
             # Create inventory item with proper field mapping
             inventory_item = InventoryItem(
                 id=uuid.uuid4(),
                 provider_id=provider_id,
-                product_name=inventory_data.get("product_name", "Unknown Product"),
-                description=inventory_data.get("description", ""),
-                category=inventory_data.get("category", ""),
-                subcategory=inventory_data.get("subcategory", ""),
-                brand=inventory_data.get("brand", ""),
-                model_number=inventory_data.get("model_number", ""),
-                condition=inventory_data.get("condition", ""),
-                condition_notes=inventory_data.get("condition_notes", ""),
-                dimensions_estimate=inventory_data.get("dimensions_estimate", ""),
-                color=inventory_data.get("color", ""),
-                material=inventory_data.get("material", ""),
-                # Handle price range
-                estimated_price_min=float(inventory_data.get("estimated_price_range", {}).get("min", 0)) if inventory_data.get("estimated_price_range", {}).get("min", "").replace(".", "").isdigit() else None,
-                estimated_price_max=float(inventory_data.get("estimated_price_range", {}).get("max", 0)) if inventory_data.get("estimated_price_range", {}).get("max", "").replace(".", "").isdigit() else None,
-                currency=inventory_data.get("estimated_price_range", {}).get("currency", "EUR"),
-                marketability_score=float(inventory_data.get("marketability_score", 0)) if str(inventory_data.get("marketability_score", "")).replace(".", "").isdigit() else None,
-                # Store arrays and additional data
-                key_features=inventory_data.get("key_features", []),
-                tags=inventory_data.get("tags", []),
-                ai_analysis_raw=inventory_data,  # Store the full AI response
+                **apply_local_attributes(analysis_to_item_fields(analysis), attributes),
+                confidence_score=cascade.confidence,
                 # Image information
                 original_filename=file.filename,
-                image_content_type=file.content_type,
-                analyzed_at=datetime.utcnow()
+                image_content_type=file.content_type
             )
             
-            # Save to database
+            # The item and its pending image upload are committed together; the
+            # outbox worker moves the staged image into place and then fills in
+            # image_url/storage_path
+            db.add(inventory_item)
+            inventory_id = str(inventory_item.id)
+            embedded = await semantic_search.stage_embeddings(db, [inventory_item])
+            signed = visual_search.stage_signatures(db, [(inventory_item, signature)])
+            attributes_staged = attribute_search.stage([inventory_item])
+            staged = await enqueue_uploads(db, [(
+                inventory_item.id,
+                PendingWrite(
+                    inventory_storage_path(provider_id, inventory_id, file.filename),
+                    encode_jpeg(image),
+                    metadata={
+                        'provider_id': str(provider_id),
+                        'inventory_id': inventory_id,
+                        'original_filename': file.filename or 'unknown'
+                    }
+                )
+            )])
             try:
-                db.add(inventory_item)
                 db.commit()
-                db.refresh(inventory_item)
-                inventory_id = str(inventory_item.id)
-            except Exception as db_error:
+            except Exception:
                 db.rollback()
-                # Continue without database save if there's an error
-                print(f"Database save failed: {db_error}")
-                inventory_id = str(uuid.uuid4())
+                await discard_staged(staged)
+                raise
+            outbox_worker.notify()
+            semantic_search.publish(embedded)
+            visual_search.publish(signed)
+            attribute_search.publish(attributes_staged)
 
-            # Upload the image to Google Cloud Storage; use the provider ID and inventory ID for path
-            try:
-                # Configure Google Cloud Storage client
-                project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-                
-                if project_id:
-                    gcs_client = storage.Client(project=project_id)
-                else:
-                    # On Cloud Run, this should work without explicit project ID
-                    # For local development, ensure gcloud auth application-default login is done
-                    gcs_client = storage.Client()
-                
-                bucket_name = os.getenv("GCS_BUCKET")
-                if not bucket_name:
-                    raise Exception("Google Cloud Storage bucket not configured")
-                
-                bucket = gcs_client.bucket(bucket_name)
-                
-                # Create storage path using provider ID and inventory ID
-                file_extension = os.path.splitext(file.filename)[1] if file.filename else '.jpg'
-                storage_path = f"inventory/{provider_id}/{inventory_id}{file_extension}"
-                
-                # Create a blob (file) in the bucket
-                blob = bucket.blob(storage_path)
-                
-                # Reset image data stream position and prepare for upload
-                image_bytes = io.BytesIO()
-                image.save(image_bytes, format='JPEG', quality=85, optimize=True)
-                image_bytes.seek(0)
-                
-                # Set metadata
-                blob.metadata = {
-                    'provider_id': str(provider_id),
-                    'inventory_id': inventory_id,
-                    'original_filename': file.filename or 'unknown'
-                }
-                
-                # Upload to Google Cloud Storage
-                blob.upload_from_file(
-                    image_bytes,
-                    content_type='image/jpeg'
-                )
-                
-                # Make the blob publicly readable (optional - depends on your security requirements)
-                # blob.make_public()
-                
-                # Generate public URL
-                image_url = f"https://storage.googleapis.com/{bucket_name}/{storage_path}"
-                
-                # Update inventory item with image URL
-                inventory_item.image_url = image_url
-                inventory_item.storage_path = storage_path
-                db.add(inventory_item)
-                db.commit()
-                
-                print(f"Image uploaded successfully to Google Cloud Storage: {image_url}")
-                
-            except Exception as upload_error:
-                print(f"Image upload failed: {upload_error}")
-                # Continue without failing the entire operation
-                inventory_item.image_url = None
-                inventory_item.storage_path = None
-                
-                # Still commit the inventory item without the image
-                try:
-                    db.add(inventory_item)
-                    db.commit()
-                except Exception as db_error:
-                    print(f"Database update after upload failure also failed: {db_error}")
-                    db.rollback()
-
-
-        except (json.JSONDecodeError, AttributeError):
-            # Fallback if JSON parsing fails - generate a simple ID
+        except GeminiUnavailable as e:
+            raise e.to_http_exception()
+        except AnalysisParseError as parse_error:
+            # Only reachable if the model ignores the response schema (e.g. a blocked or truncated reply)
             inventory_id = str(uuid.uuid4())
             inventory_data = {
-                "raw_analysis": response.text,
+                "raw_analysis": parse_error.raw_text,
                 "parsed": False,
-                "note": "AI response could not be parsed as structured JSON"
+                "note": str(parse_error),
+                "local_attributes": attributes.to_dict()
             }
         
         return {
@@ -268,19 +189,289 @@ async def upload_inventory(file: UploadFile = File(...), db: Session = Depends(g
             "status": "success"
         }
         
+    except HTTPException:
+        # Re-raise HTTP exceptions (bad file type, AI rate limit/unavailable)
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing inventory image: {str(e)}")
 
+@router.post("/upload-inventory/batch")
+async def upload_inventory_batch(files: List[UploadFile] = File(...), db: Session = Depends(get_database_session)):
+    """
+    Bulk onboarding: upload many inventory images in one request.
+    Images are analyzed several at a time in shared Gemini requests; any image
+    the batch could not analyze is retried on its own. Each file gets its own
+    result entry, so one unreadable image does not fail the upload.
+    """
+    try:
+        if len(files) > MAX_BATCH_UPLOAD_FILES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_UPLOAD_FILES} images per batch")
+        for file in files:
+            if not file.content_type or not file.content_type.startswith('image/'):
+                raise HTTPException(status_code=400, detail=f"File {file.filename} must be an image")
+        
+        # Configure Google Generative AI with API key
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise HTTPException(status_code=500, detail="Google API key not configured")
+        
+        genai.configure(api_key=api_key)
+        
+        # Decode every image up front; undecodable files are reported, not fatal
+        results: List[Dict[str, Any]] = []
+        images: List[Image.Image] = []
+        decoded: List[int] = []
+        for file in files:
+            result = {"filename": file.filename, "content_type": file.content_type}
+            try:
+                image = Image.open(io.BytesIO(await file.read()))
+                images.append(image.convert('RGB') if image.mode != 'RGB' else image)
+                decoded.append(len(results))
+            except Exception as image_error:
+                result.update({"status": "error", "error": f"Could not read image: {image_error}"})
+            results.append(result)
+        
+        provider = db.query(Provider).first()
+        provider_id = provider.id
+        
+        with ai_call_context("upload_inventory_batch", provider_id):
+            outcomes = await analyze_images(images)
+        
+        # Insert all analyzed items and their pending image uploads in one transaction
+        created: List[InventoryItem] = []
+        signatures = []
+        uploads = []
+        for position, image, outcome in zip(decoded, images, outcomes):
+            if isinstance(outcome, Exception):
+                results[position].update({"status": "error", "error": str(outcome)})
+                continue
+            file = files[position]
+            inventory_item = InventoryItem(
+                id=uuid.uuid4(),
+                provider_id=provider_id,
+                **apply_local_attributes(analysis_to_item_fields(outcome), extract_attributes(image)),
+                confidence_score=analysis_confidence(outcome),
+                original_filename=file.filename,
+                image_content_type=file.content_type
+            )
+            db.add(inventory_item)
+            created.append(inventory_item)
+            signatures.append((inventory_item, visual_signature(image)))
+            inventory_id = str(inventory_item.id)
+            uploads.append((
+                inventory_item.id,
+                PendingWrite(
+                    inventory_storage_path(provider_id, inventory_id, file.filename),
+                    encode_jpeg(image),
+                    metadata={
+                        'provider_id': str(provider_id),
+                        'inventory_id': inventory_id,
+                        'original_filename': file.filename or 'unknown'
+                    }
+                )
+            ))
+            results[position].update({
+                "status": "success",
+                "inventory_id": inventory_id,
+                "extracted_data": outcome.model_dump(),
+                "local_attributes": inventory_item.ai_analysis_raw.get("local_attributes")
+            })
+        # One embedding request for the whole batch
+        embedded = await semantic_search.stage_embeddings(db, created)
+        signed = visual_search.stage_signatures(db, signatures)
+        attributes_staged = attribute_search.stage(created)
+        # Image bytes are staged in parallel; the rows only reference them
+        staged = await enqueue_uploads(db, uploads)
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            await discard_staged(staged)
+            raise
+        outbox_worker.notify()
+        semantic_search.publish(embedded)
+        visual_search.publish(signed)
+        attribute_search.publish(attributes_staged)
+        
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        return {
+            "upload_timestamp": datetime.now().isoformat() + "Z",
+            "total_files": len(files),
+            "succeeded": succeeded,
+            "failed": len(files) - succeeded,
+            "items": results,
+            "provider_action": "inventory_batch_upload",
+            "status": "success" if succeeded == len(files) else "partial"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error processing inventory batch: {str(e)}")
+
+@router.post("/upload-sessions")
+async def create_upload_session(request: UploadSessionCreate, db: Session = Depends(get_database_session)):
+    """
+    Start a direct-to-storage upload. The client PUTs the image to `upload_url`
+    with the returned headers, then calls the finalize endpoint to analyze it.
+    """
+    try:
+        provider = db.query(Provider).first()
+        provider_id = provider.id
+        
+        inventory_id = uuid.uuid4()
+        storage_path = inventory_storage_path(provider_id, inventory_id, request.filename)
+        upload_url, headers = await asyncio.to_thread(signed_upload_url, storage_path, request.content_type)
+        
+        now = datetime.utcnow()
+        session = UploadSession(
+            id=uuid.uuid4(),
+            provider_id=provider_id,
+            inventory_item_id=inventory_id,
+            storage_path=storage_path,
+            content_type=request.content_type,
+            original_filename=request.filename,
+            status="pending",
+            created_at=now,
+            expires_at=now + UPLOAD_URL_TTL
+        )
+        db.add(session)
+        db.commit()
+        
+        return {
+            "session_id": str(session.id),
+            "upload_url": upload_url,
+            "method": "PUT",
+            "headers": headers,
+            "expires_at": session.expires_at.isoformat() + "Z",
+            "finalize_url": f"/provider/upload-sessions/{session.id}/finalize"
+        }
+    except SigningNotSupported as e:
+        raise HTTPException(status_code=501, detail=f"Direct uploads are not available: {str(e)}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error creating upload session: {str(e)}")
+
+@router.post("/upload-sessions/{session_id}/finalize")
+async def finalize_upload_session(session_id: uuid.UUID, db: Session = Depends(get_database_session)):
+    """Analyze an image uploaded through an upload session and create its inventory item"""
+    try:
+        # Claim the session so concurrent finalize calls don't analyze the image twice
+        now = datetime.utcnow()
+        session = db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == session_id,
+                UploadSession.status == "pending",
+                UploadSession.expires_at > now
+            )
+            .values(status="finalizing")
+            .returning(UploadSession)
+        ).scalar_one_or_none()
+        db.commit()
+        if session is None:
+            existing = db.get(UploadSession, session_id)
+            if existing is None:
+                raise HTTPException(status_code=404, detail=f"Upload session {session_id} not found")
+            if existing.status == "expired" or (existing.status == "pending" and existing.expires_at <= now):
+                # The janitor deletes the object; the client has to start a new session
+                raise HTTPException(status_code=410, detail=f"Upload session {session_id} has expired")
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload session {session_id} is already {existing.status}"
+            )
+        
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise HTTPException(status_code=500, detail="Google API key not configured")
+        genai.configure(api_key=api_key)
+        
+        try:
+            # Read back only a downscaled copy; the full image stays in the bucket
+            image = await asyncio.to_thread(load_uploaded_image, session.storage_path, MAX_IMAGE_SIDE)
+            attributes = extract_attributes(image)
+            signature = visual_signature(image)
+            with ai_call_context("finalize_upload", session.provider_id):
+                cascade = await analyze_with_cascade(image)
+            
+            analysis = cascade.analysis
+            inventory_item = InventoryItem(
+                id=session.inventory_item_id,
+                provider_id=session.provider_id,
+                **apply_local_attributes(analysis_to_item_fields(analysis), attributes),
+                confidence_score=cascade.confidence,
+                original_filename=session.original_filename,
+                image_content_type=session.content_type,
+                # The object is already at its final path, so no outbox entry is needed
+                image_url=get_storage().public_url(session.storage_path),
+                storage_path=session.storage_path
+            )
+            db.add(inventory_item)
+            embedded = await semantic_search.stage_embeddings(db, [inventory_item])
+            signed = visual_search.stage_signatures(db, [(inventory_item, signature)])
+            attributes_staged = attribute_search.stage([inventory_item])
+            session.status = "finalized"
+            session.finalized_at = datetime.utcnow()
+            db.commit()
+        except BaseException:
+            # Let the client fix the problem (or just retry) and finalize again
+            db.rollback()
+            db.execute(
+                update(UploadSession).where(UploadSession.id == session_id).values(status="pending")
+            )
+            db.commit()
+            raise
+        semantic_search.publish(embedded)
+        visual_search.publish(signed)
+        attribute_search.publish(attributes_staged)
+        
+        inventory_data = analysis.model_dump()
+        inventory_data.update({
+            "confidence_score": cascade.confidence,
+            "analysis_model": cascade.model,
+            "local_attributes": attributes.to_dict()
+        })
+        image_url = (await signed_url_cache.image_urls([inventory_item]))[0]
+        return {
+            "inventory_id": str(inventory_item.id),
+            "session_id": str(session_id),
+            "filename": session.original_filename,
+            "content_type": session.content_type,
+            "image_url": image_url,
+            "upload_timestamp": datetime.now().isoformat() + "Z",
+            "analysis_status": "completed",
+            "extracted_data": inventory_data,
+            "provider_action": "inventory_upload",
+            "status": "success"
+        }
+        
+    except HTTPException:
+        raise
+    except UploadNotFound:
+        raise HTTPException(status_code=409, detail="The image has not been uploaded to upload_url yet")
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a readable image")
+    except GeminiUnavailable as e:
+        raise e.to_http_exception()
+    except AnalysisParseError as e:
+        raise HTTPException(status_code=502, detail=f"Could not parse image analysis: {str(e)}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error finalizing upload: {str(e)}")
+
 @router.get("/inventories")
 async def get_provider_inventory(db: Session = Depends(get_database_session)):
     """Get provider's inventory list from database"""
     try:
         # Get all inventory items from database with provider information
         inventory_items = db.query(InventoryItem).join(Provider).all()
-
+        image_urls = await signed_url_cache.image_urls(inventory_items)
         
         items = []
-        for item in inventory_items:
+        for item, image_url in zip(inventory_items, image_urls):
             items.append({
                 "inventory_id": str(item.id),
                 "product_name": item.product_name,
@@ -288,7 +479,7 @@ async def get_provider_inventory(db: Session = Depends(get_database_session)):
                 "description": item.description,
                 "condition": item.condition,
                 "marketability_score": item.marketability_score,
-                "image_url": item.image_url,
+                "image_url": image_url,
                 "upload_date": item.created_at.isoformat() + "Z" if item.created_at else None,
                 "status": item.status.value if item.status else "active",
                 "provider_name": item.provider.name,
@@ -361,35 +552,16 @@ async def delete_inventory_item(inventory_id: str, db: Session = Depends(get_dat
         
         # Store item details for response before deletion
         item_name = inventory_item.product_name
-        storage_path = inventory_item.storage_path
         
-        # Delete the inventory item from database
+        # The image is removed later by the outbox worker, committed with the row delete
         db.delete(inventory_item)
+        enqueue_deletes(db, [inventory_item.storage_path])
         db.commit()
-        
-        # Optionally delete the image from Google Cloud Storage
-        if storage_path:
-            try:
-                project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-                bucket_name = os.getenv("GCS_BUCKET")
-                
-                if bucket_name:
-                    if project_id:
-                        gcs_client = storage.Client(project=project_id)
-                    else:
-                        gcs_client = storage.Client()
-                    
-                    bucket = gcs_client.bucket(bucket_name)
-                    blob = bucket.blob(storage_path)
-                    
-                    # Delete the blob if it exists
-                    if blob.exists():
-                        blob.delete()
-                        print(f"Image deleted from Google Cloud Storage: {storage_path}")
-                    
-            except Exception as gcs_error:
-                print(f"Warning: Could not delete image from storage: {gcs_error}")
-                # Continue even if image deletion fails
+        outbox_worker.notify()
+        image_proxy.invalidate(str(uuid.UUID(inventory_id)))
+        semantic_search.remove([uuid.UUID(inventory_id)])
+        visual_search.remove([uuid.UUID(inventory_id)])
+        attribute_search.remove([uuid.UUID(inventory_id)])
         
         return {
             "message": f"Inventory item '{item_name}' deleted successfully",
@@ -404,3 +576,35 @@ async def delete_inventory_item(inventory_id: str, db: Session = Depends(get_dat
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting inventory item: {str(e)}")
+
+@router.post("/inventory/bulk-delete")
+async def bulk_delete_inventory_items(request: InventoryBulkDeleteRequest, db: Session = Depends(get_database_session)):
+    """Delete many inventory items in one statement; their images are garbage collected in the background"""
+    try:
+        deleted = db.execute(
+            delete(InventoryItem)
+            .where(InventoryItem.id.in_(request.inventory_ids))
+            .returning(InventoryItem.id, InventoryItem.storage_path)
+        ).all()
+        images_queued = enqueue_deletes(db, [storage_path for _, storage_path in deleted])
+        db.commit()
+        outbox_worker.notify()
+        
+        deleted_ids = {item_id for item_id, _ in deleted}
+        for item_id in deleted_ids:
+            image_proxy.invalidate(str(item_id))
+        semantic_search.remove(deleted_ids)
+        visual_search.remove(deleted_ids)
+        attribute_search.remove(deleted_ids)
+        return {
+            "message": f"Deleted {len(deleted_ids)} inventory items",
+            "deleted_ids": [str(item_id) for item_id in dict.fromkeys(request.inventory_ids) if item_id in deleted_ids],
+            "not_found_ids": [str(item_id) for item_id in dict.fromkeys(request.inventory_ids) if item_id not in deleted_ids],
+            "images_queued_for_deletion": images_queued,
+            "deleted_at": datetime.now().isoformat() + "Z",
+            "user_type": "provider"
+        }
+        
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error deleting inventory items: {str(e)}")
@@ -0,0 +1,34 @@
+"""
+Search module for BGN Provider System
+"""
+
+from .vector_index import VectorIndex
+from .attribute_index import AttributeIndex
+from .synced_index import SyncedIndex, SyncedVectorIndex
+from .semantic import SemanticSearch, SearchHit, EmbeddingUnavailable, semantic_search
+from .visual import VisualSearch, SimilarHit, SignatureNotFound, visual_search
+from .attributes import AttributeSearch, attribute_search
+
+__all__ = [
+    # In-process indexes
+    "VectorIndex",
+    "AttributeIndex",
+    "SyncedIndex",
+    "SyncedVectorIndex",
+
+    # Hybrid semantic search
+    "SemanticSearch",
+    "SearchHit",
+    "EmbeddingUnavailable",
+    "semantic_search",
+
+    # Visual similarity
+    "VisualSearch",
+    "SimilarHit",
+    "SignatureNotFound",
+    "visual_search",
+
+    # Structured attribute search
+    "AttributeSearch",
+    "attribute_search"
+]
@@ -0,0 +1,263 @@
+"""
+In-process columnar index of categorical item attributes.
+
+Every attribute value is split into lowercase words once, when the item is
+added, and each distinct word gets an integer token id. A field is stored
+as two parallel int32 arrays, the token ids and the row owning each, kept
+sorted by token id. Matching a query word is then a prefix test over the
+vocabulary followed by a binary search for each matching token's postings,
+so a query only touches the rows it matches: their weights are summed with
+one bincount and the top k picked with argpartition, not a sort. Words
+matching a large share of the rows are scattered into a dense row mask
+instead, which is cheaper than sorting that many row numbers.
+
+Updates are incremental. Added rows go to an unsorted tail that is matched
+with a lookup table over its tokens, replaced and removed rows are
+tombstones, and `needs_rebuild` reports when the tail and tombstones have
+grown enough for `rebuild()` to fold them back into the sorted arrays.
+"""
+
+import threading
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vector_index import _top_k
+
+# Scores are small sums of weights, so score * RECENCY_SPAN + seconds since
+# the epoch orders by score first and breaks ties by recency in one float64
+RECENCY_SPAN = 1e10
+
+# Words matching over 1/DENSE_FRACTION of the rows are scored with a dense row mask
+DENSE_FRACTION = 64
+
+
+def _intersect(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Rows in both, each given as a boolean row mask or sorted unique row numbers"""
+    if a.dtype == bool and b.dtype == bool:
+        return a & b
+    if a.dtype == bool:
+        return b[a[b]]
+    if b.dtype == bool:
+        return a[b[a]]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenated arange(start, end) for each pair"""
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+
+class AttributeIndex:
+    def __init__(self, fields: Sequence[str], tokenize: Callable[[str], List[str]], rebuild_ratio: float = 0.2):
+        self.fields = tuple(fields)
+        self.tokenize = tokenize
+        self.rebuild_ratio = rebuild_ratio
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self._vocab: Dict[str, int] = {}
+        self._words: List[str] = []
+        self._word_array: Optional[np.ndarray] = None
+        self._ids: List[Hashable] = []
+        self._rows: Dict[Hashable, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._recency = np.zeros(0, dtype=np.float64)
+        self._sorted_rows = 0  # rows [0, _sorted_rows) are in the sorted arrays, later ones in the tail
+        empty = lambda: {field: np.zeros(0, dtype=np.int32) for field in self.fields}
+        self._owners, self._tokens = empty(), empty()
+        self._tail_owners, self._tail_tokens = empty(), empty()
+        self._dead = 0
+        self._reset_pending()
+
+    def _reset_pending(self):
+        self._pending_recency: List[float] = []
+        self._pending_owners: Dict[str, List[int]] = {field: [] for field in self.fields}
+        self._pending_tokens: Dict[str, List[int]] = {field: [] for field in self.fields}
+        self._pending_dead: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        pending = self._dead + len(self._ids) - self._sorted_rows
+        return pending > max(1024, self.rebuild_ratio * len(self._ids))
+
+    # Writes
+
+    def build(self, ids: Sequence[Hashable], records: Sequence[Tuple[Sequence, float]]):
+        """Replace the whole index with (field values, recency) records (blocking; run off the event loop)"""
+        # Encoded without holding the lock, then swapped in whole
+        fresh = AttributeIndex(self.fields, self.tokenize, self.rebuild_ratio)
+        fresh._append(ids, records)
+        fresh._compact()
+        with self._lock:
+            fresh._lock = self._lock
+            fresh.rebuilds = self.rebuilds + 1
+            self.__dict__.update(vars(fresh))
+
+    def rebuild(self):
+        """Fold the tail and tombstones back into the sorted arrays"""
+        with self._lock:
+            self._compact()
+            self.rebuilds += 1
+
+    def upsert(self, ids: Sequence[Hashable], records: Sequence[Tuple[Sequence, float]]):
+        with self._lock:
+            self._append(ids, records)
+
+    def remove(self, ids: Sequence[Hashable]):
+        with self._lock:
+            for item_id in ids:
+                row = self._rows.pop(item_id, None)
+                if row is not None:
+                    self._tombstone(row)
+
+    def _append(self, ids, records):
+        for item_id, (values, recency) in zip(ids, records):
+            previous = self._rows.get(item_id)
+            if previous is not None:
+                self._tombstone(previous)
+            row = len(self._ids)
+            self._ids.append(item_id)
+            self._rows[item_id] = row
+            self._pending_recency.append(recency)
+            for field, value in zip(self.fields, values):
+                for token in self._token_ids(value):
+                    self._pending_owners[field].append(row)
+                    self._pending_tokens[field].append(token)
+
+    def _token_ids(self, value) -> List[int]:
+        """Distinct token ids of a string or list of strings, growing the vocabulary"""
+        if value is None:
+            return []
+        texts = [value] if isinstance(value, str) else value
+        tokens = {}
+        for text in texts:
+            for word in self.tokenize(text):
+                token = self._vocab.get(word)
+                if token is None:
+                    token = self._vocab[word] = len(self._words)
+                    self._words.append(word)
+                    self._word_array = None
+                tokens[token] = None
+        return list(tokens)
+
+    def _tombstone(self, row: int):
+        if row < len(self._alive):
+            self._alive[row] = False
+        else:
+            self._pending_dead.append(row)
+        self._dead += 1
+
+    def _flush(self):
+        """Move rows added since the last flush into the arrays' tail (lock held)"""
+        if not self._pending_recency:
+            return
+        alive = np.concatenate([self._alive, np.ones(len(self._pending_recency), dtype=bool)])
+        alive[self._pending_dead] = False
+        recency = np.concatenate([self._recency, np.asarray(self._pending_recency, dtype=np.float64)])
+        for field in self.fields:
+            self._tail_owners[field] = np.concatenate([
+                self._tail_owners[field], np.asarray(self._pending_owners[field], dtype=np.int32)])
+            self._tail_tokens[field] = np.concatenate([
+                self._tail_tokens[field], np.asarray(self._pending_tokens[field], dtype=np.int32)])
+        # Rows are only added at the end, so searches holding the old arrays stay consistent
+        self._alive, self._recency = alive, recency
+        self._reset_pending()
+
+    def _compact(self):
+        """Drop tombstoned rows, renumber the rest and sort every field by token (lock held)"""
+        self._flush()
+        keep = np.flatnonzero(self._alive)
+        renumber = np.full(len(self._ids), -1, dtype=np.int32)
+        renumber[keep] = np.arange(len(keep), dtype=np.int32)
+        for field in self.fields:
+            owners = np.concatenate([self._owners[field], self._tail_owners[field]])
+            tokens = np.concatenate([self._tokens[field], self._tail_tokens[field]])
+            kept = self._alive[owners]
+            owners, tokens = renumber[owners[kept]], tokens[kept]
+            order = np.argsort(tokens, kind="stable")
+            self._owners[field], self._tokens[field] = owners[order], tokens[order]
+            self._tail_owners[field] = self._tail_tokens[field] = np.zeros(0, dtype=np.int32)
+        self._ids = [self._ids[row] for row in keep]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._recency = self._recency[keep]
+        self._sorted_rows = len(keep)
+        self._dead = 0
+
+    # Reads
+
+    def search(self, criteria: Dict[str, Tuple[List[str], float]], k: int) -> List[Tuple[Hashable, float]]:
+        """Up to k (id, score) pairs for {field: (query words, weight)}, best first.
+
+        A field matches when each query word begins one of the field's words;
+        an item scores the weights of the fields it matches. Items matching
+        none are left out; ties go to the most recent item.
+        """
+        if not criteria:
+            return []
+        with self._lock:
+            self._flush()
+            if self._word_array is None:
+                self._word_array = np.array(self._words, dtype=str) if self._words else np.zeros(0, dtype="<U1")
+            ids, alive, recency, words = self._ids, self._alive, self._recency, self._word_array
+            columns = {
+                field: (self._owners[field], self._tokens[field], self._tail_owners[field], self._tail_tokens[field])
+                for field in criteria
+            }
+
+        count = len(alive)
+        # A word matching more rows than this is kept as a per-row mask instead of sorted row numbers
+        dense_above = count // DENSE_FRACTION
+        parts = []
+        for field, (query_words, weight) in criteria.items():
+            owners, tokens, tail_owners, tail_tokens = columns[field]
+            matched = None
+            for word in query_words:
+                # Lookup table over token ids: vocabulary words starting with the query word
+                table = np.char.startswith(words, word)
+                # Same dtype as the haystack, or searchsorted copies all of it to compare
+                matching = np.flatnonzero(table).astype(np.int32)
+                postings = _ranges(np.searchsorted(tokens, matching, "left"), np.searchsorted(tokens, matching, "right"))
+                rows = np.concatenate([owners[postings], tail_owners[table[tail_tokens]]])
+                if len(rows) > dense_above:
+                    hit = np.zeros(count, dtype=bool)
+                    hit[rows] = True
+                else:
+                    hit = np.unique(rows)
+                matched = hit if matched is None else _intersect(matched, hit)
+            parts.append((matched, weight))
+
+        if any(matched.dtype == bool for matched, _ in parts):
+            scores = np.zeros(count, dtype=np.float64)
+            for matched, weight in parts:
+                scores[matched] += weight
+            rows = np.flatnonzero((scores > 0) & alive)
+            scores = scores[rows]
+        else:
+            rows, positions = np.unique(np.concatenate([matched for matched, _ in parts]), return_inverse=True)
+            weights = np.concatenate([np.full(len(matched), weight, dtype=np.float64) for matched, weight in parts])
+            scores = np.bincount(positions, weights=weights, minlength=len(rows))
+            live = alive[rows]
+            rows, scores = rows[live], scores[live]
+        ranked = _top_k(scores * RECENCY_SPAN + recency[rows], k)
+        return [(ids[rows[position]], float(scores[position])) for position in ranked]
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self),
+            "rows": len(self._ids),
+            "unsorted_rows": len(self._ids) - self._sorted_rows,
+            "tombstones": self._dead,
+            "vocabulary": len(self._words),
+            "tokens": {field: len(self._tokens[field]) + len(self._tail_tokens[field]) for field in self.fields},
+            "rebuilds": self.rebuilds,
+            "memory_bytes": int(self._alive.nbytes + self._recency.nbytes + sum(
+                self._owners[field].nbytes + self._tokens[field].nbytes
+                + self._tail_owners[field].nbytes + self._tail_tokens[field].nbytes
+                for field in self.fields)),
+        }
@@ -0,0 +1,122 @@
+"""
+Structured attribute search: category, subcategory, color, style and aesthetic.
+
+An item scores the weights (database/crud.py ATTRIBUTE_SEARCH_FIELDS) of the
+requested attributes it matches. Scoring runs over an in-process
+AttributeIndex holding every active item's attribute words as token ids, so
+a search touches no rows until it loads its page of winners. Until the
+index has loaded, the same scoring runs in SQL
+(`InventoryCRUD.weighted_search_inventory`).
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session, contains_eager
+
+from database.crud import ATTRIBUTE_SEARCH_FIELDS, InventoryCRUD
+from database.models import InventoryItem, InventoryStatus, Provider
+from database.schemas import WeightedSearchRequest
+from .attribute_index import AttributeIndex
+from .synced_index import LOAD_BATCH_SIZE, SyncedIndex
+
+ATTRIBUTE_COLUMNS = tuple(column for column, _ in ATTRIBUTE_SEARCH_FIELDS.values())
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _record(values, updated_at: Optional[datetime]) -> Tuple[tuple, float]:
+    """(attribute values, recency) as stored in the index"""
+    return tuple(values), ((updated_at or datetime.utcnow()) - EPOCH).total_seconds()
+
+
+class AttributeSearch(SyncedIndex):
+    table = InventoryItem
+    label = "attribute"
+
+    def __init__(self, refresh_seconds: float = 30.0):
+        super().__init__(refresh_seconds)
+        self.searches = 0
+        self.sql_searches = 0
+        self.last_search_ms: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "AttributeSearch":
+        return cls(refresh_seconds=float(os.getenv("ATTRIBUTE_INDEX_REFRESH_SECONDS", "30")))
+
+    def _new_index(self) -> AttributeIndex:
+        return AttributeIndex(ATTRIBUTE_COLUMNS, InventoryCRUD.attribute_tokens)
+
+    def _load_rows(self, db: Session, since: Optional[datetime]):
+        columns = [getattr(InventoryItem, column) for column in ATTRIBUTE_COLUMNS]
+        query = db.query(InventoryItem.id, InventoryItem.status, InventoryItem.updated_at, *columns)
+        if since is None:
+            query = query.filter(InventoryItem.status == InventoryStatus.ACTIVE)
+        else:
+            query = query.filter(InventoryItem.updated_at > since)
+
+        ids, records, inactive = [], [], []
+        for item_id, status, updated_at, *values in query.yield_per(LOAD_BATCH_SIZE):
+            if status == InventoryStatus.ACTIVE:
+                ids.append(item_id)
+                records.append(_record(values, updated_at))
+            else:
+                inactive.append(item_id)
+        return ids, records, inactive
+
+    # Write path
+
+    def stage(self, items: List[InventoryItem]) -> List[Tuple]:
+        """Index entries for new items, read before the commit expires them; pass to `publish` after it"""
+        return [
+            (item.id, _record([getattr(item, column) for column in ATTRIBUTE_COLUMNS], item.updated_at))
+            for item in items
+        ]
+
+    def publish(self, staged: List[Tuple]):
+        if staged:
+            super().publish([item_id for item_id, _ in staged], [record for _, record in staged])
+
+    # Queries
+
+    def search(self, db: Session, search_request: WeightedSearchRequest, limit: int = 25) -> List[Tuple[InventoryItem, float]]:
+        """Active items matching any requested attribute with their scores, best first"""
+        started = time.perf_counter()
+        criteria = InventoryCRUD.attribute_criteria(search_request)
+        if not criteria:
+            return []
+        if not self.loaded:
+            self.sql_searches += 1
+            return InventoryCRUD.weighted_search_inventory(db, search_request, limit=limit)
+
+        # A few spare candidates for items that became inactive since the last sync
+        ranked = self.index.search(criteria, limit + 10)
+        if not ranked:
+            return []
+        items = {
+            item.id: item
+            for item in db.query(InventoryItem)
+            .join(Provider)
+            .options(contains_eager(InventoryItem.provider))
+            .filter(InventoryItem.id.in_([item_id for item_id, _ in ranked]),
+                    InventoryItem.status == InventoryStatus.ACTIVE)
+        }
+        results = [(items[item_id], score) for item_id, score in ranked if item_id in items][:limit]
+
+        self.searches += 1
+        self.last_search_ms = round((time.perf_counter() - started) * 1000, 2)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            **self.index_stats(),
+            "searches": self.searches,
+            "sql_searches": self.sql_searches,
+            "last_search_ms": self.last_search_ms,
+        }
+
+
+# Shared attribute search used by the routes
+attribute_search = AttributeSearch.from_env()
@@ -0,0 +1,296 @@
+"""
+Hybrid semantic search over inventory.
+
+Every item gets a text embedding when it is created (see ai/embeddings.py),
+stored in `inventory_embeddings` in the same transaction as the item. A
+query is embedded once and answered in two steps:
+
+1. Candidates: the nearest items by cosine similarity, plus the best
+   full-text matches, so exact keyword hits are never lost.
+2. Rerank: one SQL statement loads the active candidates with their
+   ts_rank_cd, and each is scored
+   HYBRID_SEMANTIC_WEIGHT * cosine + (1 - weight) * ts_rank / best ts_rank.
+
+Nearest neighbours come from pgvector's HNSW index when migration
+7b3e9f1c2d4a could create the `embedding_vector` column, and otherwise from
+an in-process VectorIndex. That index is loaded in the background at
+startup, updated right after each commit on this instance, and caught up
+with other instances' writes every SEMANTIC_INDEX_REFRESH_SECONDS. Until
+the first load finishes, search answers with full-text matches only.
+When the query cannot be embedded (Gemini down, rate limited or too slow),
+search raises EmbeddingUnavailable and the route falls back to plain
+full-text search.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from google.api_core import exceptions as google_exceptions
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from ai.embeddings import Embedder, get_embedder, item_text
+from ai.gateway import GeminiUnavailable
+from database.crud import InventoryCRUD
+from database.database import engine
+from database.models import InventoryEmbedding, InventoryItem
+from .synced_index import SyncedVectorIndex
+
+
+# Failures of the embedding model call, as opposed to bugs in the search itself
+EMBEDDING_ERRORS = (GeminiUnavailable, asyncio.TimeoutError, google_exceptions.GoogleAPIError)
+
+
+class EmbeddingUnavailable(Exception):
+    """The search query could not be embedded; search without embeddings instead"""
+
+
+@dataclass
+class SearchHit:
+    item: InventoryItem
+    score: float
+    semantic_score: float
+    text_rank: float
+
+
+def vector_literal(vector: np.ndarray) -> str:
+    """pgvector text representation"""
+    return "[" + ",".join(f"{value:.6f}" for value in vector.tolist()) + "]"
+
+
+class SemanticSearch(SyncedVectorIndex):
+    table = InventoryEmbedding
+    label = "semantic"
+
+    def __init__(
+        self,
+        vector_candidates: int = 100,
+        text_candidates: int = 50,
+        semantic_weight: float = 0.7,
+        refresh_seconds: float = 30.0,
+        ivf_min_size: int = 50_000,
+        nprobe: int = 32,
+    ):
+        super().__init__(refresh_seconds, ivf_min_size, nprobe)
+        self.vector_candidates = vector_candidates
+        self.text_candidates = text_candidates
+        self.semantic_weight = semantic_weight
+        self._pgvector: Optional[bool] = None
+        self.embedded = 0
+        self.embedding_errors = 0
+        self.query_embedding_errors = 0
+        self.searches = 0
+        self.last_search_ms: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "SemanticSearch":
+        return cls(
+            vector_candidates=int(os.getenv("SEMANTIC_CANDIDATES", "100")),
+            text_candidates=int(os.getenv("SEMANTIC_TEXT_CANDIDATES", "50")),
+            semantic_weight=float(os.getenv("HYBRID_SEMANTIC_WEIGHT", "0.7")),
+            refresh_seconds=float(os.getenv("SEMANTIC_INDEX_REFRESH_SECONDS", "30")),
+            ivf_min_size=int(os.getenv("SEMANTIC_IVF_MIN_SIZE", "50000")),
+            nprobe=int(os.getenv("SEMANTIC_NPROBE", "32")),
+        )
+
+    @property
+    def embedder(self) -> Embedder:
+        return get_embedder()
+
+    @property
+    def dim(self) -> int:
+        return self.embedder.dim
+
+    def _columns(self) -> list:
+        return [InventoryEmbedding.vector]
+
+    def _filters(self) -> list:
+        return [InventoryEmbedding.model == self.embedder.name]
+
+    def _vectors(self, rows: List[tuple]) -> np.ndarray:
+        # One copy out of the row buffers into a contiguous matrix
+        return np.frombuffer(b"".join(vector for vector, in rows), dtype="<f4").reshape(len(rows), self.dim)
+
+    def enabled(self) -> bool:
+        # With pgvector the database answers nearest-neighbour queries itself
+        return not self.uses_pgvector()
+
+    def uses_pgvector(self) -> bool:
+        """Whether the database has an `embedding_vector` column matching the embedder's size"""
+        if self._pgvector is None:
+            try:
+                with engine.connect() as connection:
+                    # A vector column's atttypmod is its dimension
+                    dim = connection.execute(text(
+                        "SELECT atttypmod FROM pg_attribute "
+                        "WHERE attrelid = to_regclass('inventory_embeddings') "
+                        "AND attname = 'embedding_vector' AND NOT attisdropped"
+                    )).scalar()
+                self._pgvector = dim == self.embedder.dim
+            except Exception:
+                self._pgvector = False
+        return self._pgvector
+
+    # Write path
+
+    async def stage_embeddings(self, db: Session, items: List[InventoryItem]) -> List[Tuple[InventoryItem, np.ndarray]]:
+        """Embed new items and add their rows to the caller's transaction.
+
+        Pass the result to `publish` after the commit. An embedding failure never
+        fails the upload; the item is embedded later by `backfill`.
+        """
+        if not items:
+            return []
+        try:
+            vectors = await self.embedder.embed_documents([item_text(item) for item in items])
+        except Exception as e:
+            self.embedding_errors += len(items)
+            print(f"Could not embed {len(items)} inventory items: {e}")
+            return []
+        staged = list(zip(items, vectors))
+        self._write_rows(db, staged, replace=False)
+        return staged
+
+    def _write_rows(self, db: Session, staged: List[Tuple[InventoryItem, np.ndarray]], replace: bool):
+        """Insert embedding rows, or with `replace` also overwrite existing ones"""
+        now = datetime.utcnow()
+        existing = {}
+        if replace:
+            existing = {
+                row.inventory_item_id: row
+                for row in db.query(InventoryEmbedding).filter(
+                    InventoryEmbedding.inventory_item_id.in_([item.id for item, _ in staged])
+                )
+            }
+        for item, vector in staged:
+            values = {
+                "model": self.embedder.name,
+                "dim": len(vector),
+                "vector": np.asarray(vector, dtype="<f4").tobytes(),
+                "updated_at": now,
+            }
+            row = existing.get(item.id)
+            if row is None:
+                db.add(InventoryEmbedding(inventory_item_id=item.id, **values))
+            else:
+                for field, value in values.items():
+                    setattr(row, field, value)
+        if self.uses_pgvector():
+            db.flush()
+            db.execute(
+                text("UPDATE inventory_embeddings SET embedding_vector = CAST(:vector AS vector) "
+                     "WHERE inventory_item_id = :item_id"),
+                [{"item_id": str(item.id), "vector": vector_literal(vector)} for item, vector in staged],
+            )
+        self.embedded += len(staged)
+
+    def publish(self, staged: List[Tuple[InventoryItem, np.ndarray]]):
+        """Make committed embeddings searchable on this instance immediately"""
+        if staged and self.enabled():
+            super().publish([item.id for item, _ in staged], np.stack([vector for _, vector in staged]))
+
+    async def backfill(self, db: Session, limit: int = 500) -> int:
+        """Embed up to `limit` items that have no embedding from the current embedder"""
+        items = (
+            db.query(InventoryItem)
+            .outerjoin(InventoryEmbedding, InventoryEmbedding.inventory_item_id == InventoryItem.id)
+            .filter(or_(InventoryEmbedding.inventory_item_id.is_(None), InventoryEmbedding.model != self.embedder.name))
+            .order_by(InventoryItem.id)
+            .limit(limit)
+            .all()
+        )
+        if not items:
+            return 0
+        vectors = await self.embedder.embed_documents([item_text(item) for item in items])
+        staged = list(zip(items, vectors))
+        self._write_rows(db, staged, replace=True)
+        db.commit()
+        self.publish(staged)
+        return len(staged)
+
+    # Queries
+
+    def _nearest(self, db: Session, query_vector: np.ndarray) -> Dict:
+        """{item_id: cosine similarity} of the nearest candidates"""
+        if self.uses_pgvector():
+            rows = db.execute(
+                text("SELECT inventory_item_id, 1 - (embedding_vector <=> CAST(:vector AS vector)) "
+                     "FROM inventory_embeddings WHERE model = :model "
+                     "ORDER BY embedding_vector <=> CAST(:vector AS vector) LIMIT :limit"),
+                {"vector": vector_literal(query_vector), "model": self.embedder.name, "limit": self.vector_candidates},
+            ).all()
+            return {uuid.UUID(str(item_id)): float(score) for item_id, score in rows}
+        if not self.loaded:
+            return {}
+        return dict(self.index.search(query_vector, self.vector_candidates))
+
+    def _similarities(self, db: Session, query_vector: np.ndarray, item_ids: List) -> Dict:
+        """Cosine similarity for candidates found only by full-text search"""
+        if not item_ids:
+            return {}
+        if self.uses_pgvector():
+            rows = db.execute(
+                text("SELECT inventory_item_id, 1 - (embedding_vector <=> CAST(:vector AS vector)) "
+                     "FROM inventory_embeddings WHERE model = :model AND inventory_item_id = ANY(CAST(:ids AS uuid[]))"),
+                {"vector": vector_literal(query_vector), "model": self.embedder.name,
+                 "ids": [str(item_id) for item_id in item_ids]},
+            ).all()
+            return {uuid.UUID(str(item_id)): float(score) for item_id, score in rows}
+        vectors = self.index.vectors_for(item_ids)
+        if not vectors:
+            return {}
+        scores = np.stack(list(vectors.values())) @ query_vector
+        return dict(zip(vectors.keys(), scores.tolist()))
+
+    async def search(self, db: Session, query: str, limit: int = 25) -> List[SearchHit]:
+        """Best hybrid matches for `query`; raises EmbeddingUnavailable if it cannot be embedded"""
+        started = time.perf_counter()
+        try:
+            query_vector = await self.embedder.embed_query(query)
+        except EMBEDDING_ERRORS as e:
+            self.query_embedding_errors += 1
+            raise EmbeddingUnavailable(f"{type(e).__name__}: {e}") from e
+
+        semantic = self._nearest(db, query_vector)
+        # Full-text hits the embedding missed still compete in the rerank
+        text_only = [item_id for item_id, _ in InventoryCRUD.text_search_ids(db, query, self.text_candidates)
+                     if item_id not in semantic]
+        semantic.update(self._similarities(db, query_vector, text_only))
+        ranked = InventoryCRUD.get_active_items_with_text_rank(db, list(semantic) + text_only, query)
+
+        best_rank = max((rank for _, rank in ranked), default=0.0) or 1.0
+        weight = self.semantic_weight
+        hits = []
+        for item, rank in ranked:
+            similarity = semantic.get(item.id, 0.0)
+            score = weight * similarity + (1 - weight) * rank / best_rank
+            # Neighbours that are neither similar nor a text match are just the least bad of a small catalog
+            if score > 0:
+                hits.append(SearchHit(item, score, similarity, rank))
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+
+        self.searches += 1
+        self.last_search_ms = round((time.perf_counter() - started) * 1000, 2)
+        return hits[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "embedder": self.embedder.name,
+            "backend": "pgvector" if self.uses_pgvector() else "in_process",
+            **self.index_stats(),
+            "embedded": self.embedded,
+            "embedding_errors": self.embedding_errors,
+            "query_embedding_errors": self.query_embedding_errors,
+            "searches": self.searches,
+            "last_search_ms": self.last_search_ms,
+        }
+
+
+# Shared search service used by the routes
+semantic_search = SemanticSearch.from_env()
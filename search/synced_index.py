@@ -0,0 +1,187 @@
+"""
+An in-memory index kept in step with a table of per-item rows.
+
+Subclasses name the table and turn its rows into index entries;
+SyncedVectorIndex does so for one vector per item in a VectorIndex. The
+index is loaded in the background at startup, updated right after each
+commit on this instance (`publish` / `remove`), and caught up with other
+instances' writes every `refresh_seconds` by reading rows whose entry or
+item changed since the previous sync. Items that stopped being active
+drop out then.
+"""
+
+import asyncio
+import contextlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal
+from database.models import InventoryItem, InventoryStatus
+from .vector_index import VectorIndex
+
+# Rows fetched per round trip while loading the index
+LOAD_BATCH_SIZE = 10_000
+
+# Overlap between incremental syncs, so rows committed with a slightly older timestamp are not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class SyncedIndex(ABC):
+    # ORM model whose rows are indexed
+    table = None
+    label = "index"
+
+    def __init__(self, refresh_seconds: float = 30.0):
+        self.refresh_seconds = refresh_seconds
+        self._index = None
+        self._loaded = False
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # Subclass hooks
+
+    @abstractmethod
+    def _new_index(self):
+        """Empty index with `build`, `upsert`, `remove`, `rebuild` and `needs_rebuild`"""
+
+    @abstractmethod
+    def _load_rows(self, db: Session, since: Optional[datetime]):
+        """(ids, entries, inactive_ids) for rows changed since `since`, or all active ones"""
+
+    def enabled(self) -> bool:
+        """Whether this instance keeps the index in process at all"""
+        return True
+
+    def _index_outdated(self, index) -> bool:
+        """Whether the index has to be replaced and reloaded, e.g. after the embedding size changed"""
+        return False
+
+    # Index maintenance
+
+    @property
+    def index(self):
+        if self._index is None or self._index_outdated(self._index):
+            self._index = self._new_index()
+            self._loaded = False
+        return self._index
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def publish(self, item_ids: List, entries):
+        """Make committed entries searchable on this instance immediately"""
+        if item_ids and self._loaded:
+            self.index.upsert(item_ids, entries)
+
+    def remove(self, item_ids: Iterable):
+        if self._index is not None:
+            self._index.remove(list(item_ids))
+
+    def sync(self):
+        """Load the index, or apply changes since the last sync (blocking)"""
+        index = self.index
+        started = datetime.utcnow()
+        with SessionLocal() as db:
+            ids, entries, inactive = self._load_rows(db, None if not self._loaded else self._watermark - SYNC_OVERLAP)
+        if not self._loaded:
+            index.build(ids, entries)
+            self._loaded = True
+            print(f"🔎 {self.label.capitalize()} index loaded with {len(ids)} items")
+        else:
+            if ids:
+                index.upsert(ids, entries)
+            if inactive:
+                index.remove(inactive)
+        self._watermark = started
+        if index.needs_rebuild:
+            index.rebuild()
+
+    async def _run(self):
+        while True:
+            try:
+                if self.enabled():
+                    await asyncio.to_thread(self.sync)
+            except Exception as e:
+                print(f"{self.label.capitalize()} index sync error: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def index_stats(self) -> dict:
+        return {
+            "loaded": self._loaded,
+            "index": self._index.stats() if self._index is not None else None,
+        }
+
+
+class SyncedVectorIndex(SyncedIndex):
+    """A SyncedIndex holding one vector per item in a VectorIndex"""
+
+    # ORM model with inventory_item_id and updated_at columns
+    table = None
+    label = "vector"
+
+    def __init__(self, refresh_seconds: float = 30.0, ivf_min_size: int = 50_000, nprobe: int = 32):
+        super().__init__(refresh_seconds)
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+
+    # Subclass hooks
+
+    @property
+    @abstractmethod
+    def dim(self) -> int:
+        """Vector size"""
+
+    @abstractmethod
+    def _columns(self) -> list:
+        """Columns read for each row, after the item id"""
+
+    def _filters(self) -> list:
+        """Extra criteria rows must match, e.g. the current model version"""
+        return []
+
+    @abstractmethod
+    def _vectors(self, rows: List[tuple]) -> np.ndarray:
+        """(len(rows), dim) matrix from rows of `_columns()` values"""
+
+    def _new_index(self) -> VectorIndex:
+        return VectorIndex(self.dim, self.ivf_min_size, self.nprobe)
+
+    def _index_outdated(self, index) -> bool:
+        return index.dim != self.dim
+
+    def _load_rows(self, db: Session, since: Optional[datetime]):
+        query = (
+            db.query(self.table.inventory_item_id, InventoryItem.status, *self._columns())
+            .join(InventoryItem, InventoryItem.id == self.table.inventory_item_id)
+            .filter(*self._filters())
+        )
+        if since is None:
+            query = query.filter(InventoryItem.status == InventoryStatus.ACTIVE)
+        else:
+            query = query.filter(or_(self.table.updated_at > since, InventoryItem.updated_at > since))
+
+        ids, rows, inactive = [], [], []
+        for item_id, status, *values in query.yield_per(LOAD_BATCH_SIZE):
+            if status == InventoryStatus.ACTIVE:
+                ids.append(item_id)
+                rows.append(values)
+            else:
+                inactive.append(item_id)
+        return ids, self._vectors(rows), inactive
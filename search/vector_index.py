@@ -0,0 +1,249 @@
+"""
+In-process k-nearest-neighbour index over unit vectors.
+
+Vectors live in one contiguous float32 matrix, so scoring a query is a
+single BLAS matrix-vector product and top-k selection is an argpartition,
+not a sort. Beyond `ivf_min_size` vectors the matrix is clustered with
+spherical k-means (an inverted-file index): rows are stored grouped by
+nearest centroid and a query only scores the `nprobe` closest clusters,
+which keeps a query at 1M vectors in the low milliseconds.
+
+Updates are incremental. New and changed vectors go to an append-only delta
+buffer that is always scanned exhaustively, removals are tombstones, and
+`needs_rebuild` reports when the delta has grown enough that the owner
+should call `rebuild()` from a worker thread to fold it back in.
+"""
+
+import math
+import threading
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE = 100_000
+SCORE_CHUNK_ROWS = 65_536
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first"""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by dot product) for each row, in chunks to bound memory"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), SCORE_CHUNK_ROWS):
+        chunk = vectors[start:start + SCORE_CHUNK_ROWS]
+        assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+def train_centroids(vectors: np.ndarray, clusters: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the rows; returns unit-length centroids"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > KMEANS_SAMPLE:
+        vectors = vectors[rng.choice(len(vectors), KMEANS_SAMPLE, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = _assign(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        present, starts = np.unique(assignment[order], return_index=True)
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        # Clusters that lost every member keep their previous centroid
+        centroids[present] = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class VectorIndex:
+    def __init__(self, dim: int, ivf_min_size: int = 50_000, nprobe: int = 32, rebuild_ratio: float = 0.2):
+        self.dim = dim
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self.rebuild_ratio = rebuild_ratio
+        self._lock = threading.Lock()
+        self._positions: Dict[Hashable, Tuple[bool, int]] = {}  # id -> (in_delta, row)
+        self._set_main(np.empty(0, dtype=object), np.empty((0, dim), dtype=np.float32), None, None)
+        self._reset_delta(1024)
+        self.rebuilds = 0
+
+    def _set_main(self, ids, matrix, centroids, bounds):
+        self._main_ids = ids
+        self._main = matrix
+        self._main_alive = np.ones(len(ids), dtype=bool)
+        self._centroids = centroids
+        self._bounds = bounds  # rows of cluster c are bounds[c]:bounds[c + 1]
+
+    def _reset_delta(self, capacity: int):
+        self._delta = np.empty((capacity, self.dim), dtype=np.float32)
+        self._delta_ids: List[Hashable] = []
+        self._delta_alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        pending = len(self._delta_ids) + int((~self._main_alive).sum())
+        if self._centroids is None and len(self) >= self.ivf_min_size:
+            return True
+        return pending > max(1024, self.rebuild_ratio * len(self._main_ids))
+
+    # Writes
+
+    def build(self, ids: Sequence[Hashable], vectors: np.ndarray, _folded=None):
+        """Replace the whole index (blocking; run off the event loop for large inputs).
+
+        Vectors upserted while the build ran are kept, so a rebuild never drops
+        an update that happened concurrently.
+        """
+        ids = np.asarray(list(ids), dtype=object)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        centroids = bounds = None
+        if len(ids) >= self.ivf_min_size:
+            clusters = min(4096, max(16, int(math.sqrt(len(ids)))))
+            centroids = train_centroids(vectors, clusters)
+            assignment = _assign(vectors, centroids)
+            order = np.argsort(assignment, kind="stable")
+            ids, vectors = ids[order], vectors[order]
+            bounds = np.searchsorted(assignment[order], np.arange(clusters + 1))
+
+        with self._lock:
+            # A rebuild already holds the delta rows that existed when it started
+            # (`_folded`); only rows upserted since then are carried over
+            start = 0
+            if _folded is not None and _folded[0] is self._delta_ids:
+                start = _folded[1]
+            carried = [(row, self._delta_ids[row]) for row in range(start, len(self._delta_ids))]
+            carried = [(item_id, self._delta[row].copy()) for row, item_id in carried
+                       if self._delta_alive[row] and self._positions.get(item_id) == (True, row)]
+            removed = []
+            if _folded is not None:
+                # Items removed while the rebuild ran stay removed
+                removed = [row for row, item_id in enumerate(ids) if item_id not in self._positions]
+            self._set_main(ids, vectors, centroids, bounds)
+            self._main_alive[removed] = False
+            self._positions = {item_id: (False, row) for row, item_id in enumerate(ids)}
+            for row in removed:
+                del self._positions[ids[row]]
+            self._reset_delta(max(1024, len(carried) * 2))
+            self.rebuilds += 1
+        if carried:
+            self.upsert([item_id for item_id, _ in carried], np.stack([vector for _, vector in carried]))
+
+    def rebuild(self):
+        """Fold the delta buffer and tombstones back into a freshly clustered matrix"""
+        with self._lock:
+            main_rows = np.flatnonzero(self._main_alive)
+            delta_rows = np.flatnonzero(self._delta_alive[:len(self._delta_ids)])
+            ids = list(self._main_ids[main_rows]) + [self._delta_ids[row] for row in delta_rows]
+            vectors = np.concatenate([self._main[main_rows], self._delta[delta_rows]])
+            folded = (self._delta_ids, len(self._delta_ids))
+        self.build(ids, vectors, _folded=folded)
+
+    def upsert(self, ids: Sequence[Hashable], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        with self._lock:
+            self._tombstone(ids)
+            needed = len(self._delta_ids) + len(ids)
+            if needed > len(self._delta):
+                capacity = max(needed, len(self._delta) * 2)
+                grown = np.empty((capacity, self.dim), dtype=np.float32)
+                grown[:len(self._delta_ids)] = self._delta[:len(self._delta_ids)]
+                alive = np.zeros(capacity, dtype=bool)
+                alive[:len(self._delta_ids)] = self._delta_alive[:len(self._delta_ids)]
+                # Searches holding the old buffers keep reading a consistent copy
+                self._delta, self._delta_alive = grown, alive
+            start = len(self._delta_ids)
+            self._delta[start:start + len(ids)] = vectors
+            self._delta_alive[start:start + len(ids)] = True
+            for offset, item_id in enumerate(ids):
+                self._positions[item_id] = (True, start + offset)
+            # Appended in place: searches only read the rows that existed when they started
+            self._delta_ids.extend(ids)
+
+    def remove(self, ids: Sequence[Hashable]):
+        with self._lock:
+            self._tombstone(ids)
+
+    def _tombstone(self, ids):
+        for item_id in ids:
+            position = self._positions.pop(item_id, None)
+            if position is None:
+                continue
+            in_delta, row = position
+            (self._delta_alive if in_delta else self._main_alive)[row] = False
+
+    # Reads
+
+    def vectors_for(self, ids: Sequence[Hashable]) -> Dict[Hashable, np.ndarray]:
+        found = {}
+        for item_id in ids:
+            position = self._positions.get(item_id)
+            if position is not None:
+                in_delta, row = position
+                found[item_id] = (self._delta if in_delta else self._main)[row]
+        return found
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        """Up to k (id, cosine similarity) pairs, most similar first"""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            main_ids, main, main_alive = self._main_ids, self._main, self._main_alive
+            centroids, bounds = self._centroids, self._bounds
+            delta_ids, delta, delta_alive = self._delta_ids, self._delta, self._delta_alive
+            count = len(delta_ids)
+
+        # Candidate rows of the main matrix: everything, or the nprobe nearest clusters
+        if centroids is None:
+            ranges = [(0, len(main_ids))]
+        else:
+            probes = _top_k(centroids @ query, nprobe or self.nprobe)
+            ranges = [(bounds[c], bounds[c + 1]) for c in probes if bounds[c + 1] > bounds[c]]
+
+        score_parts, row_parts = [], []
+        for start, end in ranges:
+            scores = main[start:end] @ query
+            scores[~main_alive[start:end]] = -np.inf
+            score_parts.append(scores)
+            row_parts.append(np.arange(start, end))
+        main_count = sum(len(part) for part in score_parts)
+
+        if count:
+            scores = delta[:count] @ query
+            scores[~delta_alive[:count]] = -np.inf
+            score_parts.append(scores)
+        if not score_parts:
+            return []
+
+        scores = np.concatenate(score_parts)
+        rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int64)
+        results = []
+        for index in _top_k(scores, k):
+            if not np.isfinite(scores[index]):
+                break
+            if index < main_count:
+                item_id = main_ids[rows[index]]
+            else:
+                item_id = delta_ids[index - main_count]
+            results.append((item_id, float(scores[index])))
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "vectors": len(self),
+            "dim": self.dim,
+            "main_rows": len(self._main_ids),
+            "delta_rows": len(self._delta_ids),
+            "tombstones": int((~self._main_alive).sum()) + len(self._delta_ids) - int(self._delta_alive[:len(self._delta_ids)].sum()),
+            "clusters": 0 if self._centroids is None else len(self._centroids),
+            "nprobe": self.nprobe,
+            "rebuilds": self.rebuilds,
+            "memory_bytes": int(self._main.nbytes + self._delta.nbytes),
+        }
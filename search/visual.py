@@ -0,0 +1,215 @@
+"""
+"More like this": visually similar active items, without any model call.
+
+Each upload's VisualSignature (ai/visual.py) is stored in
+`inventory_visual_signatures` with the item. An in-process VectorIndex
+holds one packed signature vector per active item, so finding the items
+most similar to a given one is a single matrix product (clustered into an
+IVF index past VISUAL_IVF_MIN_SIZE items) followed by one query loading
+the winners.
+"""
+
+import io
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, contains_eager
+
+from ai.visual import (
+    SIGNATURE_VERSION, VECTOR_DIM, HISTOGRAM_BINS, VisualSignature, visual_signature, signature_vector,
+    signature_vectors, similarity_parts
+)
+from database.models import InventoryItem, InventoryStatus, InventoryVisualSignature, Provider
+from image_storage import get_storage
+from .synced_index import SyncedVectorIndex
+
+# Hamming distance at or below which two photos are treated as the same picture
+NEAR_DUPLICATE_BITS = 6
+
+# Longest edge decoded when backfilling from stored images
+BACKFILL_DECODE_SIDE = 256
+
+
+class SignatureNotFound(Exception):
+    """The item does not exist or has no visual signature yet"""
+
+
+@dataclass
+class SimilarHit:
+    item: InventoryItem
+    similarity: float
+    color_similarity: float
+    hash_distance: int
+
+    @property
+    def near_duplicate(self) -> bool:
+        return self.hash_distance <= NEAR_DUPLICATE_BITS
+
+
+class VisualSearch(SyncedVectorIndex):
+    table = InventoryVisualSignature
+    label = "visual"
+
+    def __init__(self, refresh_seconds: float = 30.0, ivf_min_size: int = 50_000, nprobe: int = 32):
+        super().__init__(refresh_seconds, ivf_min_size, nprobe)
+        self.signed = 0
+        self.lookups = 0
+        self.last_lookup_ms: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "VisualSearch":
+        return cls(
+            refresh_seconds=float(os.getenv("VISUAL_INDEX_REFRESH_SECONDS", "30")),
+            ivf_min_size=int(os.getenv("VISUAL_IVF_MIN_SIZE", "50000")),
+            nprobe=int(os.getenv("VISUAL_NPROBE", "32")),
+        )
+
+    @property
+    def dim(self) -> int:
+        return VECTOR_DIM
+
+    def _columns(self) -> list:
+        return [InventoryVisualSignature.color_histogram, InventoryVisualSignature.phash]
+
+    def _filters(self) -> list:
+        return [InventoryVisualSignature.version == SIGNATURE_VERSION]
+
+    def _vectors(self, rows: List[tuple]) -> np.ndarray:
+        histograms = np.frombuffer(b"".join(histogram for histogram, _ in rows), dtype="<f4")
+        phashes = np.fromiter((phash for _, phash in rows), dtype=np.int64, count=len(rows))
+        return signature_vectors(histograms.reshape(len(rows), HISTOGRAM_BINS), phashes)
+
+    # Write path
+
+    def stage_signatures(self, db: Session, signed: List[Tuple[InventoryItem, VisualSignature]], replace: bool = False):
+        """Add signature rows to the caller's transaction; pass the result to `publish` after the commit"""
+        now = datetime.utcnow()
+        existing = {}
+        if replace:
+            existing = {
+                row.inventory_item_id: row
+                for row in db.query(InventoryVisualSignature).filter(
+                    InventoryVisualSignature.inventory_item_id.in_([item.id for item, _ in signed])
+                )
+            }
+        for item, signature in signed:
+            values = {
+                "version": SIGNATURE_VERSION,
+                "color_histogram": np.asarray(signature.color_histogram, dtype="<f4").tobytes(),
+                "phash": signature.phash,
+                "updated_at": now,
+            }
+            row = existing.get(item.id)
+            if row is None:
+                db.add(InventoryVisualSignature(inventory_item_id=item.id, **values))
+            else:
+                for field, value in values.items():
+                    setattr(row, field, value)
+        self.signed += len(signed)
+        return [(item.id, signature_vector(signature)) for item, signature in signed]
+
+    def publish(self, staged: List[Tuple]):
+        if staged:
+            super().publish([item_id for item_id, _ in staged], np.stack([vector for _, vector in staged]))
+
+    def backfill(self, db: Session, limit: int = 100) -> Tuple[int, int]:
+        """Sign up to `limit` stored images that have no current signature (blocking); returns (signed, failed)"""
+        items = (
+            db.query(InventoryItem)
+            .outerjoin(InventoryVisualSignature, InventoryVisualSignature.inventory_item_id == InventoryItem.id)
+            .filter(
+                InventoryItem.storage_path.isnot(None),
+                or_(InventoryVisualSignature.inventory_item_id.is_(None),
+                    InventoryVisualSignature.version != SIGNATURE_VERSION),
+            )
+            .order_by(InventoryItem.id)
+            .limit(limit)
+            .all()
+        )
+        storage = get_storage()
+        signed, failed = [], 0
+        for item in items:
+            try:
+                image = Image.open(io.BytesIO(storage.read(item.storage_path)))
+                image.draft("RGB", (BACKFILL_DECODE_SIDE, BACKFILL_DECODE_SIDE))
+                signed.append((item, visual_signature(image.convert("RGB"))))
+            except Exception as e:
+                failed += 1
+                print(f"Could not sign image of inventory item {item.id}: {e}")
+        if signed:
+            staged = self.stage_signatures(db, signed, replace=True)
+            db.commit()
+            self.publish(staged)
+        return len(signed), failed
+
+    # Queries
+
+    def _query_vector(self, db: Session, item_id) -> np.ndarray:
+        vector = self.index.vectors_for([item_id]).get(item_id)
+        if vector is not None:
+            return vector
+        # Not in the index: inactive, or committed on another instance since the last sync
+        row = (
+            db.query(InventoryVisualSignature)
+            .filter(InventoryVisualSignature.inventory_item_id == item_id,
+                    InventoryVisualSignature.version == SIGNATURE_VERSION)
+            .first()
+        )
+        if row is None:
+            raise SignatureNotFound(item_id)
+        return signature_vectors(np.frombuffer(row.color_histogram, dtype="<f4")[None, :], np.array([row.phash]))[0]
+
+    def similar(self, db: Session, item_id, limit: int = 12) -> List[SimilarHit]:
+        """Active items most similar to item_id, best first; raises SignatureNotFound"""
+        started = time.perf_counter()
+        query = self._query_vector(db, item_id)
+        if not self.loaded:
+            return []
+
+        # A few spare candidates for items that became inactive since the last sync
+        neighbours = [(other, score) for other, score in self.index.search(query, limit + 10) if other != item_id]
+        if not neighbours:
+            return []
+        items = {
+            item.id: item
+            for item in db.query(InventoryItem)
+            .join(Provider)
+            .options(contains_eager(InventoryItem.provider))
+            .filter(InventoryItem.id.in_([other for other, _ in neighbours]),
+                    InventoryItem.status == InventoryStatus.ACTIVE)
+        }
+        neighbours = [(other, score) for other, score in neighbours if other in items][:limit]
+        if not neighbours:
+            return []
+
+        vectors = self.index.vectors_for([other for other, _ in neighbours])
+        neighbours = [(other, score) for other, score in neighbours if other in vectors]
+        if not neighbours:
+            return []
+        color, hamming = similarity_parts(query, np.stack([vectors[other] for other, _ in neighbours]))
+        hits = [
+            SimilarHit(items[other], score, float(color[position]), int(hamming[position]))
+            for position, (other, score) in enumerate(neighbours)
+        ]
+        self.lookups += 1
+        self.last_lookup_ms = round((time.perf_counter() - started) * 1000, 2)
+        return hits
+
+    def stats(self) -> dict:
+        return {
+            "signature_version": SIGNATURE_VERSION,
+            **self.index_stats(),
+            "signed": self.signed,
+            "lookups": self.lookups,
+            "last_lookup_ms": self.last_lookup_ms,
+        }
+
+
+# Shared visual search used by the routes
+visual_search = VisualSearch.from_env()
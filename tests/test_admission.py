@@ -0,0 +1,92 @@
+"""Admission control: slot handoff to queued requests and 429 with Retry-After"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import admission
+from admission import AdmissionController, AdmissionMiddleware, AdmissionRejected
+
+
+def test_released_slot_goes_to_the_oldest_waiter():
+    async def run():
+        controller = AdmissionController("ai", max_in_flight=1, max_queue=2, queue_timeout=1)
+        await controller.acquire()
+        order = []
+
+        async def request(label):
+            await controller.acquire()
+            order.append(label)
+
+        first = asyncio.create_task(request("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(request("second"))
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 2
+
+        controller.release()
+        await first
+        # Handed over, not freed: a newcomer cannot jump the queue
+        assert controller.in_flight == 1 and not second.done()
+
+        controller.release()
+        await second
+        assert order == ["first", "second"]
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_full_queue_and_queue_timeout_are_rejected():
+    async def run():
+        controller = AdmissionController("ai", max_in_flight=1, max_queue=1, queue_timeout=0.05)
+        controller.avg_service_time = 4.0
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire()
+        # Two requests ahead of a new one, one slot, ~4 s each
+        assert full.value.retry_after == 8
+
+        with pytest.raises(AdmissionRejected):
+            await waiter
+        assert controller.stats()["queued"] == 0
+        assert controller.rejected == 2
+
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_middleware_sheds_with_429_and_retry_after(monkeypatch):
+    controller = AdmissionController("ai", max_in_flight=1, max_queue=0, queue_timeout=1)
+    monkeypatch.setitem(admission.ADMISSION_CLASSES, "ai", controller)
+
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+
+    @app.post("/classify")
+    async def classify():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.post("/classify").status_code == 200
+    assert controller.in_flight == 0
+
+    # Saturated: the next AI request is shed, unclassified routes are not limited
+    controller.in_flight = 1
+    response = client.post("/classify")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert "ai capacity exhausted" in response.json()["detail"]
+    assert client.get("/health").status_code == 200
@@ -0,0 +1,91 @@
+"""AttributeIndex results checked against a brute-force scan with the same
+semantics as `InventoryCRUD.weighted_search_inventory`: a field matches when
+each query word begins one of its words, an item scores the weights of the
+fields it matches, and ties go to the most recent item."""
+
+import random
+
+from database.crud import ARRAY_ATTRIBUTE_COLUMNS, ATTRIBUTE_SEARCH_FIELDS, InventoryCRUD
+from search.attribute_index import AttributeIndex
+
+FIELDS = tuple(column for column, _ in ATTRIBUTE_SEARCH_FIELDS.values())
+WEIGHTS = dict(ATTRIBUTE_SEARCH_FIELDS.values())
+tokenize = InventoryCRUD.attribute_tokens
+
+WORDS = ["red", "reddish", "blue", "bluish", "knit", "knitted", "boho", "retro", "mid", "century", "wool", "bored"]
+QUERIES = ["re", "blu", "knit", "b", "mid century", "wo", "red", "x"]
+
+
+def random_record(rng):
+    values = tuple(
+        rng.sample(WORDS, rng.randint(0, 3)) if column in ARRAY_ATTRIBUTE_COLUMNS
+        else rng.choice([None, " ".join(rng.sample(WORDS, rng.randint(1, 2)))])
+        for column in FIELDS
+    )
+    return values, rng.uniform(0, 1e9)
+
+
+def field_words(value):
+    if value is None:
+        return []
+    texts = [value] if isinstance(value, str) else value
+    return [word for text in texts for word in tokenize(text)]
+
+
+def brute_force(data, criteria, k):
+    scored = []
+    for item_id, (values, recency) in data.items():
+        score = 0.0
+        for column, (query_words, weight) in criteria.items():
+            words = field_words(values[FIELDS.index(column)])
+            if all(any(word.startswith(query) for word in words) for query in query_words):
+                score += weight
+        if score > 0:
+            scored.append((score, recency, item_id))
+    scored.sort(key=lambda entry: (-entry[0], -entry[1]))
+    return [(item_id, score) for score, _, item_id in scored[:k]]
+
+
+def random_criteria(rng):
+    columns = rng.sample(FIELDS, rng.randint(1, len(FIELDS)))
+    return {column: (tokenize(rng.choice(QUERIES)), WEIGHTS[column]) for column in columns}
+
+
+def test_matches_brute_force_through_upserts_removes_and_rebuilds():
+    rng = random.Random(3)
+    for _ in range(20):
+        index = AttributeIndex(FIELDS, tokenize)
+        data = {item_id: random_record(rng) for item_id in range(rng.randint(1, 400))}
+        index.build(list(data), list(data.values()))
+        for _ in range(5):
+            upserts = {rng.randint(0, 500): random_record(rng) for _ in range(rng.randint(0, 60))}
+            index.upsert(list(upserts), list(upserts.values()))
+            data.update(upserts)
+            removed = rng.sample(list(data), min(len(data), rng.randint(0, 20)))
+            index.remove(removed)
+            for item_id in removed:
+                data.pop(item_id)
+            if rng.random() < 0.3:
+                index.rebuild()
+
+            criteria = random_criteria(rng)
+            k = rng.randint(1, 50)
+            assert index.search(criteria, k) == brute_force(data, criteria, k)
+
+
+def test_word_prefix_matching_and_recency_ties():
+    index = AttributeIndex(("color", "tags"), tokenize)
+    index.build(
+        ["old", "new", "bored", "both"],
+        [
+            (("Red", ["knitted"]), 1.0),
+            (("Dark red", []), 2.0),
+            (("Bored beige", ["knit-look"]), 3.0),
+            (("reddish", ["chunky knit"]), 0.5),
+        ],
+    )
+    # "red" begins "Red", "red" and "reddish" but not "Bored"
+    assert index.search({"color": (["red"], 3)}, 10) == [("new", 3.0), ("old", 3.0), ("both", 3.0)]
+    assert index.search({"color": (["red"], 3), "tags": (["knit"], 2)}, 2) == [("old", 5.0), ("both", 5.0)]
+    assert index.search({"tags": (["knit", "look"], 2)}, 10) == [("bored", 2.0)]
+    assert index.search({"color": (["green"], 3)}, 10) == []
@@ -0,0 +1,64 @@
+"""Batched image analysis: when single-image fallbacks are (and are not) used"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from PIL import Image
+
+from ai import batch
+from ai.gateway import GeminiUnavailable
+from database.schemas import AIAnalysisResult
+
+
+def images(count):
+    return [Image.new("RGB", (32, 32), (index * 40, 0, 0)) for index in range(count)]
+
+
+class FakeGateway:
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.calls = []
+
+    async def generate(self, model_name, contents, generation_config=None, prompt_id=None, cost=1.0, **kwargs):
+        self.calls.append(prompt_id)
+        if prompt_id == "inventory_analysis_batch":
+            if isinstance(self.batch_reply, Exception):
+                raise self.batch_reply
+            return SimpleNamespace(text=self.batch_reply)
+        return SimpleNamespace(text=json.dumps({"product_name": "Single"}))
+
+
+def analyze(gateway, count):
+    batch.gemini_gateway, previous = gateway, batch.gemini_gateway
+    try:
+        return asyncio.run(batch.analyze_images(images(count)))
+    finally:
+        batch.gemini_gateway = previous
+
+
+def test_unavailable_batch_is_not_fanned_out():
+    gateway = FakeGateway(GeminiUnavailable("AI service is temporarily unavailable, please retry later"))
+    outcomes = analyze(gateway, 3)
+    assert gateway.calls == ["inventory_analysis_batch"]
+    assert all(isinstance(outcome, GeminiUnavailable) for outcome in outcomes)
+
+
+def test_unparseable_batch_falls_back_to_single_calls():
+    gateway = FakeGateway("not json")
+    outcomes = analyze(gateway, 3)
+    assert gateway.calls.count("inventory_analysis") == 3
+    assert [outcome.product_name for outcome in outcomes] == ["Single"] * 3
+
+
+def test_only_missing_entries_are_retried():
+    reply = json.dumps([
+        {"image_index": 0, "product_name": "Batch 0"},
+        {"image_index": 2, "product_name": "Batch 2"},
+        {"image_index": 7, "product_name": "Out of range"},
+    ])
+    gateway = FakeGateway(reply)
+    outcomes = analyze(gateway, 3)
+    assert gateway.calls.count("inventory_analysis") == 1
+    assert all(isinstance(outcome, AIAnalysisResult) for outcome in outcomes)
+    assert [outcome.product_name for outcome in outcomes] == ["Batch 0", "Single", "Batch 2"]
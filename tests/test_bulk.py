@@ -0,0 +1,100 @@
+"""Bulk loader: what COPY receives for each column type, and rows the first row does not describe"""
+
+import csv
+import io
+import uuid
+from datetime import datetime
+
+import pytest
+
+from database import bulk
+from database.bulk import _CopyStream, _csv_lines, bulk_load
+from database.models import InventoryItem, InventoryStatus, Provider, ProviderStatus
+
+
+@pytest.fixture
+def copied(monkeypatch):
+    """Run bulk_load against a fake COPY; returns the loaded column names and CSV rows"""
+    loaded = {}
+
+    def fake_copy(conn, table, columns, encoded_rows, returning):
+        text = _CopyStream(_csv_lines(encoded_rows)).read()
+        loaded["columns"] = [c.name for c in columns]
+        loaded["text"] = text
+        loaded["rows"] = [dict(zip(loaded["columns"], row)) for row in csv.reader(io.StringIO(text))]
+        return [None] * len(loaded["rows"])
+
+    monkeypatch.setattr(bulk, "_supports_copy", lambda conn: True)
+    monkeypatch.setattr(bulk, "_copy_chunk", fake_copy)
+    return loaded
+
+
+def test_values_are_encoded_for_copy_csv(copied):
+    provider_id = uuid.uuid4()
+    result = bulk_load(object(), Provider, [{
+        "id": provider_id,
+        "name": 'Shop "North", Ltd',
+        "email": "north@example.com",
+        "phone": "",
+        "specializations": ['Lamps, "vintage"', "back\\slash", None],
+        "payment_info": {"iban": "NL00", "verified": True},
+        "status": ProviderStatus.ACTIVE,
+        "is_verified": True,
+        "rating": 4.5,
+        "last_active": datetime(2024, 5, 1, 12, 30),
+    }])
+    assert (result.rows_read, result.rows_inserted) == (1, 1)
+
+    row = copied["rows"][0]
+    assert row["id"] == str(provider_id)
+    assert row["name"] == 'Shop "North", Ltd'
+    assert row["specializations"] == '{"Lamps, \\"vintage\\"","back\\\\slash",NULL}'
+    assert row["payment_info"] == '{"iban": "NL00", "verified": true}'
+    # Enum columns store member names, booleans use PostgreSQL's t/f
+    assert row["status"] == "ACTIVE"
+    assert row["is_verified"] == "t"
+    assert row["rating"] == "4.5"
+    assert row["last_active"] == "2024-05-01T12:30:00"
+    # Python-side defaults are filled in
+    assert row["total_tasks_completed"] == "0"
+    assert datetime.fromisoformat(row["created_at"])
+
+    # An empty string stays quoted; an unquoted empty field is NULL for COPY
+    assert ',"north@example.com","",' in copied["text"]
+    assert "verification_date" not in copied["columns"]
+
+
+def test_missing_keys_are_null_or_defaulted(copied):
+    provider_id = uuid.uuid4()
+    bulk_load(object(), InventoryItem, [
+        {"provider_id": provider_id, "product_name": "Lamp", "tags": ["a"]},
+        {"provider_id": provider_id, "product_name": "Chair"},
+    ])
+    first, second = copied["rows"]
+    assert first["id"] != second["id"]
+    assert second["tags"] == ""
+    assert second["status"] == InventoryStatus.ACTIVE.name
+
+
+def test_copy_stream_reads_in_arbitrary_sizes():
+    lines = ["a,b\n", "ccc,d\n", "e\n"]
+    stream = _CopyStream(iter(lines))
+    chunks = []
+    while True:
+        chunk = stream.read(4)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    assert all(len(chunk) <= 4 for chunk in chunks)
+    assert "".join(chunks) == "".join(lines)
+
+
+def test_row_setting_a_column_the_first_row_left_out_is_rejected(copied):
+    provider_id = uuid.uuid4()
+    rows = [
+        {"provider_id": provider_id, "product_name": "Lamp"},
+        {"provider_id": provider_id, "product_name": "Chair", "brand": "Acme"},
+    ]
+    with pytest.raises(ValueError, match="brand"):
+        bulk_load(object(), InventoryItem, rows)
+    assert "rows" not in copied
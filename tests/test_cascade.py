@@ -0,0 +1,92 @@
+"""Model cascade: when the cheap tier's answer is kept and when it escalates"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from ai import cascade
+from ai.gateway import GeminiUnavailable
+
+COMPLETE = {
+    "product_name": "Desk lamp",
+    "category": "Home",
+    "subcategory": "Lighting",
+    "description": "Brass desk lamp",
+    "brand": "Acme",
+    "color": "Gold",
+    "material": "Brass",
+    "condition": "Good",
+    "estimated_price_range": {"min": 20, "max": 30, "currency": "EUR"},
+}
+
+
+class FakeGateway:
+    def __init__(self, replies):
+        self.replies = replies
+        self.models = []
+
+    async def generate(self, model_name, contents, **kwargs):
+        self.models.append(model_name)
+        reply = self.replies[model_name]
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(text=json.dumps(reply))
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    def install(cheap, full=None):
+        fake = FakeGateway({cascade.CHEAP_MODEL: cheap, cascade.ANALYSIS_MODEL: full or {**COMPLETE, "confidence": 0.95}})
+        monkeypatch.setattr(cascade, "gemini_gateway", fake)
+        return fake
+    monkeypatch.setattr(cascade, "CONFIDENCE_THRESHOLD", 0.7)
+    return install
+
+
+def analyze():
+    return asyncio.run(cascade.analyze_with_cascade(Image.new("RGB", (16, 16))))
+
+
+def test_confident_complete_cheap_answer_is_kept(gateway):
+    fake = gateway({**COMPLETE, "confidence": 0.7})
+    result = analyze()
+    assert fake.models == [cascade.CHEAP_MODEL]
+    assert (result.model, result.escalated, result.confidence) == (cascade.CHEAP_MODEL, False, 0.7)
+
+
+def test_confidence_below_the_threshold_escalates(gateway):
+    fake = gateway({**COMPLETE, "confidence": 0.69})
+    result = analyze()
+    assert fake.models == [cascade.CHEAP_MODEL, cascade.ANALYSIS_MODEL]
+    assert (result.model, result.escalated, result.confidence) == (cascade.ANALYSIS_MODEL, True, 0.95)
+
+
+def test_threshold_is_configurable(gateway, monkeypatch):
+    monkeypatch.setattr(cascade, "CONFIDENCE_THRESHOLD", 0.5)
+    fake = gateway({**COMPLETE, "confidence": 0.6})
+    assert analyze().model == cascade.CHEAP_MODEL
+    assert fake.models == [cascade.CHEAP_MODEL]
+
+
+def test_confidence_is_capped_by_completeness(gateway):
+    # Self-assured, but only 5 of the 9 key fields are known: 0.556 < 0.7
+    vague = {**COMPLETE, "brand": "Unknown", "color": "Not visible/determinable", "material": "",
+             "description": None, "confidence": 1.0}
+    assert cascade.analysis_confidence(cascade.ScoredAnalysis(**vague)) == 0.556
+    gateway(vague)
+    assert analyze().escalated
+
+
+def test_undetermined_required_field_escalates_at_any_confidence(gateway, monkeypatch):
+    monkeypatch.setattr(cascade, "CONFIDENCE_THRESHOLD", 0.0)
+    gateway({**COMPLETE, "condition": "Not visible/determinable", "confidence": 1.0})
+    assert analyze().model == cascade.ANALYSIS_MODEL
+
+
+def test_cheap_tier_failure_escalates(gateway):
+    fake = gateway(GeminiUnavailable("AI service is temporarily unavailable, please retry later"))
+    assert analyze().model == cascade.ANALYSIS_MODEL
+    assert fake.models == [cascade.CHEAP_MODEL, cascade.ANALYSIS_MODEL]
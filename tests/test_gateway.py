@@ -0,0 +1,118 @@
+"""GeminiGateway capacity lanes, fair queuing and circuit breaker bookkeeping"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ai import gateway as gateway_module
+from ai.gateway import GeminiGateway, GeminiUnavailable
+from ai.ledger import ai_call_context
+from ai.scheduler import FairScheduler
+
+
+def make_gateway(**kwargs) -> GeminiGateway:
+    return GeminiGateway(
+        scheduler=FairScheduler(max_concurrency=1, per_key_limit=1),
+        query_scheduler=FairScheduler(max_concurrency=2, per_key_limit=2),
+        base_backoff=0.01,
+        **kwargs,
+    )
+
+
+async def fake_embed_content_async(model, content, request_options=None, **kwargs):
+    return {"embedding": [[1.0, 0.0]] * len(content)}
+
+
+def test_query_embeddings_skip_the_analysis_queue(monkeypatch):
+    monkeypatch.setattr(gateway_module.genai, "embed_content_async", fake_embed_content_async)
+
+    async def run():
+        gateway = make_gateway()
+        # Every analysis slot is taken by an upload
+        held = await gateway.scheduler.acquire("bulk-provider")
+
+        result = await asyncio.wait_for(gateway.embed("models/embed", ["red dress"], interactive=True), timeout=1)
+        assert result == {"embedding": [[1.0, 0.0]]}
+
+        # A document embedding has to wait for the analysis queue and times out behind it
+        with pytest.raises(GeminiUnavailable) as raised:
+            await gateway.embed("models/embed", ["red dress"], deadline=0.05)
+        assert raised.value.status_code == 429
+
+        gateway.scheduler.release(held)
+
+    asyncio.run(run())
+
+
+def test_query_embeddings_have_their_own_rate_limit(monkeypatch):
+    monkeypatch.setattr(gateway_module.genai, "embed_content_async", fake_embed_content_async)
+
+    async def run():
+        gateway = make_gateway(requests_per_minute=60, burst=1)
+        gateway.bucket.tokens = -100  # analysis quota spent
+        await asyncio.wait_for(gateway.embed("models/embed", ["scarf"], interactive=True), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_cancelled_probe_lets_the_next_call_probe(monkeypatch):
+    started = asyncio.Event()
+
+    async def hanging_embed_content_async(model, content, request_options=None, **kwargs):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def run():
+        gateway = make_gateway(failure_threshold=1, recovery_timeout=0.0)
+        gateway.breaker.record_failure()
+        assert gateway.breaker.state == "open"
+
+        monkeypatch.setattr(gateway_module.genai, "embed_content_async", hanging_embed_content_async)
+        probe = asyncio.create_task(gateway.embed("models/embed", ["scarf"], interactive=True))
+        await started.wait()
+        assert gateway.breaker.probe_in_flight
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert not gateway.breaker.probe_in_flight
+
+        # The next call probes the API and closes the breaker
+        monkeypatch.setattr(gateway_module.genai, "embed_content_async", fake_embed_content_async)
+        await asyncio.wait_for(gateway.embed("models/embed", ["scarf"], interactive=True), timeout=1)
+        assert gateway.breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+class FakeStreamingModel:
+    def __init__(self, model_name, generation_config=None):
+        pass
+
+    async def generate_content_async(self, contents, stream=False, request_options=None):
+        async def chunks():
+            for text in ("a ", "red ", "dress"):
+                yield SimpleNamespace(text=text, usage_metadata=None)
+
+        return chunks()
+
+
+def test_streams_hold_a_fair_queue_slot(monkeypatch):
+    monkeypatch.setattr(gateway_module.genai, "GenerativeModel", FakeStreamingModel)
+
+    async def run():
+        gateway = make_gateway()
+        with ai_call_context("classify_stream", "provider-a"):
+            stream = gateway.generate_stream("gemini-2.0-flash", ["prompt"])
+            assert await stream.__anext__() == "a "
+        assert gateway.scheduler.stats()["providers"]["provider-a"]["in_flight"] == 1
+
+        # The only slot is taken, so a second stream waits in the queue and times out
+        with pytest.raises(GeminiUnavailable) as raised:
+            await gateway.generate_stream("gemini-2.0-flash", ["prompt"], deadline=0.05).__anext__()
+        assert raised.value.status_code == 429
+
+        assert [text async for text in stream] == ["red ", "dress"]
+        assert gateway.scheduler.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+"""Idempotency-Key middleware over the real key store"""
+
+from datetime import timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+import idempotency
+from idempotency import IdempotencyMiddleware, IdempotencyStore
+
+URL = "/provider/upload-inventory"
+
+
+@pytest.fixture
+def store(sessions, monkeypatch):
+    monkeypatch.setattr(idempotency, "SessionLocal", sessions)
+    return IdempotencyStore(ttl=timedelta(hours=1), lock_timeout=timedelta(minutes=5))
+
+
+@pytest.fixture
+def app(store):
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.statuses = []
+
+    @app.post(URL)
+    async def upload():
+        app.state.calls += 1
+        status = app.state.statuses.pop(0) if app.state.statuses else 200
+        return JSONResponse({"call": app.state.calls}, status_code=status)
+
+    app.add_middleware(IdempotencyMiddleware, store=store)
+    return app
+
+
+def post(client, key, body=b"image"):
+    return client.post(URL, content=body, headers={"Idempotency-Key": key, "Content-Type": "image/jpeg"})
+
+
+def test_retry_replays_the_first_response(app, store):
+    client = TestClient(app)
+    first = post(client, "k1")
+    assert first.status_code == 200 and first.json() == {"call": 1}
+
+    replayed = post(client, "k1")
+    assert replayed.json() == {"call": 1}
+    assert replayed.headers["idempotent-replayed"] == "true"
+
+    # Also from the database, as another instance would see it
+    store._cache.clear()
+    assert post(client, "k1").json() == {"call": 1}
+    assert app.state.calls == 1
+
+    # A new key runs the request again
+    assert post(client, "k2").json() == {"call": 2}
+
+
+def test_key_reused_with_another_body_is_rejected(app):
+    client = TestClient(app)
+    post(client, "k1", b"one image")
+    response = post(client, "k1", b"another image")
+    assert response.status_code == 422
+    assert app.state.calls == 1
+
+
+def test_key_still_in_progress_gets_409(app, store):
+    client = TestClient(app)
+    # Another instance is still processing this key
+    assert store.claim("k1", f"POST {URL}", idempotency._request_hash("POST", URL, "image/jpeg", b"image"))[0] == "claimed"
+    response = post(client, "k1")
+    assert response.status_code == 409
+    assert response.headers["retry-after"] == "1"
+    assert app.state.calls == 0
+
+
+def test_transient_failures_release_the_key(app):
+    client = TestClient(app)
+    app.state.statuses = [503, 429]
+    assert post(client, "k1").status_code == 503
+    assert post(client, "k1").status_code == 429
+    # Retried for real each time, and only the success is stored
+    assert post(client, "k1").json() == {"call": 3}
+    assert post(client, "k1").json() == {"call": 3}
+    assert app.state.calls == 3
+
+
+def test_final_client_errors_are_stored(app):
+    client = TestClient(app)
+    app.state.statuses = [404]
+    assert post(client, "k1").status_code == 404
+    replayed = post(client, "k1")
+    assert replayed.status_code == 404 and replayed.headers["idempotent-replayed"] == "true"
+    assert app.state.calls == 1
@@ -0,0 +1,140 @@
+"""GET /images/{inventory_id}/{rendition}: byte ranges and cache eviction"""
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from database.database import get_database_session
+from image_storage import renditions
+from image_storage.renditions import DiskLRUCache, ImageProxy
+
+ORIGINAL = b"\xff\xd8" + bytes(range(256)) * 4
+
+
+class FakeStorage:
+    def __init__(self):
+        self.downloads = 0
+
+    async def download(self, storage_path):
+        self.downloads += 1
+        return ORIGINAL
+
+
+class FakeQuery:
+    def filter(self, *criteria):
+        return self
+
+    def scalar(self):
+        return "inventory/provider/item.jpg"
+
+
+class FakeSession:
+    def query(self, *columns):
+        return FakeQuery()
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = FakeStorage()
+    monkeypatch.setattr(renditions, "get_storage", lambda: storage)
+    return storage
+
+
+@pytest.fixture
+def proxy(tmp_path, storage):
+    return ImageProxy(DiskLRUCache(str(tmp_path), max_bytes=1 << 20))
+
+
+@pytest.fixture
+def client(proxy, monkeypatch):
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    main.app.dependency_overrides[get_database_session] = lambda: FakeSession()
+    yield TestClient(main.app)
+    main.app.dependency_overrides.pop(get_database_session)
+
+
+def image_url():
+    return f"/images/{uuid.uuid4()}/original"
+
+
+def test_whole_file(client):
+    response = client.get(image_url())
+    assert response.status_code == 200
+    assert response.content == ORIGINAL
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(ORIGINAL))
+
+
+def test_byte_ranges(client):
+    url = image_url()
+    response = client.get(url, headers={"Range": "bytes=2-11"})
+    assert response.status_code == 206
+    assert response.content == ORIGINAL[2:12]
+    assert response.headers["content-range"] == f"bytes 2-11/{len(ORIGINAL)}"
+
+    response = client.get(url, headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == ORIGINAL[-5:]
+
+    response = client.get(url, headers={"Range": "bytes=1000-"})
+    assert response.content == ORIGINAL[1000:]
+
+    # Past the end is clamped
+    response = client.get(url, headers={"Range": "bytes=1020-5000"})
+    assert response.content == ORIGINAL[1020:]
+
+
+def test_unsatisfiable_and_ignored_ranges(client):
+    url = image_url()
+    response = client.get(url, headers={"Range": f"bytes={len(ORIGINAL)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(ORIGINAL)}"
+
+    # Several ranges, malformed ranges and a stale If-Range get the whole file
+    for headers in ({"Range": "bytes=0-1,4-5"}, {"Range": "items=0-1"}, {"Range": "bytes=5-2"},
+                    {"Range": "bytes=0-1", "If-Range": '"stale"'}):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.content == ORIGINAL
+
+    etag = client.get(url).headers["etag"]
+    response = client.get(url, headers={"Range": "bytes=0-1", "If-Range": etag})
+    assert response.status_code == 206
+
+
+def test_evicted_between_lookup_and_open(proxy, storage):
+    lookup = FakeSession().query().scalar
+
+    async def lookup_storage_path():
+        return lookup()
+
+    async def run():
+        stale = await proxy.get("item", "original", lookup_storage_path)
+        # Another rendition pushes it out of a full cache before the response opens it
+        proxy.cache.max_bytes = 0
+        proxy.cache.put("other/original", b"x")
+        proxy.cache.max_bytes = 1 << 20
+
+        real_get = proxy.get
+        calls = []
+
+        async def get_returning_stale_entry(*args):
+            calls.append(args)
+            return stale if len(calls) == 1 else await real_get(*args)
+
+        proxy.get = get_returning_stale_entry
+        cached, file = await proxy.open_file("item", "original", lookup_storage_path)
+        with file:
+            assert file.read() == ORIGINAL
+        assert storage.downloads == 2
+
+        # A handle that is already open survives eviction
+        cached, file = await proxy.open_file("item", "original", lookup_storage_path)
+        proxy.cache.invalidate("item/original")
+        with file:
+            assert file.read() == ORIGINAL
+
+    asyncio.run(run())
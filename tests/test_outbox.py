@@ -0,0 +1,139 @@
+"""Storage outbox: staging, leasing, retries and items deleted before their image landed"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.models import InventoryItem, Provider, StorageOutbox
+from image_storage import outbox
+from image_storage.base import PendingWrite
+from image_storage.local import LocalStorageBackend
+from image_storage.outbox import OutboxWorker, enqueue_uploads
+
+
+class FlakyStorage(LocalStorageBackend):
+    """Local storage whose first `copy_failures` copies raise"""
+
+    def __init__(self, root, copy_failures=0):
+        super().__init__(root)
+        self.copy_failures = copy_failures
+
+    def copy(self, source_path, storage_path):
+        if self.copy_failures > 0:
+            self.copy_failures -= 1
+            raise ConnectionError("storage unreachable")
+        super().copy(source_path, storage_path)
+
+
+@pytest.fixture
+def storage(tmp_path, sessions, monkeypatch):
+    storage = FlakyStorage(str(tmp_path))
+    monkeypatch.setattr(outbox, "SessionLocal", sessions)
+    monkeypatch.setattr(outbox, "get_storage", lambda: storage)
+    return storage
+
+
+def add_items(sessions, count, storage):
+    """Commit `count` items with their uploads staged; returns (item ids, final paths)"""
+    provider_id = uuid.uuid4()
+    with sessions() as db:
+        db.add(Provider(id=provider_id, name="Shop", email=f"{provider_id}@example.com"))
+        items = [InventoryItem(id=uuid.uuid4(), provider_id=provider_id, product_name=f"Item {i}") for i in range(count)]
+        db.add_all(items)
+        uploads = [(item.id, PendingWrite(f"inventory/{provider_id}/{item.id}.jpg", b"jpeg bytes")) for item in items]
+        asyncio.run(enqueue_uploads(db, uploads))
+        db.commit()
+        return [item.id for item in items], [pending.storage_path for _, pending in uploads]
+
+
+def make_due(sessions):
+    with sessions() as db:
+        db.query(StorageOutbox).update({"available_at": datetime.utcnow() - timedelta(seconds=1)})
+        db.commit()
+
+
+def test_upload_lands_and_points_the_item_at_it(sessions, storage):
+    item_ids, paths = add_items(sessions, 2, storage)
+    with sessions() as db:
+        staged = [entry.staged_path for entry in db.query(StorageOutbox)]
+    assert all(storage.stat(path) for path in staged)
+
+    assert OutboxWorker().process_batch() == 2
+
+    with sessions() as db:
+        assert db.query(StorageOutbox).count() == 0
+        for item_id, path in zip(item_ids, paths):
+            item = db.get(InventoryItem, item_id)
+            assert item.storage_path == path and item.image_url == f"/storage/{path}"
+    assert all(storage.read(path) == b"jpeg bytes" for path in paths)
+    # Staged copies are removed once the rows are committed
+    assert not any(storage.stat(path) for path in staged)
+
+
+def test_claimed_entries_are_leased_until_they_expire(sessions, storage):
+    add_items(sessions, 1, storage)
+    worker = OutboxWorker(lease_seconds=300)
+    claimed = worker._claim("upload", 10)
+    assert len(claimed) == 1 and claimed[0].attempts == 1
+
+    # Leased: another worker finds nothing to do
+    assert OutboxWorker()._claim("upload", 10) == []
+
+    # The first worker died; once the lease runs out the entry is claimed again
+    make_due(sessions)
+    reclaimed = OutboxWorker()._claim("upload", 10)
+    assert [entry.id for entry in reclaimed] == [claimed[0].id]
+    assert reclaimed[0].attempts == 2
+
+
+def test_failed_copy_is_retried_with_backoff_then_marked_failed(sessions, storage):
+    item_ids, paths = add_items(sessions, 1, storage)
+    storage.copy_failures = 1
+    worker = OutboxWorker(max_attempts=3)
+
+    before = datetime.utcnow()
+    worker.process_batch()
+    with sessions() as db:
+        entry = db.query(StorageOutbox).one()
+        assert entry.status == "pending" and entry.attempts == 1
+        assert "storage unreachable" in entry.last_error
+        assert entry.available_at >= before + timedelta(seconds=2)
+        assert storage.stat(entry.staged_path) is not None
+    # Not due yet
+    assert worker.process_batch() == 0
+
+    make_due(sessions)
+    worker.process_batch()
+    with sessions() as db:
+        assert db.query(StorageOutbox).count() == 0
+        assert db.get(InventoryItem, item_ids[0]).storage_path == paths[0]
+
+    add_items(sessions, 1, storage)
+    storage.copy_failures = 3
+    for _ in range(3):
+        make_due(sessions)
+        worker.process_batch()
+    with sessions() as db:
+        entry = db.query(StorageOutbox).one()
+        assert (entry.status, entry.attempts) == ("failed", 3)
+    assert worker.stats()["failed"] == 1
+
+
+def test_item_deleted_before_upload_turns_into_a_delete(sessions, storage):
+    item_ids, paths = add_items(sessions, 1, storage)
+    with sessions() as db:
+        db.query(InventoryItem).filter(InventoryItem.id == item_ids[0]).delete()
+        db.commit()
+
+    worker = OutboxWorker()
+    worker.process_batch()
+    with sessions() as db:
+        entry = db.query(StorageOutbox).one()
+        assert (entry.operation, entry.attempts) == ("delete", 0)
+
+    worker.process_batch()
+    with sessions() as db:
+        assert db.query(StorageOutbox).count() == 0
+    assert storage.stat(paths[0]) is None
@@ -0,0 +1,54 @@
+"""Strict parsing of the amounts Gemini returns in analysis results"""
+
+import pytest
+
+from database.schemas import AIAnalysisResult, PriceRange, _coerce_number
+
+
+@pytest.mark.parametrize("value, expected", [
+    (45, 45),
+    (4.5, 4.5),
+    ("45", 45.0),
+    ("  45  ", 45.0),
+    ("-3", -3.0),
+    ("€45.50", 45.5),
+    ("45.50 EUR", 45.5),
+    ("EUR 45", 45.0),
+    ("$12", 12.0),
+    ("1200.5", 1200.5),
+    ("1,200", 1200.0),
+    ("1,200.50", 1200.5),
+    ("1.200,50", 1200.5),
+    ("12,5", 12.5),
+    ("45-60", 45.0),
+    ("45 to 60", 45.0),
+    ("€45 – €60", 45.0),
+])
+def test_accepted(value, expected):
+    assert _coerce_number(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    True,
+    "",
+    "abc",
+    "45abc",
+    "about 45",
+    "1.2.3",
+    "1,20,000",
+    # Ambiguous: 1.2 with a decimal point, 1200 with European grouping
+    "1.200",
+    "12.500",
+])
+def test_rejected(value):
+    assert _coerce_number(value) is None
+
+
+def test_price_range_and_score_use_the_strict_parser():
+    price = PriceRange(min="€1.200,00", max="1.500", currency="EUR")
+    assert (price.min, price.max) == (1200.0, None)
+
+    result = AIAnalysisResult(product_name="Lamp", marketability_score="12")
+    assert result.marketability_score == 10.0
+    assert AIAnalysisResult(product_name="Lamp", marketability_score="high").marketability_score is None
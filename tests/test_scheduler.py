@@ -0,0 +1,89 @@
+"""FairScheduler grant order and per-provider caps"""
+
+import asyncio
+
+import pytest
+
+from ai.scheduler import FairScheduler, SchedulerTimeout
+
+
+def grant_order(scheduler, jobs):
+    """Labels of (label, key, cost) jobs in the order they get a slot, all queued before any is granted"""
+    async def run():
+        order = []
+        blocker = await scheduler.acquire("blocker")
+
+        async def job(label, key, cost):
+            key = await scheduler.acquire(key, cost)
+            order.append(label)
+            await asyncio.sleep(0)
+            scheduler.release(key)
+
+        tasks = [asyncio.create_task(job(*spec)) for spec in jobs]
+        await asyncio.sleep(0)
+        scheduler.release(blocker)
+        await asyncio.gather(*tasks)
+        return order
+
+    return asyncio.run(run())
+
+
+def test_providers_take_turns():
+    scheduler = FairScheduler(max_concurrency=1, per_key_limit=1)
+    jobs = [("a1", "a", 1), ("a2", "a", 1), ("a3", "a", 1), ("b1", "b", 1), ("c1", "c", 1), ("b2", "b", 1)]
+    assert grant_order(scheduler, jobs) == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_costly_jobs_wait_for_their_deficit():
+    # A batch of three images costs three singles, so b gets two turns before it runs
+    scheduler = FairScheduler(max_concurrency=1, per_key_limit=1)
+    jobs = [("batch", "a", 3), ("b1", "b", 1), ("b2", "b", 1), ("b3", "b", 1)]
+    assert grant_order(scheduler, jobs) == ["b1", "b2", "batch", "b3"]
+
+
+def test_weights_scale_the_share():
+    scheduler = FairScheduler(max_concurrency=1, per_key_limit=1)
+    scheduler.set_weight("a", 2.0)
+    scheduler.set_weight("c", 0.5)
+    jobs = [(f"a{i}", "a", 1) for i in range(1, 5)] + [(f"b{i}", "b", 1) for i in range(1, 3)]
+    jobs += [(f"c{i}", "c", 1) for i in range(1, 3)]
+    assert grant_order(scheduler, jobs) == ["a1", "a2", "b1", "a3", "a4", "b2", "c1", "c2"]
+
+
+def test_per_key_limit_leaves_slots_for_other_providers():
+    async def run():
+        scheduler = FairScheduler(max_concurrency=4, per_key_limit=2)
+        bulk = [asyncio.create_task(scheduler.acquire("bulk")) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["providers"]["bulk"] == {"in_flight": 2, "queued": 3, "weight": 1.0}
+
+        # The single upload is not stuck behind the bulk queue
+        assert await asyncio.wait_for(scheduler.acquire("single"), timeout=1) == "single"
+        assert scheduler.in_flight == 3
+
+        scheduler.release("bulk")
+        await asyncio.sleep(0)
+        stats = scheduler.stats()
+        assert stats["providers"]["bulk"] == {"in_flight": 2, "queued": 2, "weight": 1.0}
+        assert stats["in_flight"] == 3
+
+        for task in bulk:
+            task.cancel()
+        await asyncio.gather(*bulk, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_timeout_removes_the_waiting_job():
+    async def run():
+        scheduler = FairScheduler(max_concurrency=1, per_key_limit=1)
+        await scheduler.acquire("a")
+        with pytest.raises(SchedulerTimeout):
+            await scheduler.acquire("b", timeout=0.01)
+        assert scheduler.stats()["queued"] == 0
+
+        scheduler.release("a")
+        assert scheduler.in_flight == 0
+        assert await asyncio.wait_for(scheduler.acquire("b"), timeout=1) == "b"
+
+    asyncio.run(run())
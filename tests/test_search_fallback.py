@@ -0,0 +1,70 @@
+"""Hybrid search falls back to full-text search when the query cannot be embedded"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+import customer_routes
+from ai.embeddings import Embedder, get_embedder, set_embedder
+from ai.gateway import GeminiUnavailable
+from database.crud import InventoryCRUD
+from database.schemas import InventorySearchRequest
+from search import EmbeddingUnavailable, semantic_search
+
+
+class DownEmbedder(Embedder):
+    name = "down"
+
+    async def embed_documents(self, texts):
+        raise GeminiUnavailable("AI service is temporarily unavailable, please retry later")
+
+    async def embed_query(self, text):
+        raise GeminiUnavailable("AI service is temporarily unavailable, please retry later")
+
+
+@pytest.fixture
+def down_embedder():
+    previous = get_embedder()
+    set_embedder(DownEmbedder())
+    yield
+    set_embedder(previous)
+
+
+def test_semantic_search_reports_embedding_failures(down_embedder):
+    errors = semantic_search.query_embedding_errors
+    with pytest.raises(EmbeddingUnavailable):
+        asyncio.run(semantic_search.search(None, "cozy winter layer"))
+    assert semantic_search.query_embedding_errors == errors + 1
+
+
+def test_search_route_uses_text_search_while_embeddings_are_down(down_embedder, monkeypatch):
+    text_searches = []
+
+    def search_inventory(db, search_term, provider_id=None, limit=25):
+        text_searches.append(search_term)
+        return []
+
+    monkeypatch.setattr(InventoryCRUD, "search_inventory", staticmethod(search_inventory))
+    monkeypatch.setattr(InventoryCRUD, "get_random_inventory_items", staticmethod(lambda db, limit=5: []))
+
+    response = asyncio.run(customer_routes.search_inventory(InventorySearchRequest(query="cozy winter layer"), db=None))
+
+    assert text_searches == ["cozy winter layer"]
+    assert response.total_matches == 0
+
+
+def test_other_errors_are_not_hidden(monkeypatch):
+    class ZeroEmbedder(DownEmbedder):
+        async def embed_query(self, text):
+            return np.zeros(3, dtype=np.float32)
+
+    previous = get_embedder()
+    set_embedder(ZeroEmbedder())
+    try:
+        # A bug past the embedding step still surfaces instead of silently degrading
+        monkeypatch.setattr(semantic_search, "_nearest", lambda db, vector: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            asyncio.run(semantic_search.search(None, "scarf"))
+    finally:
+        set_embedder(previous)
@@ -0,0 +1,82 @@
+"""VectorIndex results checked against an exact brute-force search"""
+
+import numpy as np
+import pytest
+
+from search.vector_index import VectorIndex
+
+DIM = 32
+
+
+def unit_vectors(rng, count):
+    vectors = rng.standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact(data, query, k):
+    ids = list(data)
+    scores = np.stack([data[item_id] for item_id in ids]) @ query
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [ids[row] for row in order], scores[order]
+
+
+def assert_matches_exact(index, data, queries, k, nprobe=None):
+    for query in queries:
+        got = index.search(query, k, nprobe=nprobe)
+        want_ids, want_scores = exact(data, query, k)
+        assert [item_id for item_id, _ in got] == want_ids
+        np.testing.assert_allclose([score for _, score in got], want_scores, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("ivf_min_size", [10_000, 200])
+def test_search_matches_exact_after_upsert_remove_and_rebuild(ivf_min_size):
+    rng = np.random.default_rng(7)
+    # Probing every cluster once IVF kicks in must equal the exact search
+    index = VectorIndex(DIM, ivf_min_size=ivf_min_size, nprobe=4096)
+    data = dict(zip(range(400), unit_vectors(rng, 400)))
+    index.build(list(data), np.stack(list(data.values())))
+    queries = unit_vectors(rng, 20)
+    assert_matches_exact(index, data, queries, k=10)
+
+    # New items and replaced vectors go to the delta buffer
+    changed = list(range(350, 450))
+    vectors = unit_vectors(rng, len(changed))
+    index.upsert(changed, vectors)
+    data.update(zip(changed, vectors))
+    assert_matches_exact(index, data, queries, k=10)
+
+    removed = list(rng.choice(list(data), 60, replace=False))
+    index.remove(removed)
+    for item_id in removed:
+        data.pop(item_id)
+    assert len(index) == len(data)
+    assert_matches_exact(index, data, queries, k=25)
+
+    index.rebuild()
+    assert index.stats()["delta_rows"] == 0
+    assert_matches_exact(index, data, queries, k=25)
+    assert_matches_exact(index, data, queries, k=len(data) + 5)
+
+
+def test_delta_items_are_found_with_a_single_probe():
+    rng = np.random.default_rng(11)
+    index = VectorIndex(DIM, ivf_min_size=200, nprobe=1)
+    index.build(range(400), unit_vectors(rng, 400))
+    assert index.stats()["clusters"] == 20
+
+    fresh = unit_vectors(rng, 5)
+    index.upsert(["a", "b", "c", "d", "e"], fresh)
+    for item_id, vector in zip("abcde", fresh):
+        assert index.search(vector, 1)[0][0] == item_id
+
+
+def test_removed_items_never_come_back():
+    rng = np.random.default_rng(3)
+    index = VectorIndex(DIM)
+    vectors = unit_vectors(rng, 10)
+    index.build(range(10), vectors)
+    index.upsert([3], vectors[4:5])
+    index.remove([3, 4])
+    results = index.search(vectors[4], 10)
+    assert {item_id for item_id, _ in results} == set(range(10)) - {3, 4}
+    assert index.vectors_for([3, 4]) == {}